@@ -0,0 +1,294 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Words dropped when turning a question into a stand-in search term
+STOP_WORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "is", "are", "be", "can",
+    "could", "do", "does", "i", "my", "me", "we", "you", "what", "when", "who", "how", "why",
+    "which", "will", "if", "it", "this", "that", "with", "under", "after", "before", "get",
+    "someone", "someone's", "there", "am", "have", "has", "must", "should", "by", "as", "from"
+}
+ANSWER_SENTENCE = ("Under the Migration Act 1958 the relevant section sets out when this applies, "
+                   "who may decide and what notice must be given. ")
+
+
+class LatencyDistribution:
+    """
+    Seconds to wait before answering, drawn from a distribution given as "kind:params":
+        fixed:0.5
+        uniform:0.2,1.5
+        normal:0.8,0.2             (mean, standard deviation; clipped at 0)
+        lognormal:median=0.8,sigma=0.5
+        exponential:0.6            (mean)
+    """
+
+    def __init__(self, spec: str, rng: random.Random, lock: threading.Lock = None):
+        self.spec = spec
+        self.rng = rng
+        # Shared with whoever else draws from rng
+        self.lock = lock or threading.Lock()
+        kind, _, params = spec.partition(":")
+        self.kind = kind.strip().lower()
+        named = {}
+        positional = []
+        for param in filter(None, (p.strip() for p in params.split(","))):
+            if "=" in param:
+                key, _, value = param.partition("=")
+                named[key.strip()] = float(value)
+            else:
+                positional.append(float(param))
+        if self.kind == "fixed":
+            self.args = (named.get("seconds", positional[0] if positional else 0.0),)
+        elif self.kind == "uniform":
+            self.args = (named.get("low", positional[0]), named.get("high", positional[1]))
+        elif self.kind == "normal":
+            self.args = (named.get("mean", positional[0]), named.get("std", positional[1]))
+        elif self.kind == "lognormal":
+            median = named.get("median", positional[0] if positional else 0.5)
+            sigma = named.get("sigma", positional[1] if len(positional) > 1 else 0.5)
+            self.args = (median, sigma)
+        elif self.kind == "exponential":
+            self.args = (named.get("mean", positional[0]),)
+        else:
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self) -> float:
+        with self.lock:
+            if self.kind == "fixed":
+                return self.args[0]
+            if self.kind == "uniform":
+                return self.rng.uniform(*self.args)
+            if self.kind == "normal":
+                return max(0.0, self.rng.gauss(*self.args))
+            if self.kind == "lognormal":
+                median, sigma = self.args
+                return self.rng.lognormvariate(0.0, sigma) * median
+            return self.rng.expovariate(1.0 / self.args[0])
+
+
+def classify(messages) -> str:
+    """Which of the chatbot's prompts a request carries: route, search_term, search_terms or answer"""
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    if '"SEARCH" or "CHAT"' in system:
+        return "route"
+    if "One search term per line" in system:
+        return "search_terms"
+    if "search-term generator" in system:
+        return "search_term"
+    return "answer"
+
+
+def question_of(messages) -> str:
+    """The last user message, with the answer prompt's wrapper removed"""
+    user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    match = re.search(r"User Question:\s*(.*?)\n", user)
+    return match.group(1) if match else user
+
+
+def search_term_for(question: str) -> str:
+    """A few content words of the question, enough for the embedding search to run"""
+    words = [w for w in re.findall(r"[a-z0-9-]+", question.lower()) if w not in STOP_WORDS]
+    return " ".join(words[:3]) or "visa"
+
+
+class StubState:
+    """Server settings, the random source and the counters shown at GET /stats"""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.latency = LatencyDistribution(args.latency, self.rng, self.lock)
+        self.answer_latency = LatencyDistribution(args.answer_latency, self.rng, self.lock) \
+            if args.answer_latency else None
+        self.stats = {"requests": 0, "streamed": 0, "errors_injected": 0, "timeouts_injected": 0,
+                      "by_kind": {}, "in_flight": 0, "max_in_flight": 0}
+
+    def roll(self, probability: float) -> bool:
+        with self.lock:
+            return self.rng.random() < probability
+
+    def count(self, key: str, kind: str = None):
+        with self.lock:
+            self.stats[key] += 1
+            if kind:
+                self.stats["by_kind"][kind] = self.stats["by_kind"].get(kind, 0) + 1
+
+    def track_in_flight(self, delta: int):
+        with self.lock:
+            self.stats["in_flight"] += delta
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible /chat/completions with injected latency, errors and timeouts"""
+
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, format, *args):
+        if not self.state.args.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": self.state.args.model, "object": "model"}]})
+        elif self.path.rstrip("/") == "/stats":
+            with self.state.lock:
+                stats = json.loads(json.dumps(self.state.stats))
+            self._send_json(200, stats)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "Invalid JSON"}})
+            return
+
+        state = self.state
+        messages = request.get("messages") or []
+        kind = classify(messages)
+        state.count("requests", kind)
+        state.track_in_flight(1)
+        try:
+            if state.roll(state.args.timeout_rate):
+                # Hold the connection open past any sensible client timeout, then drop it
+                state.count("timeouts_injected")
+                time.sleep(state.args.hang_seconds)
+                self.close_connection = True
+                return
+            distribution = state.answer_latency if kind == "answer" and state.answer_latency else state.latency
+            delay = distribution.sample()
+            if state.roll(state.args.error_rate):
+                state.count("errors_injected")
+                time.sleep(delay * state.args.error_latency_factor)
+                status = state.args.error_status
+                headers = {"Retry-After": "1"} if status == 429 else None
+                self._send_json(status, {"error": {"message": "Injected error", "type": "server_error",
+                                                   "code": status}}, headers)
+                return
+            text = self._reply(kind, messages, request)
+            if request.get("stream"):
+                state.count("streamed")
+                self._stream(text, delay, request)
+            else:
+                time.sleep(delay)
+                self._send_json(200, self._completion(text, request))
+        finally:
+            state.track_in_flight(-1)
+
+    def _reply(self, kind: str, messages, request) -> str:
+        question = question_of(messages)
+        if kind == "route":
+            return "CHAT" if self.state.roll(self.state.args.chat_rate) else "SEARCH"
+        if kind == "search_term":
+            return search_term_for(question)
+        if kind == "search_terms":
+            return "\n".join([search_term_for(question), "visa cancellation"])
+        words = self.state.args.answer_words
+        sentence_words = ANSWER_SENTENCE.split()
+        return " ".join((sentence_words * (words // len(sentence_words) + 1))[:words])
+
+    def _completion(self, text: str, request) -> dict:
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in request.get("messages") or [])
+        completion_tokens = len(text.split())
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model") or self.state.args.model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens}
+        }
+
+    def _stream(self, text: str, first_token_delay: float, request):
+        """Server-sent events: the first chunk after the sampled latency, then one word per interval"""
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = request.get("model") or self.state.args.model
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(delta, finish_reason=None):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        time.sleep(first_token_delay)
+        send({"role": "assistant", "content": ""})
+        for i, word in enumerate(text.split(" ")):
+            if i:
+                time.sleep(self.state.args.token_interval)
+            send({"content": word if i == 0 else " " + word})
+        send({}, "stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in for the chatbot's LLM calls")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--model", default="stub-model")
+    parser.add_argument("--latency", default="lognormal:median=0.5,sigma=0.4",
+                        help="Latency before the first token, e.g. fixed:0.5, uniform:0.2,1.5, "
+                             "normal:0.8,0.2, lognormal:median=0.8,sigma=0.5, exponential:0.6")
+    parser.add_argument("--answer-latency", help="Separate distribution for the (longer) answer calls")
+    parser.add_argument("--token-interval", type=float, default=0.02, help="Seconds between streamed words")
+    parser.add_argument("--answer-words", type=int, default=120, help="Length of the stand-in answers")
+    parser.add_argument("--chat-rate", type=float, default=0.0,
+                        help="Share of routing calls answered CHAT (no search) instead of SEARCH")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with an error")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected errors (e.g. 429, 500, 503)")
+    parser.add_argument("--error-latency-factor", type=float, default=0.1,
+                        help="Injected errors return after this fraction of the sampled latency")
+    parser.add_argument("--timeout-rate", type=float, default=0.0,
+                        help="Share of calls that hang for --hang-seconds and are then dropped")
+    parser.add_argument("--hang-seconds", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible latency and faults")
+    parser.add_argument("--quiet", action="store_true", help="Do not log every request")
+    args = parser.parse_args()
+
+    StubHandler.state = StubState(args)
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+    print(f"🧪 LLM stub listening on http://{args.host}:{args.port}/v1 (latency {args.latency}, "
+          f"errors {args.error_rate:.0%} as {args.error_status}, timeouts {args.timeout_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
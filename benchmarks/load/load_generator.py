@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_QUESTIONS_PATH = os.path.join(BENCHMARK_DIR, "..", "retrieval", "questions.jsonl")
+QUESTION_FIELDS = ("question", "message", "body")
+
+
+def read_questions(path):
+    """Questions from a JSONL file of objects (question / message / body field) or plain strings"""
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                questions.append(record)
+            elif isinstance(record, dict):
+                question = next((record[field] for field in QUESTION_FIELDS if record.get(field)), None)
+                if question:
+                    questions.append(question)
+    if not questions:
+        raise ValueError(f"No questions in {path}")
+    return questions
+
+
+def percentiles(values):
+    """p50/p90/p95/p99/max and mean of a list of seconds, in milliseconds"""
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(q):
+        return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))] * 1000
+
+    return {"p50": round(rank(0.5), 1), "p90": round(rank(0.9), 1), "p95": round(rank(0.95), 1),
+            "p99": round(rank(0.99), 1), "max": round(ordered[-1] * 1000, 1),
+            "mean": round(sum(ordered) / len(ordered) * 1000, 1)}
+
+
+class LoadGenerator:
+    """
+    Replays questions against POST /api/chat, either open-loop at a target request rate or
+    closed-loop with a fixed number of concurrent clients, and records every outcome.
+    """
+
+    def __init__(self, url, questions, timeout=120.0, shuffle=False, seed=None):
+        self.endpoint = url.rstrip("/") + "/api/chat"
+        self.questions = questions
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        if shuffle:
+            self.questions = list(questions)
+            self.rng.shuffle(self.questions)
+        self.lock = threading.Lock()
+        self.results = []
+        self.next_index = 0
+
+    def _next_question(self):
+        with self.lock:
+            question = self.questions[self.next_index % len(self.questions)]
+            self.next_index += 1
+            return question
+
+    def send(self, question, scheduled_at=None):
+        """
+        One request. Latency is measured from the scheduled send time in open-loop mode, so a
+        server that falls behind shows up as latency instead of silently lowering the rate.
+        """
+        start_time = time.perf_counter()
+        body = json.dumps({"message": question}).encode("utf-8")
+        request = urllib.request.Request(self.endpoint, data=body, headers={"Content-Type": "application/json"})
+        outcome = "ok"
+        status = None
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status = response.status
+                payload = json.loads(response.read() or b"{}")
+                if not payload.get("response"):
+                    outcome = "empty_response"
+        except urllib.error.HTTPError as e:
+            status = e.code
+            outcome = f"http_{e.code}"
+        except (socket.timeout, TimeoutError):
+            outcome = "timeout"
+        except urllib.error.URLError as e:
+            outcome = "timeout" if isinstance(e.reason, (socket.timeout, TimeoutError)) else "connection_error"
+        except (ConnectionError, json.JSONDecodeError):
+            outcome = "connection_error"
+        end_time = time.perf_counter()
+        result = {
+            "outcome": outcome,
+            "status": status,
+            "service_seconds": end_time - start_time,
+            "latency_seconds": end_time - (scheduled_at if scheduled_at is not None else start_time),
+            "finished_at": end_time
+        }
+        with self.lock:
+            self.results.append(result)
+        return result
+
+    def run_rate(self, rps, duration=None, requests=None, max_in_flight=256, poisson=False):
+        """Open loop: start requests at rps (evenly spaced, or with Poisson arrivals)"""
+        total = requests if requests is not None else int(rps * duration)
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            scheduled_at = start_time
+            for _ in range(total):
+                scheduled_at += self.rng.expovariate(rps) if poisson else 1.0 / rps
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.send, self._next_question(), scheduled_at)
+        return start_time
+
+    def run_concurrency(self, concurrency, duration=None, requests=None):
+        """Closed loop: each client sends its next request as soon as the previous one returns"""
+        start_time = time.perf_counter()
+        deadline = start_time + duration if duration is not None else None
+        remaining = [requests]
+
+        def client():
+            while True:
+                with self.lock:
+                    if remaining[0] is not None:
+                        if remaining[0] <= 0:
+                            return
+                        remaining[0] -= 1
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                self.send(self._next_question())
+
+        threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return start_time
+
+    def report(self, start_time, label, settings):
+        """Throughput, latency percentiles and error rates of everything sent so far"""
+        results = self.results
+        wall_seconds = max((r["finished_at"] for r in results), default=start_time) - start_time
+        ok = [r for r in results if r["outcome"] == "ok"]
+        outcomes = {}
+        for r in results:
+            outcomes[r["outcome"]] = outcomes.get(r["outcome"], 0) + 1
+        return {
+            "label": label,
+            "settings": settings,
+            "requests": len(results),
+            "ok": len(ok),
+            "error_rate": round(1 - len(ok) / len(results), 4) if results else None,
+            "outcomes": outcomes,
+            "wall_seconds": round(wall_seconds, 3),
+            "throughput_rps": round(len(ok) / wall_seconds, 3) if wall_seconds > 0 else None,
+            "offered_rps": round(len(results) / wall_seconds, 3) if wall_seconds > 0 else None,
+            "latency_ms": percentiles([r["latency_seconds"] for r in ok]),
+            "service_latency_ms": percentiles([r["service_seconds"] for r in ok]),
+            "error_latency_ms": percentiles([r["latency_seconds"] for r in results if r["outcome"] != "ok"])
+        }
+
+
+def print_summary(reports):
+    """One row per report, for comparing server configurations"""
+    print(f"{'label':<24}{'reqs':>6}{'ok rps':>9}{'err %':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for report in reports:
+        latency = report["latency_ms"] or {}
+        error_rate = report["error_rate"] * 100 if report["error_rate"] is not None else 0.0
+        print(f"{report['label'][:23]:<24}{report['requests']:>6}{report['throughput_rps'] or 0:>9.2f}"
+              f"{error_rate:>8.1f}{latency.get('p50', 0):>10.1f}{latency.get('p95', 0):>10.1f}"
+              f"{latency.get('p99', 0):>10.1f}")
+        errors = {k: v for k, v in report["outcomes"].items() if k != "ok"}
+        if errors:
+            print(f"{'':<24}errors: {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay questions against the chatbot API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Generate load against a running app")
+    run_parser.add_argument("--url", default="http://127.0.0.1:5000", help="Base URL of the Flask app")
+    run_parser.add_argument("--questions", default=DEFAULT_QUESTIONS_PATH, help="JSONL question set")
+    mode = run_parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--rps", type=float, help="Open loop: start this many requests per second")
+    mode.add_argument("--concurrency", type=int, help="Closed loop: this many clients back to back")
+    amount = run_parser.add_mutually_exclusive_group(required=True)
+    amount.add_argument("--duration", type=float, help="Seconds to generate load for")
+    amount.add_argument("--requests", type=int, help="Number of requests to send")
+    run_parser.add_argument("--poisson", action="store_true", help="Poisson arrivals instead of even spacing (--rps)")
+    run_parser.add_argument("--max-in-flight", type=int, default=256, help="Cap on open requests (--rps)")
+    run_parser.add_argument("--timeout", type=float, default=120.0, help="Client timeout per request in seconds")
+    run_parser.add_argument("--shuffle", action="store_true", help="Shuffle the questions")
+    run_parser.add_argument("--seed", type=int, default=None)
+    run_parser.add_argument("--label", default=None, help="Name of the server configuration under test")
+    run_parser.add_argument("--output", help="Write the JSON report here")
+
+    summary_parser = subparsers.add_parser("summarize", help="Tabulate saved reports side by side")
+    summary_parser.add_argument("reports", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "summarize":
+        reports = []
+        for path in args.reports:
+            with open(path, "r", encoding="utf-8") as f:
+                reports.append(json.load(f))
+        print_summary(reports)
+        return
+
+    generator = LoadGenerator(args.url, read_questions(args.questions), timeout=args.timeout,
+                              shuffle=args.shuffle, seed=args.seed)
+    settings = {key: getattr(args, key) for key in
+                ("url", "rps", "concurrency", "duration", "requests", "poisson", "timeout")}
+    label = args.label or (f"{args.rps:g} rps" if args.rps else f"{args.concurrency} clients")
+    print(f"🚀 {label} against {generator.endpoint}", file=sys.stderr)
+    if args.rps:
+        start_time = generator.run_rate(args.rps, duration=args.duration, requests=args.requests,
+                                        max_in_flight=args.max_in_flight, poisson=args.poisson)
+    else:
+        start_time = generator.run_concurrency(args.concurrency, duration=args.duration, requests=args.requests)
+
+    report = generator.report(start_time, label, settings)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print_summary([report])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# The benchmark must never reach the network: the embedding model comes from the local
+# Hugging Face cache and the search-term LLM is replaced by the labelled search terms
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(BENCHMARK_DIR, "..", ".."))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+# Config paths are relative to the repository root; paths given on the command line are not
+INVOCATION_DIR = os.getcwd()
+os.chdir(REPO_ROOT)
+
+import config
+
+QUESTIONS_PATH = os.path.join(BENCHMARK_DIR, "questions.jsonl")
+DEFAULT_K = (1, 3)
+LATENCY_STAGES = ("embedding", "retrieval", "total")
+
+
+def user_path(path):
+    """Resolve a command-line path against the directory the benchmark was started from"""
+    return path if path is None or os.path.isabs(path) else os.path.join(INVOCATION_DIR, path)
+
+
+def read_labelled_questions(path):
+    """
+    Read the labelled questions.
+    Each line is {"id", "question", "search_term", "expected"} where "search_term" is what the
+    search-term LLM is assumed to return, "expected" lists final_hashmap.json keys (best first)
+    and an optional "search_terms" list is used when query expansion is enabled.
+    """
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if not record.get("question") or not record.get("expected"):
+                raise ValueError(f"{path}:{line_number} needs a question and expected section keys")
+            questions.append(record)
+    return questions
+
+
+def load_hashmap_keys():
+    """Section keys from the search bundle when present, else from final_hashmap.json"""
+    if os.path.exists(config.SEARCH_BUNDLE_PATH):
+        from search_bundle_package.search_bundle import SearchBundle
+        bundle = SearchBundle().load(config.SEARCH_BUNDLE_PATH, verify_checksum=False)
+        keys = set(bundle.section_metadata)
+        bundle.close()
+        return keys
+    with open(config.HASHMAP_PATH, "r", encoding="utf-8") as f:
+        return set(json.load(f))
+
+
+def check_labels(questions):
+    """Return the (question id, key) pairs whose expected key is not a section of the Act"""
+    keys = load_hashmap_keys()
+    return [(q["id"], key) for q in questions for key in q["expected"] if key not in keys]
+
+
+def parse_overrides(config_path=None, assignments=None):
+    """
+    Collect config overrides from a JSON file and KEY=VALUE pairs (VALUE parsed as JSON
+    when possible, e.g. RETRIEVAL_STAGES='["tree","bm25"]' or TREE_SEARCH_MODE=indexed).
+    """
+    overrides = {}
+    if config_path:
+        with open(config_path, "r", encoding="utf-8") as f:
+            overrides.update(json.load(f))
+    for assignment in assignments or []:
+        key, _, value = assignment.partition("=")
+        try:
+            overrides[key] = json.loads(value)
+        except json.JSONDecodeError:
+            overrides[key] = value
+    return overrides
+
+
+def apply_overrides(overrides):
+    """Set config values before the pipeline is built, rejecting unknown names"""
+    for key, value in overrides.items():
+        if not hasattr(config, key):
+            raise KeyError(f"Unknown config setting: {key}")
+        setattr(config, key, value)
+
+
+def percentiles(values):
+    """p50/p95/p99 and mean of a list of seconds, in milliseconds"""
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(q):
+        return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))] * 1000
+
+    return {"p50": round(rank(0.5), 3), "p95": round(rank(0.95), 3), "p99": round(rank(0.99), 3),
+            "mean": round(sum(ordered) / len(ordered) * 1000, 3), "count": len(ordered)}
+
+
+def score_question(expected, sections, ks):
+    """recall@k for every k and the reciprocal rank of the first expected section"""
+    expected = set(expected)
+    scores = {f"recall@{k}": len(expected & set(sections[:k])) / len(expected) for k in ks}
+    rank = next((i for i, key in enumerate(sections, 1) if key in expected), None)
+    scores["reciprocal_rank"] = 1.0 / rank if rank else 0.0
+    scores["first_relevant_rank"] = rank
+    return scores
+
+
+def build_pipeline(labels):
+    """The chatbot's retrieval pipeline with the search-term LLM replaced by the labels"""
+    from main import MigrationActChatbot
+    from search_term_handler_package.search_term_handler import SearchTermHandler
+    from index_manager_package.index_manager import IndexManager
+    from single_flight_package.single_flight import SingleFlight
+
+    class LabelledSearchTermHandler(SearchTermHandler):
+        """Returns the labelled search terms instead of calling the LLM"""
+
+        def _initialize_llm(self):
+            self.llm = None
+
+        def generate_search_term(self, user_question):
+            return labels[user_question].get("search_term") or user_question
+
+        def generate_search_terms(self, user_question, max_terms=None):
+            label = labels[user_question]
+            terms = list(label.get("search_terms") or [label.get("search_term") or user_question])
+            if config.SEARCH_TERM_INCLUDE_QUESTION and user_question not in terms:
+                terms.append(user_question)
+            return terms[:max_terms or config.SEARCH_TERM_FAN_OUT]
+
+    class RetrievalPipeline(MigrationActChatbot):
+        """Loads the search components only; no chat LLM is created"""
+
+        def __init__(self):
+            self.startup_timings = {}
+            self.search_term_handler = LabelledSearchTermHandler()
+            self.index_manager = IndexManager(embed=self.search_term_handler.embed_search_term)
+            self.reranker = None
+            self.retrieval_flight = SingleFlight("retrieval")
+            self._initialize_all_components()
+
+    return RetrievalPipeline()
+
+
+def run_benchmark(questions, ks=DEFAULT_K, repeat=1, warmup=3):
+    """
+    Retrieve the sections of every labelled question and score them.
+
+    Returns:
+        dict: Report with the aggregate metrics, latency percentiles per stage and one
+        result per question
+    """
+    from metrics_package.metrics import STAGE_LATENCY
+
+    labels = {q["question"]: q for q in questions}
+    start_time = time.perf_counter()
+    pipeline = build_pipeline(labels)
+    startup_seconds = time.perf_counter() - start_time
+
+    def retrieve(question):
+        timings = {}
+        search_terms = pipeline._generate_search_terms(question)
+        hits, _ = pipeline._retrieve_hits(question, search_terms, timings)
+        timings["total"] = timings.get("embedding", 0.0) + timings.get("retrieval", 0.0)
+        # Hashmap keys are tree node names without the trailing embed id
+        return search_terms, [hit["section"].rsplit("_", 1)[0] for hit in hits], timings
+
+    # Build the lazily loaded indexes before anything is measured
+    for q in questions[:warmup]:
+        retrieve(q["question"])
+    STAGE_LATENCY.clear()
+
+    latencies = {stage: [] for stage in LATENCY_STAGES}
+    results = []
+    for _ in range(repeat):
+        results = []
+        for q in questions:
+            search_terms, sections, timings = retrieve(q["question"])
+            for stage in latencies:
+                latencies[stage].append(timings.get(stage, 0.0))
+            results.append({
+                "id": q["id"],
+                "search_terms": search_terms,
+                "expected": q["expected"],
+                "retrieved": sections,
+                **score_question(q["expected"], sections, ks),
+                "timings_ms": {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+            })
+
+    metrics = {f"recall@{k}": round(sum(r[f"recall@{k}"] for r in results) / len(results), 4) for k in ks}
+    metrics["mrr"] = round(sum(r["reciprocal_rank"] for r in results) / len(results), 4)
+    latency_ms = {stage: percentiles(values) for stage, values in latencies.items()}
+    # One series per depth of the tree search: tree_level_0 (parts), tree_level_1, ...
+    depth = 0
+    while True:
+        tree_level = STAGE_LATENCY.quantiles(stage=f"tree_level_{depth}")
+        if not tree_level:
+            break
+        latency_ms[f"tree_level_{depth}"] = {f"p{int(q * 100)}": round(v * 1000, 3)
+                                             for q, v in tree_level.items()}
+        depth += 1
+    return {
+        "questions": len(questions),
+        "repeat": repeat,
+        "startup_seconds": round(startup_seconds, 3),
+        "settings": {name: getattr(config, name) for name in (
+            "RETRIEVAL_STAGES", "TREE_SEARCH_MODE", "SEARCH_BEAM_WIDTH", "NODE_SCORING_MODE",
+            "LABEL_MATCH_ENABLED", "SEARCH_TERM_EXPANSION_ENABLED", "RERANKER_ENABLED",
+            "EMBEDDING_MODEL_NAME")},
+        "metrics": metrics,
+        "latency_ms": latency_ms,
+        "results": results
+    }
+
+
+def print_report(report):
+    """Human-readable summary of a report"""
+    print(f"📊 {report['questions']} questions x {report['repeat']} "
+          f"(pipeline loaded in {report['startup_seconds']:.2f}s)")
+    for name, value in report["metrics"].items():
+        print(f"  {name:<10} {value:.4f}")
+    for stage, stats in report["latency_ms"].items():
+        if stats:
+            print(f"  {stage:<10} " + "  ".join(f"{k}={v}" for k, v in stats.items() if k != "count") + " ms")
+    misses = [r["id"] for r in report["results"] if not r["first_relevant_rank"]]
+    if misses:
+        print(f"  ❌ No expected section retrieved for: {', '.join(misses)}")
+
+
+def load_or_run(spec, args):
+    """
+    A side of a comparison: a saved report, a JSON file of config overrides, or "default".
+    Configurations run in their own process so that no state leaks between them.
+    """
+    if spec != "default":
+        spec = user_path(spec)
+        with open(spec, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if "metrics" in data:
+            return data
+    command = [sys.executable, os.path.abspath(__file__), "run", "--questions", args.questions,
+               "--repeat", str(args.repeat), "--warmup", str(args.warmup), "--k", args.k, "--quiet"]
+    if spec != "default":
+        command += ["--config", spec]
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+        output_path = tmp.name
+    try:
+        subprocess.run(command + ["--output", output_path], check=True)
+        with open(output_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.remove(output_path)
+
+
+def compare_reports(baseline, candidate, max_metric_drop, max_latency_increase):
+    """
+    Print the metric and p95 latency deltas.
+
+    Returns:
+        list[str]: The regressions beyond the allowed thresholds (empty when the candidate passes)
+    """
+    regressions = []
+    print(f"{'metric':<22}{'baseline':>12}{'candidate':>12}{'delta':>12}")
+    for name, base_value in baseline["metrics"].items():
+        value = candidate["metrics"].get(name)
+        if value is None:
+            continue
+        delta = value - base_value
+        print(f"{name:<22}{base_value:>12.4f}{value:>12.4f}{delta:>+12.4f}")
+        if delta < -max_metric_drop:
+            regressions.append(f"{name} dropped by {-delta:.4f}")
+    for stage, base_stats in baseline["latency_ms"].items():
+        stats = candidate["latency_ms"].get(stage)
+        if not base_stats or not stats:
+            continue
+        name = f"{stage} p95 ms"
+        delta = stats["p95"] - base_stats["p95"]
+        print(f"{name:<22}{base_stats['p95']:>12.3f}{stats['p95']:>12.3f}{delta:>+12.3f}")
+        if base_stats["p95"] > 0 and stats["p95"] > base_stats["p95"] * (1 + max_latency_increase):
+            regressions.append(f"{name} rose by {delta / base_stats['p95']:.0%}")
+    base_hits = {r["id"]: r["first_relevant_rank"] for r in baseline["results"]}
+    for r in candidate["results"]:
+        before, after = base_hits.get(r["id"]), r["first_relevant_rank"]
+        if before != after:
+            print(f"  {r['id']}: first relevant rank {before} -> {after}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark over labelled questions")
+    parser.add_argument("--questions", default=QUESTIONS_PATH, help="Labelled questions (JSONL)")
+    parser.add_argument("--k", default=",".join(str(k) for k in DEFAULT_K), help="Comma-separated recall cut-offs")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the questions (latency samples)")
+    parser.add_argument("--warmup", type=int, default=3, help="Questions run once before measuring")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("check", help="Only verify that every expected key is a section of the Act")
+
+    run_parser = subparsers.add_parser("run", help="Benchmark one configuration")
+    run_parser.add_argument("--config", help="JSON file of config overrides")
+    run_parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                            help="Override one config setting (repeatable)")
+    run_parser.add_argument("--output", help="Write the full JSON report here")
+    run_parser.add_argument("--min-mrr", type=float, help="Exit with status 1 below this MRR")
+    run_parser.add_argument("--quiet", action="store_true", help="Do not print the summary")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two configurations or saved reports")
+    compare_parser.add_argument("baseline", help="Report JSON, config overrides JSON, or 'default'")
+    compare_parser.add_argument("candidate", help="Report JSON, config overrides JSON, or 'default'")
+    compare_parser.add_argument("--max-metric-drop", type=float, default=0.0,
+                                help="Allowed absolute drop of recall@k / MRR")
+    compare_parser.add_argument("--max-latency-increase", type=float, default=0.25,
+                                help="Allowed relative rise of a stage's p95 latency")
+    args = parser.parse_args()
+    args.questions = user_path(args.questions)
+
+    if args.command == "compare":
+        baseline = load_or_run(args.baseline, args)
+        candidate = load_or_run(args.candidate, args)
+        regressions = compare_reports(baseline, candidate, args.max_metric_drop, args.max_latency_increase)
+        if regressions:
+            print("❌ Regressions: " + "; ".join(regressions))
+            sys.exit(1)
+        print("✅ No regressions")
+        return
+
+    questions = read_labelled_questions(args.questions)
+    missing = check_labels(questions)
+    if missing:
+        for question_id, key in missing:
+            print(f"❌ {question_id}: '{key}' is not a section key", file=sys.stderr)
+        sys.exit(2)
+    if args.command == "check":
+        print(f"✅ {len(questions)} labelled questions, every expected key exists")
+        return
+
+    try:
+        apply_overrides(parse_overrides(user_path(args.config), args.set))
+    except KeyError as e:
+        print(f"❌ {e.args[0]}", file=sys.stderr)
+        sys.exit(2)
+    from tracing_package.tracing import configure_logging
+    configure_logging(level="WARNING")
+    ks = tuple(int(k) for k in args.k.split(","))
+    # Pipeline start-up messages go to stderr, the summary to stdout
+    real_stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        report = run_benchmark(questions, ks=ks, repeat=args.repeat, warmup=args.warmup)
+    finally:
+        sys.stdout = real_stdout
+
+    if args.output:
+        with open(user_path(args.output), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if not args.quiet:
+        print_report(report)
+    if args.min_mrr is not None and report["metrics"]["mrr"] < args.min_mrr:
+        print(f"❌ MRR {report['metrics']['mrr']:.4f} is below {args.min_mrr}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
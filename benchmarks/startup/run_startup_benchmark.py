@@ -0,0 +1,338 @@
+import argparse
+import gc
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Start-up must not depend on the network: the models come from the local Hugging Face cache
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(BENCHMARK_DIR, "..", ".."))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+# Config paths are relative to the repository root; paths given on the command line are not
+INVOCATION_DIR = os.getcwd()
+os.chdir(REPO_ROOT)
+
+# Imported one by one, in dependency order, so each time is the cost of what that import adds;
+# "main" is the rest of the application on top of the libraries
+HEAVY_MODULES = ("numpy", "torch", "transformers", "sentence_transformers", "chromadb",
+                 "langchain_openai", "langchain.prompts", "main")
+
+
+def user_path(path):
+    """Resolve a command-line path against the directory the benchmark was started from"""
+    return path if path is None or os.path.isabs(path) else os.path.join(INVOCATION_DIR, path)
+
+
+def memory_snapshot():
+    """
+    Current and peak RSS of this process in bytes.
+    On Linux the RSS is split into anonymous memory (private to each worker) and file-backed
+    pages (memory-mapped files such as the search bundle, shared between workers).
+    """
+    snapshot = {"rss_bytes": None, "rss_anon_bytes": None, "rss_file_bytes": None, "peak_rss_bytes": None}
+    fields = {"VmRSS": "rss_bytes", "RssAnon": "rss_anon_bytes", "RssFile": "rss_file_bytes",
+              "VmHWM": "peak_rss_bytes"}
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in fields:
+                    snapshot[fields[name]] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    if snapshot["peak_rss_bytes"] is None:
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Kilobytes on Linux, bytes on macOS
+            snapshot["peak_rss_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+        except ImportError:
+            pass
+    return snapshot
+
+
+def deep_sizeof(obj):
+    """
+    Bytes held by a Python object graph (dicts, lists, strings, numpy arrays, plain objects).
+    Arrays that view a memory-mapped file count only their header; see mapped_bytes.
+    """
+    import numpy as np
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, (type, type(sys), type(deep_sizeof))):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif isinstance(current, np.ndarray):
+            continue
+        elif hasattr(current, "__dict__"):
+            stack.append(vars(current))
+    return total
+
+
+def parameter_bytes(model):
+    """Bytes of the weights and buffers of a torch module"""
+    if model is None or not hasattr(model, "parameters"):
+        return None
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def directory_bytes(path):
+    """Size on disk of every file under a directory"""
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def component_sizes(chatbot):
+    """Memory held by the search tree, hashmap, models, vector store and indexes"""
+    sizes = {
+        "search_tree_bytes": deep_sizeof(chatbot.searcher.search_tree),
+        "hashmap_bytes": deep_sizeof(chatbot.metadata_loader.hashmap),
+        "embedding_model_bytes": parameter_bytes(chatbot.search_term_handler.embedding_model),
+        "lexical_index_bytes": deep_sizeof(chatbot.searcher.lexical_index)
+        if chatbot.searcher.lexical_index is not None else None,
+        "passage_index_bytes": deep_sizeof(chatbot.passage_index) if chatbot.passage_index is not None else None,
+        "reranker_model_bytes": parameter_bytes(getattr(chatbot.reranker.model, "model", None))
+        if chatbot.reranker is not None else None
+    }
+    bundle = chatbot.search_bundle
+    if bundle is not None:
+        mapped = bundle.embeddings.nbytes + (bundle.centroids.nbytes if bundle.centroids is not None else 0)
+        sizes["vector_store"] = {
+            "backend": "search_bundle",
+            "file_bytes": os.path.getsize(bundle.path),
+            # Read-only pages of the bundle file, shared by every worker on the host
+            "mapped_vector_bytes": mapped,
+            "parent_index_bytes": deep_sizeof(chatbot.database_admin.children_by_parent)
+        }
+    else:
+        # Chroma keeps its index in native structures that sys.getsizeof cannot see
+        sizes["vector_store"] = {
+            "backend": "chromadb",
+            "on_disk_bytes": directory_bytes(chatbot.index_manager.current.paths["vector_database"])
+        }
+    return sizes
+
+
+def time_imports():
+    """Seconds and RSS growth per heavy import, in HEAVY_MODULES order"""
+    imports = {}
+    for name in HEAVY_MODULES:
+        before = memory_snapshot()["rss_bytes"]
+        start_time = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            imports[name] = {"error": str(e)}
+            continue
+        seconds = time.perf_counter() - start_time
+        after = memory_snapshot()["rss_bytes"]
+        imports[name] = {"seconds": seconds,
+                         "rss_delta_bytes": after - before if None not in (before, after) else None}
+    return imports
+
+
+def construct(chatbot_class):
+    """Build one chatbot and return it with its total and per-step start-up seconds"""
+    start_time = time.perf_counter()
+    chatbot = chatbot_class()
+    return chatbot, {"total_seconds": time.perf_counter() - start_time, "steps": dict(chatbot.startup_timings)}
+
+
+def measure_process(warm_runs, settle_seconds):
+    """
+    Everything measured inside one fresh interpreter: the imports, a cold construction (first in
+    the process), the component sizes, steady-state memory and warm re-constructions.
+    """
+    import config
+    # ChatOpenAI only needs a key to construct; no request is ever sent
+    if not config.OPENROUTER_API_KEY:
+        config.OPENROUTER_API_KEY = "startup-benchmark"
+    result = {"memory": {"interpreter": memory_snapshot()}}
+    result["imports"] = time_imports()
+    result["memory"]["after_imports"] = memory_snapshot()
+
+    from main import MigrationActChatbot
+    chatbot, result["cold"] = construct(MigrationActChatbot)
+    result["memory"]["after_cold_start"] = memory_snapshot()
+    result["components"] = component_sizes(chatbot)
+
+    # Steady state: what a worker keeps once start-up garbage is gone
+    gc.collect()
+    time.sleep(settle_seconds)
+    result["memory"]["steady_state"] = memory_snapshot()
+
+    result["warm"] = []
+    for _ in range(warm_runs):
+        chatbot.index_manager.current.retire()
+        chatbot = None
+        gc.collect()
+        chatbot, timings = construct(MigrationActChatbot)
+        result["warm"].append(timings)
+    result["memory"]["after_warm_starts"] = memory_snapshot()
+    return result
+
+
+def summarize(values):
+    """Median, min and max of the numbers that were measured"""
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {"median": statistics.median(values), "min": min(values), "max": max(values)}
+
+
+def summarize_timings(timings):
+    """Aggregate a list of {"total_seconds", "steps"} records"""
+    steps = sorted({step for t in timings for step in t["steps"]})
+    return {
+        "total_seconds": summarize([t["total_seconds"] for t in timings]),
+        "steps": {step: summarize([t["steps"].get(step) for t in timings]) for step in steps}
+    }
+
+
+def build_report(processes):
+    """Aggregate the per-process results: medians across processes, raw results kept"""
+    first = processes[0]
+    memory_points = first["memory"].keys()
+    fields = ("rss_bytes", "rss_anon_bytes", "rss_file_bytes", "peak_rss_bytes")
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processes": len(processes),
+        "cold_start": summarize_timings([p["cold"] for p in processes]),
+        "warm_start": summarize_timings([t for p in processes for t in p["warm"]]),
+        "imports": {
+            name: summarize([p["imports"][name].get("seconds") for p in processes])
+            if "error" not in first["imports"][name] else first["imports"][name]
+            for name in HEAVY_MODULES
+        },
+        "memory": {
+            point: {field: summarize([p["memory"][point][field] for p in processes]) for field in fields}
+            for point in memory_points
+        },
+        "components": first["components"],
+        "runs": processes
+    }
+
+
+def git_commit():
+    """HEAD of the working tree, so results can be tracked per commit"""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=REPO_ROOT).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_child(args):
+    """One measurement process; writes its result as JSON to --result"""
+    from tracing_package.tracing import configure_logging
+    configure_logging(level="WARNING")
+    # Start-up messages go to stderr so that stdout stays clean
+    real_stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        result = measure_process(args.warm_runs, args.settle_seconds)
+    finally:
+        sys.stdout = real_stdout
+    with open(args.result, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def run_processes(args):
+    """Start --runs fresh interpreters, one cold start each, and collect their results"""
+    processes = []
+    for run in range(args.runs):
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+            result_path = tmp.name
+        command = [sys.executable, os.path.abspath(__file__), "--child", "--result", result_path,
+                   "--warm-runs", str(args.warm_runs), "--settle-seconds", str(args.settle_seconds)]
+        try:
+            completed = subprocess.run(command, capture_output=not args.verbose, text=True)
+            if completed.returncode != 0:
+                if completed.stderr:
+                    sys.stderr.write(completed.stderr)
+                raise RuntimeError(f"Measurement process {run + 1} exited with status {completed.returncode}")
+            with open(result_path, "r", encoding="utf-8") as f:
+                processes.append(json.load(f))
+        finally:
+            os.remove(result_path)
+        print(f"✅ Run {run + 1}/{args.runs}: cold start {processes[-1]['cold']['total_seconds']:.2f}s",
+              file=sys.stderr)
+    return processes
+
+
+def print_report(report):
+    """Human-readable summary on stderr; the JSON goes to stdout or --output"""
+    mib = 1024 * 1024
+
+    def median(summary):
+        return summary["median"] if summary else None
+
+    print(f"Cold start: {median(report['cold_start']['total_seconds']):.2f}s, "
+          f"warm start: {median(report['warm_start']['total_seconds']) or 0:.2f}s", file=sys.stderr)
+    for step, summary in report["cold_start"]["steps"].items():
+        print(f"  {step:<18}{median(summary):>8.3f}s", file=sys.stderr)
+    for name, summary in report["imports"].items():
+        text = f"{median(summary):.3f}s" if "error" not in summary else "not installed"
+        print(f"  import {name:<22}{text}", file=sys.stderr)
+    for point, fields in report["memory"].items():
+        rss = median(fields["rss_bytes"])
+        if rss is not None:
+            print(f"  RSS {point:<20}{rss / mib:>8.1f} MiB", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure chatbot start-up time and memory footprint")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes, each with one cold start")
+    parser.add_argument("--warm-runs", type=int, default=2, help="Constructions per process after the cold one")
+    parser.add_argument("--settle-seconds", type=float, default=1.0,
+                        help="Pause after garbage collection before sampling steady-state memory")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--verbose", action="store_true", help="Show the chatbot's start-up output")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    try:
+        processes = run_processes(args)
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    report = build_report(processes)
+    print_report(report)
+    if args.output:
+        with open(user_path(args.output), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
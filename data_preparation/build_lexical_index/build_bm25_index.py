@@ -0,0 +1,65 @@
+import json
+import os
+import sys
+import time
+import numpy as np
+
+# The tokenizer and postings format live with the BM25 scorer in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src"))
+from lexical_search_package.bm25_index import BM25Index, build_index_arrays, tokenize
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "content_page_reader"))
+from content_page_reader import read_section_text
+
+FINAL_HASHMAP_PATH = "final_json_searching_material/final_hashmap.json"
+BM25_INDEX_PATH = "final_json_searching_material/bm25_index.npz"
+
+# Exact statutory terms the index must rank first: query -> the sections that may come first
+RANKING_CHECKS = {
+    "s 501": ["Refusal or cancellation of visa on character grounds_501_Volume 2"],
+    "section 501": ["Refusal or cancellation of visa on character grounds_501_Volume 2"],
+    "bridging visa E": ["Bridging visas_73_Volume 1", "Bridging visas_37_Volume 1"],
+}
+
+def build_bm25_index():
+    with open(FINAL_HASHMAP_PATH, "r", encoding="utf-8") as f:
+        hashmap = json.load(f)
+
+    start_time = time.time()
+    text_tokens = {}
+    title_tokens = []
+    section_codes = []
+    for section_key, section_data in hashmap.items():
+        name, section_code = section_key.split("_")[:2]
+        text_tokens[section_key] = tokenize(read_section_text(section_key, section_data))
+        title_tokens.append(tokenize(name))
+        section_codes.append(section_code)
+
+    arrays = build_index_arrays(text_tokens, title_tokens, section_codes)
+    np.savez(BM25_INDEX_PATH, **arrays)
+    size_kb = os.path.getsize(BM25_INDEX_PATH) / 1024
+    print(f"Indexed {len(text_tokens)} sections, {len(arrays['text_term_offsets']) - 1} terms, "
+          f"{len(arrays['text_posting_doc_ids'])} postings in {time.time() - start_time:.2f} seconds")
+    print(f"✅ BM25 index saved to {BM25_INDEX_PATH} ({size_kb:.1f} KB)")
+
+def check_rankings():
+    """
+    Check that the saved index ranks the sections named by RANKING_CHECKS first.
+
+    Returns:
+        bool: True when every query passes
+    """
+    index = BM25Index().load(BM25_INDEX_PATH)
+    ok = True
+    for query, expected in RANKING_CHECKS.items():
+        results = index.search(query, k=1)
+        top = results[0][0] if results else None
+        if top in expected:
+            print(f"✅ '{query}' -> {top}")
+        else:
+            print(f"❌ '{query}' -> {top}, expected one of {expected}")
+            ok = False
+    return ok
+
+if __name__ == "__main__":
+    build_bm25_index()
+    sys.exit(0 if check_rankings() else 1)
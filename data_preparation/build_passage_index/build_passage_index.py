@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+
+# The chunking rules live with the passage search in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src"))
+import config
+from passage_index_package.passage_index import extract_section_text, split_passages
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "embedding_optimized_tree"))
+from label_embedding import DEFAULT_BATCH_SIZE, encode_unique_labels, fan_out, save_build_report
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "content_page_reader"))
+from content_page_reader import read_section_text
+
+FINAL_HASHMAP_PATH = "final_json_searching_material/final_hashmap.json"
+PASSAGE_INDEX_PATH = "final_json_searching_material/passage_index.npz"
+BUILD_REPORT_PATH = "final_json_searching_material/passage_index_build_report.json"
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+def build_passage_index(batch_size=DEFAULT_BATCH_SIZE, processes=1, max_chars=None):
+    with open(FINAL_HASHMAP_PATH, "r", encoding="utf-8") as f:
+        hashmap = json.load(f)
+
+    start_time = time.time()
+    section_keys = []
+    section_offsets = [0]
+    passages = []
+    untrimmed = 0
+    for section_key, section_data in hashmap.items():
+        section_code = section_key.split("_")[1]
+        text = read_section_text(section_key, section_data)
+        section_text = extract_section_text(text, section_code)
+        if section_text is text:
+            untrimmed += 1
+        passages.extend(split_passages(section_text, max_chars or config.PASSAGE_MAX_CHARS))
+        section_keys.append(section_key)
+        section_offsets.append(len(passages))
+    print(f"Split {len(section_keys)} sections into {len(passages)} passages "
+          f"({untrimmed} sections kept whole, heading not found) in {time.time() - start_time:.2f} seconds")
+
+    # Import lazily so the chunking above does not pay for torch
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME, device="cpu")
+    vectors_by_text, report = encode_unique_labels(passages, model, batch_size=batch_size,
+                                                   processes=processes)
+    embeddings = fan_out(passages, vectors_by_text)
+    save_build_report(report, BUILD_REPORT_PATH)
+
+    blobs = [passage.encode("utf-8") for passage in passages]
+    passage_offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    passage_offsets[1:] = np.cumsum([len(blob) for blob in blobs])
+    np.savez(
+        PASSAGE_INDEX_PATH,
+        section_keys=np.frombuffer("\n".join(section_keys).encode("utf-8"), dtype=np.uint8),
+        section_offsets=np.array(section_offsets, dtype=np.int64),
+        passage_offsets=passage_offsets,
+        passage_text=np.frombuffer(b"".join(blobs), dtype=np.uint8),
+        embeddings=embeddings.astype(np.float16)
+    )
+    size_mb = os.path.getsize(PASSAGE_INDEX_PATH) / (1024 * 1024)
+    print(f"✅ Passage index saved to {PASSAGE_INDEX_PATH} ({size_mb:.2f} MB)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chunk section text into passages and embed them")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Sentence transformer encode batch size")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Encode with this many CPU worker processes (1 = in-process)")
+    parser.add_argument("--max-chars", type=int, default=config.PASSAGE_MAX_CHARS,
+                        help="Maximum characters per passage (default: PASSAGE_MAX_CHARS in src/config.py)")
+    args = parser.parse_args()
+    build_passage_index(batch_size=args.batch_size, processes=args.processes, max_chars=args.max_chars)
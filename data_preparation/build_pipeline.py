@@ -0,0 +1,436 @@
+"""
+Single entry point for building every data artifact, from the Act PDFs to the serving files.
+
+The build scripts are modelled as a dependency graph of stages. Each stage is
+fingerprinted from its input files and the code of its scripts; a stage is skipped
+while that fingerprint and its outputs still match the last successful build.
+Independent stages run in parallel.
+
+Run from the repository root:
+    python data_preparation/build_pipeline.py                  # build everything that changed
+    python data_preparation/build_pipeline.py search_bundle    # build one target and its dependencies
+    python data_preparation/build_pipeline.py --dry-run        # show what would run
+    python data_preparation/build_pipeline.py --adopt          # record existing outputs as up to date
+
+Stages marked hand_corrected (the extracted index pages) are treated as source files
+while their outputs exist; only --regenerate-corrected runs them again.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DATA_PREPARATION_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(DATA_PREPARATION_DIR)
+BUILD_STATE_PATH = os.path.join(DATA_PREPARATION_DIR, ".build_state.json")
+
+VOLUME_1_PDF = "Migration Act 1958/Migration Act 1958 – Volume 1.pdf"
+VOLUME_2_PDF = "Migration Act 1958/Migration Act 1958 – Volume 2.pdf"
+
+
+class Stage:
+    """One build step: scripts run in order from the repository root"""
+
+    def __init__(self, name, scripts=(), inputs=(), outputs=(), deps=(), code=(),
+                 volatile_outputs=(), action=None, hand_corrected=False):
+        """
+        Args:
+            name (str): Stage name, also usable as a build target
+            scripts (list[str]): Scripts run in order with the current interpreter
+            inputs (list[str]): Files or directories the stage reads
+            outputs (list[str]): Files or directories the stage writes
+            deps (list[str]): Stages that must be built first
+            code (list[str]): Extra modules imported by the scripts, part of the fingerprint
+            volatile_outputs (list[str]): Outputs only checked for existence (e.g. databases
+                that change when opened)
+            action (callable): Python function run after the scripts
+            hand_corrected (bool): The outputs were edited by hand after generation, so
+                existing outputs are kept unless regeneration is asked for explicitly
+        """
+        self.name = name
+        self.scripts = list(scripts)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.code = list(code)
+        self.volatile_outputs = list(volatile_outputs)
+        self.action = action
+        self.hand_corrected = hand_corrected
+
+
+def publish_final_material():
+    """Copy the search tree with embed ids and the final hashmap to the serving folder"""
+    os.makedirs("final_json_searching_material", exist_ok=True)
+    with open("json_search_tree/optimized_tree_with_embed_ids.json", "r", encoding="utf-8") as f:
+        tree_with_ids = json.load(f)
+    _write_json_atomic("final_json_searching_material/final_search_tree_embed_id.json",
+                       {"Migration Act 1958": tree_with_ids})
+    shutil.copyfile("json_search_tree/final_hashmap.json",
+                    "final_json_searching_material/final_hashmap.json")
+
+
+STAGES = [
+    Stage(
+        "index_pages",
+        scripts=["data_preparation/extract_index_pages/extract_index_pages.py",
+                 "data_preparation/extract_index_pages/clean_debug_message.py",
+                 "data_preparation/extract_index_pages/validate_index_pages.py"],
+        code=["data_preparation/pdf_extraction_engine/pdf_page_engine.py"],
+        inputs=[VOLUME_1_PDF, VOLUME_2_PDF],
+        outputs=["extracted_index_pages/Volume 1/volume_1_indexes.txt",
+                 "extracted_index_pages/Volume 1/completed_volume_1_indexes.txt",
+                 "extracted_index_pages/Volume 2/volume_2_indexes.txt",
+                 "extracted_index_pages/Volume 2/completed_volume_2_indexes.txt"],
+        # The committed index pages fix headings the extraction splits or truncates
+        hand_corrected=True,
+    ),
+    Stage(
+        "content_pages",
+        scripts=["data_preparation/extract_content_pages/clean_all_page.py",
+                 "data_preparation/extract_content_pages/debug_more_clean.py"],
+        code=["data_preparation/extract_content_pages/clean_content_page.py",
+              "data_preparation/pdf_extraction_engine/pdf_page_engine.py"],
+        inputs=[VOLUME_1_PDF, VOLUME_2_PDF],
+        outputs=["Migration Act Content Pages Txt Format"],
+    ),
+    # building_tree.py writes the volume trees; the next three scripts edit them in place,
+    # so they form one stage whose outputs are always regenerated from scratch
+    Stage(
+        "tree_index",
+        deps=["index_pages"],
+        scripts=["data_preparation/building_tree_index/building_tree.py",
+                 "data_preparation/building_tree_index/add_cleaned_name.py",
+                 "data_preparation/building_tree_index/extract_section_code.py",
+                 "data_preparation/building_tree_index/reorder_metadata.py",
+                 "data_preparation/building_tree_index/merge_tree_index.py"],
+        inputs=["extracted_index_pages/Volume 1/completed_volume_1_indexes.txt",
+                "extracted_index_pages/Volume 2/completed_volume_2_indexes.txt"],
+        outputs=["json_tree_index/volume_1_tree.json",
+                 "json_tree_index/volume_2_tree.json",
+                 "json_tree_index/merged_tree.json"],
+    ),
+    Stage(
+        "search_tree",
+        deps=["tree_index"],
+        scripts=["data_preparation/building_search_tree/build_search_tree.py",
+                 "data_preparation/building_search_tree/build_final_search_tree.py",
+                 "data_preparation/building_search_tree/merge_arrival_presence_part_both_vol.py",
+                 "data_preparation/building_search_tree/build_section_hashmap.py",
+                 "data_preparation/building_search_tree/build_final_hashmap.py"],
+        inputs=["json_tree_index/merged_tree.json"],
+        outputs=["json_search_tree/all_vol_search_tree.json",
+                 "json_search_tree/final_search_tree.json",
+                 "json_search_tree/optimized_tree.json",
+                 "json_search_tree/all_vol_section_hashmap.json",
+                 "json_search_tree/final_hashmap.json"],
+    ),
+    Stage(
+        "vector_database",
+        deps=["search_tree"],
+        scripts=["data_preparation/embedding_optimized_tree/embed_save_chromadb.py"],
+        code=["data_preparation/embedding_optimized_tree/label_embedding.py"],
+        inputs=["json_search_tree/optimized_tree.json",
+                # Section weights of the centroid vectors
+                "json_search_tree/final_hashmap.json",
+                # Node types (part, division, section...) stored as metadata
+                "json_tree_index/merged_tree.json"],
+        outputs=["json_search_tree/optimized_tree_with_embed_ids.json"],
+        volatile_outputs=["vector_database"],
+    ),
+    Stage(
+        "final_material",
+        deps=["vector_database"],
+        action=publish_final_material,
+        inputs=["json_search_tree/optimized_tree_with_embed_ids.json",
+                "json_search_tree/final_hashmap.json"],
+        outputs=["final_json_searching_material/final_search_tree_embed_id.json",
+                 "final_json_searching_material/final_hashmap.json"],
+    ),
+    Stage(
+        "search_bundle",
+        deps=["final_material", "content_pages"],
+        scripts=["data_preparation/build_search_bundle/build_search_bundle.py"],
+        code=["data_preparation/embedding_optimized_tree/label_embedding.py",
+              "src/search_bundle_package/search_bundle.py"],
+        inputs=["final_json_searching_material/final_search_tree_embed_id.json",
+                "final_json_searching_material/final_hashmap.json",
+                "Migration Act Content Pages Txt Format"],
+        outputs=["final_json_searching_material/search_bundle.bin"],
+    ),
+    Stage(
+        "bm25_index",
+        deps=["final_material", "content_pages"],
+        scripts=["data_preparation/build_lexical_index/build_bm25_index.py"],
+        code=["src/lexical_search_package/bm25_index.py",
+              "data_preparation/content_page_reader/content_page_reader.py"],
+        inputs=["final_json_searching_material/final_hashmap.json",
+                "Migration Act Content Pages Txt Format"],
+        outputs=["final_json_searching_material/bm25_index.npz"],
+    ),
+    Stage(
+        "passage_index",
+        deps=["final_material", "content_pages"],
+        scripts=["data_preparation/build_passage_index/build_passage_index.py"],
+        code=["data_preparation/embedding_optimized_tree/label_embedding.py",
+              "src/passage_index_package/passage_index.py",
+              "src/config.py",
+              "data_preparation/content_page_reader/content_page_reader.py"],
+        inputs=["final_json_searching_material/final_hashmap.json",
+                "Migration Act Content Pages Txt Format"],
+        outputs=["final_json_searching_material/passage_index.npz"],
+    ),
+]
+
+
+def _write_json_atomic(path, data):
+    """Write JSON through a temporary file and rename it into place"""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _hash_path(path, digest):
+    """Feed a file, or every file under a directory in sorted order, into a digest"""
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for filename in sorted(files):
+                file_path = os.path.join(root, filename)
+                digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+                _hash_path(file_path, digest)
+    elif os.path.isfile(path):
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    else:
+        digest.update(b"<missing>")
+
+
+def fingerprint_paths(paths):
+    """sha256 over the content of the given files and directories"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode("utf-8"))
+        _hash_path(path, digest)
+    return digest.hexdigest()
+
+
+def input_fingerprint(stage):
+    """Fingerprint of everything a stage's result depends on: inputs, scripts and code"""
+    digest = hashlib.sha256(stage.name.encode("utf-8"))
+    digest.update(fingerprint_paths(stage.inputs).encode("utf-8"))
+    digest.update(fingerprint_paths(stage.scripts + stage.code).encode("utf-8"))
+    if stage.action is not None:
+        digest.update(fingerprint_paths([os.path.relpath(__file__, REPO_ROOT)]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def outputs_valid(stage, record):
+    """Outputs exist and are unchanged since they were recorded"""
+    if any(not os.path.exists(path) for path in stage.outputs + stage.volatile_outputs):
+        return False
+    return record.get("outputs") == fingerprint_paths(stage.outputs)
+
+
+class BuildPipeline:
+    """Runs stages in dependency order, skipping the ones that are still valid"""
+
+    def __init__(self, stages, state_path=BUILD_STATE_PATH, jobs=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        self.jobs = jobs or os.cpu_count() or 1
+        self.state = self._load_state()
+        self._state_lock = threading.Lock()
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _record(self, stage, fingerprint, seconds):
+        with self._state_lock:
+            self.state[stage.name] = {
+                "inputs": fingerprint,
+                "outputs": fingerprint_paths(stage.outputs),
+                "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "seconds": round(seconds, 2)
+            }
+            _write_json_atomic(self.state_path, self.state)
+
+    def resolve(self, targets):
+        """All stages needed for the targets, dependencies first"""
+        ordered = []
+        visiting = set()
+
+        def visit(name):
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'. Stages: {', '.join(self.stages)}")
+            if name in ordered:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            ordered.append(name)
+
+        for target in targets or list(self.stages):
+            visit(target)
+        return ordered
+
+    def keeps_corrections(self, stage, regenerate_corrected=False):
+        """A hand-corrected stage whose outputs exist is used as a source, not rebuilt"""
+        return (stage.hand_corrected and not regenerate_corrected
+                and all(os.path.exists(path) for path in stage.outputs))
+
+    def is_up_to_date(self, stage):
+        record = self.state.get(stage.name)
+        return (record is not None
+                and record.get("inputs") == input_fingerprint(stage)
+                and outputs_valid(stage, record))
+
+    def _run_stage(self, stage):
+        """Run the scripts and action of one stage, then record its fingerprints"""
+        start_time = time.time()
+        fingerprint = input_fingerprint(stage)
+        for script in stage.scripts:
+            print(f"▶️  [{stage.name}] python {script}")
+            result = subprocess.run([sys.executable, script], cwd=REPO_ROOT)
+            if result.returncode != 0:
+                raise RuntimeError(f"{script} exited with code {result.returncode}")
+        if stage.action is not None:
+            print(f"▶️  [{stage.name}] {stage.action.__name__}()")
+            stage.action()
+        self._record(stage, fingerprint, time.time() - start_time)
+        return time.time() - start_time
+
+    def adopt(self, targets=None):
+        """Record the current outputs as built, without running anything"""
+        for name in self.resolve(targets):
+            stage = self.stages[name]
+            if all(os.path.exists(path) for path in stage.outputs + stage.volatile_outputs):
+                self._record(stage, input_fingerprint(stage), 0.0)
+                print(f"📌 Adopted {name}")
+            else:
+                print(f"⚠️ Cannot adopt {name}: some outputs are missing")
+
+    def build(self, targets=None, force=False, dry_run=False, regenerate_corrected=False):
+        """
+        Build the targets (all stages by default).
+
+        Args:
+            targets (list[str]): Stages to build with their dependencies
+            force (bool): Rebuild stages even if they are up to date
+            dry_run (bool): Only show what would run
+            regenerate_corrected (bool): Also rebuild hand-corrected stages, overwriting
+                their corrections
+
+        Returns:
+            bool: True if every needed stage is up to date or built successfully
+        """
+        names = self.resolve(targets)
+        done = set()
+        failed = set()
+        running = {}
+        pending = list(names)
+        # Only a dry run needs this: a real rebuild changes the inputs of the stages after it
+        would_rebuild = set()
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            while pending or running:
+                # Schedule every stage whose dependencies have finished
+                for name in list(pending):
+                    stage = self.stages[name]
+                    if any(dep in failed for dep in stage.deps if dep in names):
+                        pending.remove(name)
+                        failed.add(name)
+                        print(f"⏭️  {name}: skipped, a dependency failed")
+                        continue
+                    if not all(dep in done for dep in stage.deps if dep in names):
+                        continue
+                    pending.remove(name)
+                    if self.keeps_corrections(stage, regenerate_corrected):
+                        print(f"🔒 {name}: keeping the hand-corrected outputs "
+                              f"(--regenerate-corrected overwrites them)")
+                        done.add(name)
+                        continue
+                    upstream_rebuilt = any(dep in would_rebuild for dep in stage.deps)
+                    if not force and not upstream_rebuilt and self.is_up_to_date(stage):
+                        print(f"✅ {name}: up to date")
+                        done.add(name)
+                        continue
+                    if dry_run:
+                        print(f"🔨 {name}: would run")
+                        done.add(name)
+                        would_rebuild.add(name)
+                        continue
+                    running[executor.submit(self._run_stage, stage)] = name
+
+                if not running:
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        seconds = future.result()
+                        print(f"✅ {name}: built in {seconds:.2f} seconds")
+                        done.add(name)
+                    except Exception as e:
+                        print(f"❌ {name}: {e}")
+                        failed.add(name)
+
+        return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the Migration Act search artifacts")
+    parser.add_argument("targets", nargs="*", help="Stages to build (default: all)")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if up to date")
+    parser.add_argument("--regenerate-corrected", action="store_true",
+                        help="Also rebuild hand-corrected stages (index_pages), losing their corrections")
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would run")
+    parser.add_argument("--adopt", action="store_true",
+                        help="Record existing outputs as up to date without running")
+    parser.add_argument("--jobs", type=int, default=None, help="Stages to run in parallel")
+    parser.add_argument("--list", action="store_true", help="List stages and their status")
+    args = parser.parse_args()
+
+    os.chdir(REPO_ROOT)
+    pipeline = BuildPipeline(STAGES, jobs=args.jobs)
+
+    if args.list:
+        for name in pipeline.resolve(None):
+            stage = pipeline.stages[name]
+            if pipeline.keeps_corrections(stage):
+                status = "hand-corrected, kept"
+            else:
+                status = "up to date" if pipeline.is_up_to_date(stage) else "stale"
+            deps = f" (after {', '.join(stage.deps)})" if stage.deps else ""
+            print(f"{name}: {status}{deps}")
+        return
+
+    if args.adopt:
+        pipeline.adopt(args.targets)
+        return
+
+    start_time = time.time()
+    ok = pipeline.build(args.targets, force=args.force, dry_run=args.dry_run,
+                        regenerate_corrected=args.regenerate_corrected)
+    print(f"{'🎉 Build finished' if ok else '❌ Build failed'} in {time.time() - start_time:.2f} seconds")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
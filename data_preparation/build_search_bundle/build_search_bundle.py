@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import re
+import sys
+
+# The bundle format lives with its loader in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src"))
+from search_bundle_package.search_bundle import write_search_bundle
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "embedding_optimized_tree"))
+from label_embedding import (DEFAULT_BATCH_SIZE, compute_centroids, encode_unique_labels,
+                             fan_out, save_build_report)
+
+SEARCH_TREE_EMBED_ID_PATH = "final_json_searching_material/final_search_tree_embed_id.json"
+FINAL_HASHMAP_PATH = "final_json_searching_material/final_hashmap.json"
+CONTENT_PAGES_BASE = "Migration Act Content Pages Txt Format"
+SEARCH_BUNDLE_PATH = "final_json_searching_material/search_bundle.bin"
+BUILD_REPORT_PATH = "final_json_searching_material/search_bundle_build_report.json"
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+def collect_renamed_nodes(obj, nodes):
+    """
+    Collect every renamed node (dict keys and list strings) in tree order.
+    The order matches the embed ids assigned by embed_save_chromadb.py.
+    """
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            nodes.append(k)
+            collect_renamed_nodes(v, nodes)
+    elif isinstance(obj, list):
+        for item in obj:
+            collect_renamed_nodes(item, nodes)
+    elif isinstance(obj, str):
+        nodes.append(obj)
+
+def extract_text_for_embed(tree_node):
+    '''
+        The pure name for embedding is always the first term of the node
+    '''
+    return tree_node.split("_")[0]
+
+def load_volume_pages(content_base):
+    """
+    Read every cleaned page of every volume, in page order.
+    Returns a dict like {"volume 1": [page_1_text, page_2_text, ...]}
+    """
+    pages = {}
+    for volume in sorted(os.listdir(content_base)):
+        volume_dir = os.path.join(content_base, volume)
+        if not os.path.isdir(volume_dir):
+            continue
+        page_numbers = sorted(
+            int(m.group(1)) for m in
+            (re.match(r"^page_(\d+)\.txt$", f) for f in os.listdir(volume_dir)) if m
+        )
+        if not page_numbers:
+            continue
+        volume_pages = []
+        for page in range(1, page_numbers[-1] + 1):
+            page_path = os.path.join(volume_dir, f"page_{page}.txt")
+            if os.path.exists(page_path):
+                with open(page_path, "r", encoding="utf-8") as f:
+                    volume_pages.append(f.read())
+            else:
+                print(f"⚠️ Missing page file, storing empty page: {page_path}")
+                volume_pages.append("")
+        pages[volume] = volume_pages
+    return pages
+
+def build_search_bundle(batch_size=DEFAULT_BATCH_SIZE, processes=1):
+    with open(SEARCH_TREE_EMBED_ID_PATH, "r", encoding="utf-8") as f:
+        search_tree = json.load(f)
+    with open(FINAL_HASHMAP_PATH, "r", encoding="utf-8") as f:
+        hashmap = json.load(f)
+
+    node_names = []
+    collect_renamed_nodes(search_tree["Migration Act 1958"], node_names)
+    print(f"Nodes to embed: {len(node_names)}")
+
+    # Import lazily so the rest of the build does not pay for torch
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME, device="cpu")
+    labels = [extract_text_for_embed(n) for n in node_names]
+    vectors_by_label, report = encode_unique_labels(labels, model, batch_size=batch_size,
+                                                    processes=processes)
+    embeddings = fan_out(labels, vectors_by_label)
+    save_build_report(report, BUILD_REPORT_PATH)
+    centroids = compute_centroids(search_tree["Migration Act 1958"], node_names, embeddings, hashmap)
+
+    pages = load_volume_pages(CONTENT_PAGES_BASE)
+    for volume, volume_pages in pages.items():
+        print(f"Packed {len(volume_pages)} pages of {volume}")
+
+    manifest = write_search_bundle(SEARCH_BUNDLE_PATH, search_tree, hashmap, node_names,
+                                   embeddings, pages, EMBEDDING_MODEL_NAME, centroids=centroids)
+    size_mb = os.path.getsize(SEARCH_BUNDLE_PATH) / (1024 * 1024)
+    print(f"✅ Search bundle v{manifest['format_version']} saved to {SEARCH_BUNDLE_PATH} ({size_mb:.2f} MB)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the single search bundle")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Sentence transformer encode batch size")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Encode with this many CPU worker processes (1 = in-process)")
+    args = parser.parse_args()
+    build_search_bundle(batch_size=args.batch_size, processes=args.processes)
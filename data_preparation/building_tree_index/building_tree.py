@@ -3,10 +3,12 @@ import re
 from typing import Dict, List, Any
 import os
 
-def parse_migration_act_contents(file_path: str) -> Dict[str, Any]:
+def parse_migration_act_contents(file_path: str, volume: int = None, last_page: int = None) -> Dict[str, Any]:
     """
     Parse the Migration Act contents into a hierarchical tree structure
     Also extracts start and end page numbers for each section
+    When a volume number is given, the root is tagged with it (needed by the search tree build)
+    When the last content page is given, it becomes the end page of the last section
     """
     # Read the content from the file
     with open(file_path, 'r', encoding='utf-8') as file:
@@ -20,6 +22,13 @@ def parse_migration_act_contents(file_path: str) -> Dict[str, Any]:
         "type": "root",
         "children": []
     }
+    if volume is not None:
+        tree = {
+            "name": f"Contents - Volume {volume}",
+            "type": "root",
+            "volume": volume,
+            "children": []
+        }
     
     current_part = None
     current_division = None
@@ -109,7 +118,9 @@ def parse_migration_act_contents(file_path: str) -> Dict[str, Any]:
             next_start = all_sections[i + 1]["start_page"]
             if next_start is not None and section["start_page"] is not None:
                 section["end_page"] = next_start
-        # Last section doesn't have an end page calculated
+        elif last_page is not None:
+            # Last section runs to the end of the volume
+            section["end_page"] = last_page
     
     return tree
 
@@ -125,6 +136,10 @@ if __name__ == "__main__":
     file_path_volume_1 = 'extracted_index_pages/Volume 1/completed_volume_1_indexes.txt'
     file_path_volume_2 = 'extracted_index_pages/Volume 2/completed_volume_2_indexes.txt'
     
+    # Last content page of each volume (see extract_content_pages/clean_all_page.py)
+    last_content_page_volume_1 = 537
+    last_content_page_volume_2 = 311
+    
     # Output file paths
     output_file_volume_1 = 'json_tree_index/volume_1_tree.json'
     output_file_volume_2 = 'json_tree_index/volume_2_tree.json'
@@ -136,7 +151,8 @@ if __name__ == "__main__":
     # Process Volume 1
     if os.path.exists(file_path_volume_1):
         print("Processing Volume 1...")
-        tree_structure_volume_1 = parse_migration_act_contents(file_path_volume_1)
+        tree_structure_volume_1 = parse_migration_act_contents(file_path_volume_1, volume=1,
+                                                               last_page=last_content_page_volume_1)
         
         # Save to JSON file
         with open(output_file_volume_1, 'w', encoding='utf-8') as f:
@@ -149,7 +165,8 @@ if __name__ == "__main__":
     # Process Volume 2
     if os.path.exists(file_path_volume_2):
         print("Processing Volume 2...")
-        tree_structure_volume_2 = parse_migration_act_contents(file_path_volume_2)
+        tree_structure_volume_2 = parse_migration_act_contents(file_path_volume_2, volume=2,
+                                                               last_page=last_content_page_volume_2)
         
         # Save to JSON file
         with open(output_file_volume_2, 'w', encoding='utf-8') as f:
@@ -0,0 +1,19 @@
+import os
+
+CONTENT_PAGES_BASE = "Migration Act Content Pages Txt Format"
+
+def read_section_text(section_key, section_data):
+    """
+    Read the cleaned pages of a section, using the page range from the hashmap.
+    section_key looks like "Short title_1_Volume 1"
+    """
+    volume = section_key.split("_")[-1].lower()  # "Volume 1" -> "volume 1"
+    pages = []
+    for page in range(section_data["start_page"], section_data["end_page"] + 1):
+        page_path = os.path.join(CONTENT_PAGES_BASE, volume, f"page_{page}.txt")
+        if os.path.exists(page_path):
+            with open(page_path, "r", encoding="utf-8") as f:
+                pages.append(f.read())
+        else:
+            print(f"⚠️ Page file not found: {page_path}")
+    return "\n".join(pages)
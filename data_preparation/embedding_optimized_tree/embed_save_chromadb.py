@@ -1,21 +1,63 @@
 # --- Imports
-from sentence_transformers import SentenceTransformer
-import torch, os
+import argparse
+import hashlib
+import json
+import os
+import time
+import numpy as np
 from chromadb import PersistentClient
 from chromadb.config import Settings
+from label_embedding import DEFAULT_BATCH_SIZE, compute_centroids, encode_unique_labels, save_build_report
 
 # --- Setup
-import json
-device = "cuda" if torch.cuda.is_available() else "cpu"
-print(f"Using device: {device}")
-model = SentenceTransformer("all-MiniLM-L6-v2", device=device)
+MODEL_NAME = "all-MiniLM-L6-v2"
+# Bump when extract_text_for_embed changes, so every stored vector is refreshed
+EMBED_TEXT_RULE_VERSION = 1
+UPSERT_BATCH_SIZE = 1000
+# Node types come from the merged tree index, looked up by cleaned name
+MERGED_TREE_INDEX_PATH = "json_tree_index/merged_tree.json"
+# Parent id of the top level nodes, and the node type assumed at each depth when
+# the cleaned name is missing from the merged tree or shared by several types
+ROOT_PARENT_ID = "root"
+DEPTH_NODE_TYPES = ["part", "division", "subdivision"]
+# Section page ranges, used to weight the descendant centroids
+SECTION_HASHMAP_PATH = "json_search_tree/final_hashmap.json"
+CENTROID_COLLECTION_NAME = "my_collection_centroids"
 
 persist_dir = "vector_database"
+build_report_path = os.path.join(persist_dir, "embedding_build_report.json")
 client = PersistentClient(
     path=persist_dir,
     settings=Settings(anonymized_telemetry=False)
 )
 coll = client.get_or_create_collection("my_collection")
+# Descendant centroid of every node, same ids and metadata as the title vectors
+centroid_coll = client.get_or_create_collection(CENTROID_COLLECTION_NAME)
+
+# The model (and torch) is only loaded when some label actually needs embedding
+model = None
+
+def get_model():
+    """Load the sentence transformer on first use"""
+    global model
+    if model is None:
+        import torch
+        from sentence_transformers import SentenceTransformer
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        print(f"Using device: {device}")
+        model = SentenceTransformer(MODEL_NAME, device=device)
+    return model
+
+def model_fingerprint():
+    """
+    Identify the embedding space without loading the model: the model name plus the
+    version of the text extraction rule. Vectors stored under another fingerprint are stale.
+    """
+    return hashlib.sha256(f"{MODEL_NAME}|{EMBED_TEXT_RULE_VERSION}".encode("utf-8")).hexdigest()[:16]
+
+def label_hash(label):
+    """Stable content hash of the text that gets embedded for a node"""
+    return hashlib.sha256(label.encode("utf-8")).hexdigest()[:16]
 
 def extract_text_for_embed(tree_node):
     '''
@@ -35,6 +77,85 @@ def extract_id_from_node(tree_node):
         return parts[-1]  # Return the last part which should be the ID
     return tree_node  # Fallback if no underscore found
 
+def load_node_types(merged_tree_path):
+    """
+    Map every cleaned name in the merged tree index to the set of node types it is used for.
+    """
+    with open(merged_tree_path, "r", encoding="utf-8") as f:
+        merged_tree = json.load(f)
+    types_by_name = {}
+    def walk(node):
+        for child in node.get("children", []):
+            if not isinstance(child, dict):
+                continue
+            if child.get("cleaned_name"):
+                types_by_name.setdefault(child["cleaned_name"], set()).add(child.get("type"))
+            walk(child)
+    walk(merged_tree)
+    return types_by_name
+
+def collect_node_topology(renamed_tree, types_by_name):
+    """
+    Work out where every renamed node sits in the tree, for the vector metadata.
+    
+    Returns:
+        dict: {node id: {"parent_id", "depth", "node_type", "section_code", "volume"}}
+              where parent_id is the id of the parent node ("root" for the top level).
+              Containers get the volume of their sections, or "" when they span both volumes.
+    """
+    topology = {}
+    def is_renamed(node):
+        try:
+            int(node.split("_")[-1])
+            return "_" in node
+        except ValueError:
+            return False
+    
+    def add_section(node, parent_id, depth):
+        # Section nodes look like "Short title_1_Volume 1_1"
+        parts = node.split("_")
+        section_code = parts[-3] if len(parts) >= 4 else ""
+        volume = parts[-2] if len(parts) >= 4 else ""
+        topology[extract_id_from_node(node)] = {
+            "parent_id": parent_id, "depth": depth, "node_type": "section",
+            "section_code": section_code, "volume": volume
+        }
+        return {volume}
+    
+    def walk(obj, parent_id, depth):
+        """Record the children of obj and return the volumes of the sections below it"""
+        volumes = set()
+        if isinstance(obj, list):
+            for item in obj:
+                if isinstance(item, str) and is_renamed(item):
+                    volumes |= add_section(item, parent_id, depth)
+        elif isinstance(obj, dict):
+            for k, v in obj.items():
+                if not is_renamed(k):
+                    volumes |= walk(v, parent_id, depth)
+                    continue
+                node_id = extract_id_from_node(k)
+                if not v:
+                    # An empty container is a section sitting directly under its parent
+                    volumes |= add_section(k, parent_id, depth)
+                    continue
+                node_types = types_by_name.get(k.rsplit("_", 1)[0], set())
+                if len(node_types) == 1:
+                    node_type = next(iter(node_types))
+                else:
+                    node_type = DEPTH_NODE_TYPES[min(depth, len(DEPTH_NODE_TYPES) - 1)]
+                child_volumes = walk(v, node_id, depth + 1)
+                topology[node_id] = {
+                    "parent_id": parent_id, "depth": depth, "node_type": node_type,
+                    "section_code": "",
+                    "volume": next(iter(child_volumes)) if len(child_volumes) == 1 else ""
+                }
+                volumes |= child_volumes
+        return volumes
+    
+    walk(renamed_tree, ROOT_PARENT_ID, 0)
+    return topology
+
 def traverse_and_rename(obj, id_counter):
     """
     Recursively traverse the JSON structure and append embedID to every string node.
@@ -52,7 +173,8 @@ def traverse_and_rename(obj, id_counter):
     else:
         return obj
 
-def embed_json_nodes_and_save(json_path, limit=None, save_json_path=None):
+def embed_json_nodes_and_save(json_path, limit=None, save_json_path=None,
+                              batch_size=DEFAULT_BATCH_SIZE, processes=1):
     # Load JSON
     with open(json_path, "r", encoding="utf-8") as f:
         data = json.load(f)
@@ -177,26 +299,162 @@ def embed_json_nodes_and_save(json_path, limit=None, save_json_path=None):
     # Extract texts for embedding and IDs for storage
     embed_texts = [extract_text_for_embed(n) for n in renamed_nodes]
     embed_ids = [extract_id_from_node(n) for n in renamed_nodes]  # Use the ID number, not the text
+    embed_hashes = [label_hash(t) for t in embed_texts]
+    fingerprint = model_fingerprint()
+    
+    # Parent id, depth, node type, section code and volume of every node,
+    # so the searcher can run a filtered nearest-neighbour query per tree level
+    topology = collect_node_topology(new_data, load_node_types(MERGED_TREE_INDEX_PATH))
+    embed_metadatas = [
+        {"label_hash": node_hash, "model_fingerprint": fingerprint, **topology[node_id]}
+        for node_id, node_hash in zip(embed_ids, embed_hashes)
+    ]
     
     print(f"Sample embed_texts: {embed_texts[:5]}")
     print(f"Sample embed_ids: {embed_ids[:5]}")
     
-    # Embed
-    embeddings = model.encode(embed_texts, convert_to_numpy=True, show_progress_bar=True)
+    sync_collection(renamed_nodes, embed_texts, embed_ids, embed_hashes, embed_metadatas,
+                    fingerprint, batch_size=batch_size, processes=processes)
     
-    # Add to DB
-    coll.add(
-        embeddings=embeddings.tolist(),
-        documents=renamed_nodes,  # Store the full renamed node
-        ids=embed_ids  # Use the unique numeric IDs
-    )
-    print(f"✅ Embedded {len(embed_ids)} nodes. Data added to DB.")
+    with open(SECTION_HASHMAP_PATH, "r", encoding="utf-8") as f:
+        hashmap = json.load(f)
+    sync_centroid_collection(new_data, renamed_nodes, embed_ids, embed_metadatas, hashmap)
+
+def sync_collection(renamed_nodes, embed_texts, embed_ids, embed_hashes, embed_metadatas,
+                    fingerprint, batch_size=DEFAULT_BATCH_SIZE, processes=1):
+    """
+    Bring the collection in line with the renamed tree, embedding only what changed.
+    
+    Record ids stay the numeric node ids the searcher looks up. Each record carries the
+    content hash of its label, the model fingerprint and its place in the tree, so a record
+    is skipped when all of them still match, and a vector already stored for the same label
+    is reused instead of re-encoded (a node that only moved in the tree is never re-embedded).
+    """
+    start_time = time.time()
+    existing = coll.get(include=["metadatas", "documents"])
+    existing_records = {
+        record_id: (document, metadata or {})
+        for record_id, document, metadata in zip(existing["ids"], existing["documents"], existing["metadatas"])
+    }
+    
+    # Which nodes are new or changed, and which stored vectors can be reused per label
+    reusable_ids_by_hash = {}
+    for record_id, (_, metadata) in existing_records.items():
+        if metadata.get("model_fingerprint") == fingerprint and "label_hash" in metadata:
+            reusable_ids_by_hash.setdefault(metadata["label_hash"], record_id)
+    
+    changed = []
+    for i, (node, node_id, metadata) in enumerate(zip(renamed_nodes, embed_ids, embed_metadatas)):
+        record = existing_records.get(node_id)
+        if record is not None and record[0] == node and record[1] == metadata:
+            continue
+        changed.append(i)
+    
+    current_ids = set(embed_ids)
+    stale_ids = [record_id for record_id in existing_records if record_id not in current_ids]
+    
+    print(f"Up to date: {len(renamed_nodes) - len(changed)}, to upsert: {len(changed)}, stale: {len(stale_ids)}")
+    
+    reuse_ids = []
+    to_encode = []
+    encode_report = {}
+    if changed:
+        # Reuse vectors of labels already embedded under the same fingerprint
+        vectors_by_hash = {}
+        reuse_ids = sorted({reusable_ids_by_hash[embed_hashes[i]] for i in changed
+                            if embed_hashes[i] in reusable_ids_by_hash})
+        if reuse_ids:
+            reused = coll.get(ids=reuse_ids, include=["embeddings", "metadatas"])
+            for embedding, metadata in zip(reused["embeddings"], reused["metadatas"]):
+                vectors_by_hash[metadata["label_hash"]] = [float(x) for x in embedding]
+        
+        # Encode each distinct label we have never seen exactly once
+        to_encode = [embed_texts[i] for i in changed if embed_hashes[i] not in vectors_by_hash]
+        if to_encode:
+            vectors_by_label, encode_report = encode_unique_labels(
+                to_encode, get_model(), batch_size=batch_size, processes=processes)
+            for text, embedding in vectors_by_label.items():
+                vectors_by_hash[label_hash(text)] = embedding.tolist()
+            to_encode = list(vectors_by_label)
+        print(f"Reused {len(reuse_ids)} stored vectors, encoded {len(to_encode)} new labels")
+        
+        # Upsert in batches: never fails or duplicates when ids already exist
+        for start in range(0, len(changed), UPSERT_BATCH_SIZE):
+            batch = changed[start:start + UPSERT_BATCH_SIZE]
+            coll.upsert(
+                ids=[embed_ids[i] for i in batch],
+                embeddings=[vectors_by_hash[embed_hashes[i]] for i in batch],
+                documents=[renamed_nodes[i] for i in batch],  # Store the full renamed node
+                metadatas=[embed_metadatas[i] for i in batch]
+            )
+    
+    if stale_ids:
+        coll.delete(ids=stale_ids)
+    
+    print(f"✅ Collection in sync with {len(embed_ids)} nodes ({time.time() - start_time:.2f} seconds)")
+    
+    report = {
+        "total_labels": len(embed_texts),
+        "unique_labels": len(set(embed_texts)),
+        "duplicate_labels_skipped": len(embed_texts) - len(set(embed_texts)),
+        "upserted_records": len(changed),
+        "reused_vectors": len(reuse_ids),
+        "encoded_labels": len(to_encode),
+        "deleted_records": len(stale_ids),
+        "batch_size": batch_size,
+        "processes": processes,
+        "encode_seconds": encode_report.get("encode_seconds", 0.0),
+        "labels_per_second": encode_report.get("labels_per_second"),
+        "total_seconds": round(time.time() - start_time, 4)
+    }
+    save_build_report(report, build_report_path)
+
+
+def sync_centroid_collection(renamed_tree, renamed_nodes, embed_ids, embed_metadatas, hashmap):
+    """
+    Rebuild the centroid collection from the title vectors now stored in the main collection.
+    
+    Centroids are cheap to recompute (no model involved), so every record is rewritten.
+    """
+    start_time = time.time()
+    stored = coll.get(ids=embed_ids, include=["embeddings"])
+    vector_by_id = dict(zip(stored["ids"], stored["embeddings"]))
+    missing = [node_id for node_id in embed_ids if node_id not in vector_by_id]
+    if missing:
+        print(f"❌ {len(missing)} nodes have no stored vector, centroids not updated")
+        return
+    
+    embeddings = np.array([vector_by_id[node_id] for node_id in embed_ids], dtype=np.float32)
+    centroids = compute_centroids(renamed_tree, renamed_nodes, embeddings, hashmap)
+    for start in range(0, len(embed_ids), UPSERT_BATCH_SIZE):
+        end = start + UPSERT_BATCH_SIZE
+        centroid_coll.upsert(
+            ids=embed_ids[start:end],
+            embeddings=centroids[start:end].tolist(),
+            documents=renamed_nodes[start:end],
+            metadatas=embed_metadatas[start:end]
+        )
+    
+    current_ids = set(embed_ids)
+    stale_ids = [record_id for record_id in centroid_coll.get(include=[])["ids"] if record_id not in current_ids]
+    if stale_ids:
+        centroid_coll.delete(ids=stale_ids)
+    print(f"✅ Centroid collection in sync with {len(embed_ids)} nodes ({time.time() - start_time:.2f} seconds)")
+
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embed the optimized search tree into ChromaDB")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Sentence transformer encode batch size")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Encode with this many CPU worker processes (1 = in-process)")
+    args = parser.parse_args()
 
-# --- Example usage: embed first 5 nodes and save modified JSON
-json_path = "json_search_tree/optimized_tree.json"
-save_json_path = "json_search_tree/optimized_tree_with_ids.json"
-embed_json_nodes_and_save(json_path, save_json_path=save_json_path)
+    # --- Rename the optimized tree with embed ids and sync the vector database
+    json_path = "json_search_tree/optimized_tree.json"
+    save_json_path = "json_search_tree/optimized_tree_with_embed_ids.json"
+    embed_json_nodes_and_save(json_path, save_json_path=save_json_path,
+                              batch_size=args.batch_size, processes=args.processes)
 
-# --- List what got written
-print("On-disk files:", os.listdir(persist_dir))
\ No newline at end of file
+    # --- List what got written
+    print("On-disk files:", os.listdir(persist_dir))
@@ -0,0 +1,112 @@
+import json
+import os
+import time
+import numpy as np
+
+DEFAULT_BATCH_SIZE = 128
+
+def encode_unique_labels(labels, model, batch_size=DEFAULT_BATCH_SIZE, processes=1):
+    """
+    Embed each distinct label once.
+    Args:
+        labels (list[str]): Labels to embed, duplicates allowed (e.g. one per tree node)
+        model: A loaded SentenceTransformer
+        batch_size (int): Encode batch size
+        processes (int): Number of CPU worker processes; 1 encodes in this process
+    Returns:
+        tuple: ({label: vector}, report dict with unique/total counts and throughput)
+    """
+    unique_labels = sorted(set(labels))
+    start_time = time.time()
+    if not unique_labels:
+        embeddings = np.zeros((0, 0), dtype=np.float32)
+    elif processes > 1:
+        pool = model.start_multi_process_pool(target_devices=["cpu"] * processes)
+        try:
+            embeddings = model.encode_multi_process(unique_labels, pool, batch_size=batch_size)
+        finally:
+            model.stop_multi_process_pool(pool)
+    else:
+        embeddings = model.encode(unique_labels, batch_size=batch_size,
+                                  convert_to_numpy=True, show_progress_bar=True)
+    elapsed = time.time() - start_time
+
+    report = {
+        "total_labels": len(labels),
+        "unique_labels": len(unique_labels),
+        "duplicate_labels_skipped": len(labels) - len(unique_labels),
+        "batch_size": batch_size,
+        "processes": processes,
+        "encode_seconds": round(elapsed, 4),
+        "labels_per_second": round(len(unique_labels) / elapsed, 2) if elapsed > 0 else None
+    }
+    return dict(zip(unique_labels, embeddings)), report
+
+def fan_out(labels, vectors_by_label):
+    """Stack the vector of every label, in order, into one matrix"""
+    return np.stack([vectors_by_label[label] for label in labels])
+
+def save_build_report(report, report_path):
+    """Print the embedding build report and save it as JSON"""
+    print(f"📊 Labels: {report['total_labels']} total, {report['unique_labels']} unique "
+          f"({report['duplicate_labels_skipped']} duplicates skipped)")
+    if report.get("labels_per_second") is not None:
+        print(f"📊 Encoded in {report['encode_seconds']:.2f} seconds "
+              f"({report['labels_per_second']:.1f} labels/s, batch size {report['batch_size']}, "
+              f"{report['processes']} process(es))")
+    directory = os.path.dirname(report_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Build report saved to {report_path}")
+
+def section_weight(section_node, hashmap):
+    """Number of content pages a section spans, 1 when its page range is unknown"""
+    pages = hashmap.get(section_node.rsplit("_", 1)[0], {})
+    start_page, end_page = pages.get("start_page"), pages.get("end_page")
+    if start_page is None or end_page is None or end_page < start_page:
+        return 1.0
+    return float(end_page - start_page + 1)
+
+def compute_centroids(tree_root, node_names, embeddings, hashmap):
+    """
+    Describe every internal node by what lies beneath it: the centroid of its descendant
+    section-label embeddings, weighted by how many pages each section spans.
+    Args:
+        tree_root (dict): Renamed tree content below the root (parts as keys)
+        node_names (list[str]): Renamed nodes, one per embedding row
+        embeddings (numpy.ndarray): Title embeddings, one row per node
+        hashmap (dict): Section hashmap with start_page / end_page per section
+    Returns:
+        numpy.ndarray: Unit-length centroids aligned with node_names; sections keep their
+        own (normalized) title vector
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    centroids = vectors / np.where(norms == 0, 1, norms)
+    row_by_name = {name: row for row, name in enumerate(node_names)}
+
+    def walk(content):
+        """Return the weighted sum of the section vectors below content"""
+        total = np.zeros(centroids.shape[1], dtype=np.float32)
+        if isinstance(content, list):
+            children = [(name, None) for name in content]
+        else:
+            children = content.items()
+        for child_name, child_content in children:
+            row = row_by_name.get(child_name)
+            if not child_content:
+                # A section, in a list or sitting directly under its parent
+                if row is not None:
+                    total += section_weight(child_name, hashmap) * centroids[row]
+                continue
+            child_total = walk(child_content)
+            norm = np.linalg.norm(child_total)
+            if row is not None and norm > 0:
+                centroids[row] = child_total / norm
+            total += child_total
+        return total
+
+    walk(tree_root)
+    return centroids
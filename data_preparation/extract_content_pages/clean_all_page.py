@@ -1,5 +1,4 @@
-# import the function for extracting the page --> cleaning the extracted page
-from extract_content_page import extract_text_from_pdf
+# import the function for cleaning the extracted page
 from clean_content_page import clean_extracted_text
 
 # Volume 1 Start Page in Pdf / Actual 
@@ -26,37 +25,57 @@ VOLUME_2_PDF_REAL_PAGE_GAP = 18
 VOLUME_1_CONTENT_PAGE_TXT_FORMAT_PATH = 'Migration Act Content Pages Txt Format/volume 1'
 VOLUME_2_CONTENT_PAGE_TXT_FORMAT_PATH = 'Migration Act Content Pages Txt Format/volume 2'
 
-# import os for directory creation and file saving
+# import os for directory creation, argparse for the worker count
 import os
+import sys
+import argparse
 
-def extract_clean_save_pages(pdf_path, start_page, end_page, output_dir, page_gap_real_pdf):
+# The shared single-open, process-parallel PDF page engine
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pdf_extraction_engine"))
+from pdf_page_engine import extract_pages, write_text_atomic
+
+def clean_page(text):
+    """
+    Clean one extracted page; runs inside the worker processes.
+    """
+    return clean_extracted_text(text) if text else "[No text extracted]"
+
+def extract_clean_save_pages(pdf_path, start_page, end_page, output_dir, page_gap_real_pdf, workers=None):
     """
     Extracts, cleans, and saves each page in the given range from the PDF.
+    The PDF is parsed once per worker process instead of once per page.
     Args:
         pdf_path (str): Path to the PDF file.
         start_page (int): 1-based start page (inclusive).
         end_page (int): 1-based end page (inclusive).
         output_dir (str): Directory to save the cleaned .txt files.
+        workers (int): Number of worker processes, defaults to the CPU count.
     """
     os.makedirs(output_dir, exist_ok=True)
+    cleaned_pages, errors = extract_pages(pdf_path, start_page, end_page,
+                                          transform=clean_page, workers=workers)
     for page_num in range(start_page, end_page + 1):
-        try:
-            text = extract_text_from_pdf(pdf_path, page_num)
-            cleaned = clean_extracted_text(text) if text else "[No text extracted]"
-            output_filename = f"page_{page_num - page_gap_real_pdf}.txt"
-            output_path = os.path.join(output_dir, output_filename)
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(cleaned)
-            print(f"Saved cleaned page {page_num - page_gap_real_pdf} to {output_path}")
-        except Exception as e:
-            print(f"Error processing page {page_num}: {e}")
-
-# Call the function
+        if page_num in errors:
+            print(f"Error processing page {page_num}: {errors[page_num]}")
+            continue
+        output_filename = f"page_{page_num - page_gap_real_pdf}.txt"
+        output_path = os.path.join(output_dir, output_filename)
+        write_text_atomic(output_path, cleaned_pages[page_num])
+        print(f"Saved cleaned page {page_num - page_gap_real_pdf} to {output_path}")
+
 VOLUME_1_PDF_PATH = "Migration Act 1958/Migration Act 1958 – Volume 1.pdf"
 VOLUME_2_PDF_PATH = "Migration Act 1958/Migration Act 1958 – Volume 2.pdf"
-extract_clean_save_pages(VOLUME_1_PDF_PATH, VOLUME_1_REAL_START_CONTENT_PAGE, 
-                         VOLUME_1_REAL_END_CONTENT_PAGE, VOLUME_1_CONTENT_PAGE_TXT_FORMAT_PATH,
-                         VOLUME_1_PDF_REAL_PAGE_GAP)
-extract_clean_save_pages(VOLUME_2_PDF_PATH, VOLUME_2_REAL_START_CONTENT_PAGE, 
-                         VOLUME_2_REAL_END_CONTENT_PAGE, VOLUME_2_CONTENT_PAGE_TXT_FORMAT_PATH,
-                         VOLUME_2_PDF_REAL_PAGE_GAP)
+
+# Call the function (guarded, worker processes re-import this module)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract, clean and save the content pages of both volumes")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes (defaults to the CPU count)")
+    args = parser.parse_args()
+
+    extract_clean_save_pages(VOLUME_1_PDF_PATH, VOLUME_1_REAL_START_CONTENT_PAGE, 
+                             VOLUME_1_REAL_END_CONTENT_PAGE, VOLUME_1_CONTENT_PAGE_TXT_FORMAT_PATH,
+                             VOLUME_1_PDF_REAL_PAGE_GAP, workers=args.workers)
+    extract_clean_save_pages(VOLUME_2_PDF_PATH, VOLUME_2_REAL_START_CONTENT_PAGE, 
+                             VOLUME_2_REAL_END_CONTENT_PAGE, VOLUME_2_CONTENT_PAGE_TXT_FORMAT_PATH,
+                             VOLUME_2_PDF_REAL_PAGE_GAP, workers=args.workers)
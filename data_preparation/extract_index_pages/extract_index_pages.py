@@ -1,6 +1,11 @@
-import PyPDF2
+import os
 import re
-import contextlib
+import sys
+import argparse
+
+# The shared single-open, process-parallel PDF page engine
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pdf_extraction_engine"))
+from pdf_page_engine import extract_pages, write_text_atomic
 
 # start and end pages of volume 1
 START_INDEX_PAGES_VOLUME_1 = 3
@@ -106,54 +111,61 @@ def clean_extracted_text(text):
     text = fix_broken_lines(text)
     return text
 
-def extract_and_clean_pdf_page(page_number, pdf_path):
-    """
-    Extracts and cleans text from a specific PDF page.
-    """
-    with open(pdf_path, 'rb') as f:
-        reader = PyPDF2.PdfReader(f)
-        total = len(reader.pages)
-        if page_number > total:
-            print(f"PDF only has {total} pages.")
-            return None
-
-        raw = reader.pages[page_number - 1].extract_text()
-        return clean_extracted_text(raw)
-
-def extract_pdf_indexes(pdf_path, output_txt_path, start_page, end_page):
+def extract_pdf_indexes(pdf_path, output_txt_path, start_page, end_page, workers=None):
     """
     Extracts indexes from PDF pages and writes to output file.
+    The PDF is parsed once per worker process, and the output file is replaced atomically.
+    When any page fails, nothing is written: a missing index page would break the tree.
     
     Args:
         pdf_path (str): Path to the input PDF file
         output_txt_path (str): Path to the output text file
         start_page (int): Starting page number for extraction
         end_page (int): Ending page number for extraction
-    """
-    with open(output_txt_path, 'w', encoding='utf-8') as logfile, \
-         contextlib.redirect_stdout(logfile):
-
-        for i in range(start_page, end_page + 1):
-            print("=" * 120)
-            print(f"PAGE {i} - CLEANED CONTENT:")
-            print("=" * 120)
-
-            content = extract_and_clean_pdf_page(i, pdf_path)
-            if content:
-                print(content)
+        workers (int): Number of worker processes, defaults to the CPU count
 
-            print("=" * 120)
-            print()
+    Returns:
+        bool: True if every page was extracted and the file written
+    """
+    contents, errors = extract_pages(pdf_path, start_page, end_page,
+                                     transform=clean_extracted_text, workers=workers)
+    if errors:
+        for page_number, error in sorted(errors.items()):
+            print(f"❌ Error extracting page {page_number} of {pdf_path}: {error}")
+        print(f"❌ {output_txt_path} was not written")
+        return False
+
+    separator = "=" * 120
+    blocks = []
+    for i in range(start_page, end_page + 1):
+        lines = [separator, f"PAGE {i} - CLEANED CONTENT:", separator]
+        if contents[i]:
+            lines.append(contents[i])
+        lines.extend([separator, ""])
+        blocks.append("\n".join(lines) + "\n")
+
+    write_text_atomic(output_txt_path, "".join(blocks))
+    return True
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract the index pages of both volumes")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes (defaults to the CPU count)")
+    args = parser.parse_args()
+
     # Process Volume 1
-    extract_pdf_indexes('Migration Act 1958/Migration Act 1958 – Volume 1.pdf', 
-                       'extracted_index_pages/Volume 1/volume_1_indexes.txt',
-                       START_INDEX_PAGES_VOLUME_1, 
-                       END_INDEX_PAGES_VOLUME_1)
+    volume_1_ok = extract_pdf_indexes('Migration Act 1958/Migration Act 1958 – Volume 1.pdf', 
+                                     'extracted_index_pages/Volume 1/volume_1_indexes.txt',
+                                     START_INDEX_PAGES_VOLUME_1, 
+                                     END_INDEX_PAGES_VOLUME_1,
+                                     workers=args.workers)
     
     # Process Volume 2
-    extract_pdf_indexes('Migration Act 1958/Migration Act 1958 – Volume 2.pdf', 
-                       'extracted_index_pages/Volume 2/volume_2_indexes.txt',
-                       START_INDEX_PAGES_VOLUME_2, 
-                       END_INDEX_PAGES_VOLUME_2)
\ No newline at end of file
+    volume_2_ok = extract_pdf_indexes('Migration Act 1958/Migration Act 1958 – Volume 2.pdf', 
+                                     'extracted_index_pages/Volume 2/volume_2_indexes.txt',
+                                     START_INDEX_PAGES_VOLUME_2, 
+                                     END_INDEX_PAGES_VOLUME_2,
+                                     workers=args.workers)
+
+    # A non-zero exit stops the build pipeline before the tree is built from a bad index
+    sys.exit(0 if volume_1_ok and volume_2_ok else 1)
@@ -0,0 +1,98 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from PyPDF2 import PdfReader
+
+def _extract_page_chunk(pdf_path, page_numbers, transform):
+    """
+    Worker: open the PDF once and extract every page of the chunk.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        page_numbers (list[int]): 1-based page numbers handled by this worker.
+        transform (callable or None): Module-level function applied to each raw page text.
+    Returns:
+        list[tuple]: (page_number, text, error) for each page; text is None on error.
+    """
+    reader = PdfReader(os.path.abspath(pdf_path))
+    total_pages = len(reader.pages)
+    results = []
+    for page_number in page_numbers:
+        if page_number < 1 or page_number > total_pages:
+            results.append((page_number, None,
+                            f"Page number {page_number} is out of range. PDF has {total_pages} pages."))
+            continue
+        try:
+            # PyPDF2 uses 0-based indexing for pages
+            text = reader.pages[page_number - 1].extract_text()
+            if transform is not None:
+                text = transform(text)
+            results.append((page_number, text, None))
+        except Exception as e:
+            results.append((page_number, None, str(e)))
+    return results
+
+def _split_contiguous(page_numbers, chunk_count):
+    """Split page numbers into at most chunk_count contiguous, nearly equal chunks"""
+    chunk_count = max(1, min(chunk_count, len(page_numbers)))
+    size, extra = divmod(len(page_numbers), chunk_count)
+    chunks = []
+    start = 0
+    for i in range(chunk_count):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(page_numbers[start:end])
+        start = end
+    return chunks
+
+def extract_pages(pdf_path, start_page, end_page, transform=None, workers=None):
+    """
+    Extract a page range from a PDF, splitting it across a process pool.
+    Each worker parses the PDF once for its whole chunk of pages.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        start_page (int): 1-based start page (inclusive).
+        end_page (int): 1-based end page (inclusive).
+        transform (callable or None): Module-level (picklable) function applied to each page text.
+        workers (int or None): Number of worker processes, defaults to the CPU count.
+    Returns:
+        tuple: ({page_number: text}, {page_number: error message})
+    """
+    page_numbers = list(range(start_page, end_page + 1))
+    if not page_numbers:
+        return {}, {}
+    workers = workers or os.cpu_count() or 1
+    chunks = _split_contiguous(page_numbers, workers)
+
+    if len(chunks) == 1:
+        chunk_results = [_extract_page_chunk(pdf_path, chunks[0], transform)]
+    else:
+        with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            futures = [executor.submit(_extract_page_chunk, pdf_path, chunk, transform)
+                       for chunk in chunks]
+            chunk_results = [future.result() for future in futures]
+
+    texts = {}
+    errors = {}
+    for results in chunk_results:
+        for page_number, text, error in results:
+            if error is None:
+                texts[page_number] = text
+            else:
+                errors[page_number] = error
+    return texts, errors
+
+def write_text_atomic(output_path, text):
+    """
+    Write text to a file atomically: write a temporary file in the same
+    directory, then rename it over the target, so readers never see a partial file.
+    """
+    directory = os.path.dirname(output_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".txt")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,86 @@
+import argparse
+import os
+import shutil
+import sys
+import time
+
+# Version layout and pointer handling live with the index manager in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src"))
+import config
+from index_manager_package.index_artifacts import artifact_paths, check_version_name, published_version
+
+# Published even when a search bundle holds the tree, hashmap, vectors and pages
+ALWAYS_PUBLISHED = ("bm25_index", "passage_index")
+
+
+def publish_version(version):
+    """
+    Copy the built artifacts into INDEX_ARTIFACTS_DIR/<version>.
+    The copy is made under a temporary name and renamed, so a watcher never sees half a version.
+    """
+    if os.path.basename(version) != version or version.startswith("."):
+        raise ValueError(f"Invalid index version name: {version!r}")
+    source = artifact_paths()
+    target_dir = os.path.join(config.INDEX_ARTIFACTS_DIR, version)
+    if os.path.exists(target_dir):
+        raise FileExistsError(f"Version {version} already exists in {config.INDEX_ARTIFACTS_DIR}")
+    if os.path.exists(source["search_bundle"]):
+        names = ("search_bundle",) + ALWAYS_PUBLISHED
+    else:
+        names = ("search_tree", "hashmap", "vector_database", "content_pages") + ALWAYS_PUBLISHED
+    staging_dir = os.path.join(config.INDEX_ARTIFACTS_DIR, f".{version}.tmp")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+    try:
+        for name in names:
+            path = source[name]
+            if not os.path.exists(path):
+                if name in ALWAYS_PUBLISHED:
+                    continue
+                raise FileNotFoundError(f"Missing artifact {path}")
+            destination = os.path.join(staging_dir, os.path.basename(os.path.normpath(path)))
+            if os.path.isdir(path):
+                shutil.copytree(path, destination)
+            else:
+                shutil.copy2(path, destination)
+            print(f"📄 {path}")
+        os.rename(staging_dir, target_dir)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    print(f"✅ Published index version {version} to {target_dir}")
+
+
+def activate_version(version):
+    """Point INDEX_CURRENT_FILE at a version; running apps pick it up by watch or reload"""
+    check_version_name(version)
+    pointer = os.path.join(config.INDEX_ARTIFACTS_DIR, config.INDEX_CURRENT_FILE)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(pointer + ".tmp", pointer)
+    print(f"✅ {pointer} now names version {version}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish the built index artifacts as a new version")
+    parser.add_argument("--version", default=time.strftime("%Y%m%d-%H%M%S"),
+                        help="Name of the new version (default: current date and time)")
+    parser.add_argument("--no-activate", action="store_true",
+                        help="Copy the artifacts but keep serving the current version")
+    parser.add_argument("--activate", metavar="VERSION",
+                        help="Only point the apps at an existing version, e.g. to roll back")
+    parser.add_argument("--list", action="store_true", help="List the published versions")
+    args = parser.parse_args()
+
+    if args.list:
+        current = published_version()
+        if os.path.isdir(config.INDEX_ARTIFACTS_DIR):
+            for name in sorted(os.listdir(config.INDEX_ARTIFACTS_DIR)):
+                if os.path.isdir(os.path.join(config.INDEX_ARTIFACTS_DIR, name)) and not name.startswith("."):
+                    print(f"{'*' if name == current else ' '} {name}")
+    elif args.activate:
+        activate_version(args.activate)
+    else:
+        publish_version(args.version)
+        if not args.no_activate:
+            activate_version(args.version)
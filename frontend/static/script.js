@@ -8,6 +8,9 @@ class MigrationChatbot {
         this.suggestedQuestions = document.getElementById('suggestedQuestions');
         this.suggestedQuestionsRow2 = document.getElementById('suggestedQuestionsRow2');
         this.commonQuestionsHeader = document.querySelector('.common-questions-header');
+
+        // The request waiting for an answer: { controller, requestId }
+        this.pendingRequest = null;
         
         this.init();
     }
@@ -40,6 +43,11 @@ class MigrationChatbot {
             this.toggleTheme();
         });
 
+        // Stop the server working on an answer nobody will read
+        window.addEventListener('pagehide', () => {
+            this.cancelPendingRequest();
+        });
+
         // Focus input on load
         this.chatInput.focus();
 
@@ -91,6 +99,11 @@ class MigrationChatbot {
         this.chatInput.value = '';
         this.chatInput.style.height = 'auto';
 
+        // A new question supersedes the one still waiting for an answer
+        this.cancelPendingRequest();
+        const pendingRequest = { controller: new AbortController(), requestId: this.newRequestId() };
+        this.pendingRequest = pendingRequest;
+
         // Add user message
         this.addMessage(message, 'user');
 
@@ -102,39 +115,73 @@ class MigrationChatbot {
 
         try {
             // Send to backend
-            const response = await this.callBackend(message);
+            const response = await this.callBackend(message, pendingRequest);
             
             // Hide typing and show response
             this.hideTyping();
             this.addMessage(response, 'bot');
         } catch (error) {
+            // A superseded request needs no message, the new one is on its way
+            if (error.name === 'AbortError') return;
             this.hideTyping();
-            this.addMessage('Sorry, I encountered an error while processing your request. Please try again.', 'bot');
+            this.addMessage(this.errorMessage(error), 'bot');
             console.error('Error:', error);
         } finally {
-            // Re-enable send button
-            this.sendButton.disabled = false;
-            this.chatInput.focus();
+            if (this.pendingRequest === pendingRequest) {
+                this.pendingRequest = null;
+                // Re-enable send button
+                this.sendButton.disabled = false;
+                this.chatInput.focus();
+            }
         }
     }
 
-    async callBackend(message) {
+    async callBackend(message, pendingRequest) {
         const response = await fetch('/api/chat', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                'X-Request-ID': pendingRequest.requestId,
             },
-            body: JSON.stringify({ message: message })
+            body: JSON.stringify({ message: message }),
+            signal: pendingRequest.controller.signal
         });
         
         if (!response.ok) {
-            throw new Error('Network response was not ok');
+            const error = new Error('Network response was not ok');
+            error.status = response.status;
+            throw error;
         }
         
         const data = await response.json();
         return data.response;
     }
 
+    errorMessage(error) {
+        if (error.status === 429 || error.status === 503) {
+            return 'The chatbot is busy right now. Please try again in a few seconds.';
+        }
+        return 'Sorry, I encountered an error while processing your request. Please try again.';
+    }
+
+    cancelPendingRequest() {
+        if (!this.pendingRequest) return;
+        const { controller, requestId } = this.pendingRequest;
+        this.pendingRequest = null;
+        controller.abort();
+        // The server also notices the closed connection, but not always behind a proxy
+        const body = new Blob([JSON.stringify({ request_id: requestId })], { type: 'application/json' });
+        navigator.sendBeacon('/api/chat/cancel', body);
+    }
+
+    newRequestId() {
+        // crypto.randomUUID needs a secure context (https or localhost)
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID().replace(/-/g, '');
+        }
+        return Date.now().toString(36) + Math.random().toString(36).slice(2, 14);
+    }
+
     addMessage(content, type) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${type}`;
@@ -0,0 +1,141 @@
+# admission_control.py
+import threading
+import time
+from collections import OrderedDict, deque
+import config
+from metrics_package.metrics import (ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS, ADMISSION_RUNNING,
+                                     count)
+from tracing_package.tracing import get_logger
+
+logger = get_logger("admission")
+
+
+class Rejected(Exception):
+    """A request was turned away before reaching the pipeline"""
+    
+    def __init__(self, reason: str, retry_after: float):
+        """
+        Args:
+            reason: "queue_full", "queue_timeout" or "rate_limited"
+            retry_after: Seconds the client should wait before trying again
+        """
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Caps the number of pipelines running at once. A request takes one slot per pipeline it
+    runs concurrently (a batch takes several). Requests beyond the cap wait in a bounded
+    first-come first-served queue; freed slots go to the oldest waiters that fit.
+    """
+    
+    def __init__(self, max_in_flight: int = None, max_queue: int = None, queue_timeout: float = None):
+        self.max_in_flight = max(1, max_in_flight or config.ADMISSION_MAX_IN_FLIGHT)
+        self.max_queue = max(0, config.ADMISSION_MAX_QUEUE if max_queue is None else max_queue)
+        self.queue_timeout = config.ADMISSION_QUEUE_TIMEOUT_SECONDS if queue_timeout is None else queue_timeout
+        self._running = 0
+        # (event, slots) per waiting request, oldest first
+        self._waiters = deque()
+        self._lock = threading.Lock()
+    
+    def acquire(self, slots: int = 1) -> float:
+        """
+        Take pipeline slots, waiting in line for them if needed.
+        
+        Args:
+            slots: Pipelines the request runs at once, capped at max_in_flight
+        
+        Returns:
+            float: Seconds spent waiting
+        
+        Raises:
+            Rejected: When the queue is full or the wait exceeds the queue timeout
+        """
+        slots = max(1, min(slots, self.max_in_flight))
+        with self._lock:
+            if self._running + slots <= self.max_in_flight and not self._waiters:
+                self._running += slots
+                self._update_gauges()
+                return 0.0
+            if len(self._waiters) >= self.max_queue:
+                self._reject("queue_full")
+            waiter = (threading.Event(), slots)
+            self._waiters.append(waiter)
+            self._update_gauges()
+        
+        start_time = time.perf_counter()
+        admitted = waiter[0].wait(self.queue_timeout)
+        with self._lock:
+            # Slots handed over right at the timeout still count
+            if not admitted and not waiter[0].is_set():
+                self._waiters.remove(waiter)
+                # A large request leaving the head of the line may let smaller ones in
+                self._admit_waiters()
+                self._update_gauges()
+                self._reject("queue_timeout")
+        return time.perf_counter() - start_time
+    
+    def release(self, slots: int = 1):
+        """Free the slots of a finished request"""
+        slots = max(1, min(slots, self.max_in_flight))
+        with self._lock:
+            self._running -= slots
+            self._admit_waiters()
+            self._update_gauges()
+    
+    def _admit_waiters(self):
+        # Strictly in order: a waiter needing more slots than are free holds back those behind it
+        while self._waiters and self._running + self._waiters[0][1] <= self.max_in_flight:
+            event, slots = self._waiters.popleft()
+            self._running += slots
+            event.set()
+    
+    def _reject(self, reason: str):
+        count(ADMISSION_REJECTIONS, reason=reason)
+        logger.warning("Rejected (%s): %d running, %d waiting", reason, self._running, len(self._waiters))
+        raise Rejected(reason, config.ADMISSION_RETRY_AFTER_SECONDS)
+    
+    def _update_gauges(self):
+        if config.METRICS_ENABLED:
+            ADMISSION_RUNNING.set(self._running)
+            ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+
+
+class TokenBucketLimiter:
+    """
+    Per-client request rate limit: each client may make `burst` requests at once and then
+    one every 1 / `rate` seconds. Only the most recently seen clients are remembered.
+    """
+    
+    def __init__(self, rate: float = None, burst: int = None, max_clients: int = None):
+        self.rate = rate or config.RATE_LIMIT_PER_SECOND
+        self.burst = max(1, burst or config.RATE_LIMIT_BURST)
+        self.max_clients = max_clients or config.RATE_LIMIT_MAX_CLIENTS
+        # Client -> (tokens, time of the last update), least recently seen first
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def acquire(self, client: str):
+        """
+        Take one token from the client's bucket.
+        
+        Raises:
+            Rejected: When the bucket is empty, with the seconds until the next token
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[client] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                # A forgotten client starts again with a full bucket
+                self._buckets.popitem(last=False)
+        if not allowed:
+            count(ADMISSION_REJECTIONS, reason="rate_limited")
+            logger.info("Rate limited client %s", client)
+            raise Rejected("rate_limited", (1 - tokens) / self.rate)
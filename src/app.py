@@ -1,21 +1,208 @@
 # src/app.py
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify
 from main import MigrationActChatbot
+from admission_control_package.admission_control import AdmissionController, Rejected, TokenBucketLimiter
+from cancellation_package.cancellation import CANCELLATION, Cancelled, CancellationRegistry
+from index_manager_package.index_artifacts import check_version_name
+from metrics_package.metrics import CANCELLED, IN_FLIGHT, REGISTRY, REQUESTS, count, observe_stage
+from profiling_package.request_profiler import start_profiler
+from tracing_package.tracing import REQUEST_ID, RequestTrace, configure_logging, new_request_id
+import config
+import hmac
+import math
+
+configure_logging()
 
 app = Flask(__name__, 
             template_folder='../frontend/templates',
             static_folder='../frontend/static')
 chatbot = MigrationActChatbot()
+if config.INDEX_WATCH_ENABLED:
+    chatbot.index_manager.start_watching()
+admission = AdmissionController() if config.ADMISSION_CONTROL_ENABLED else None
+rate_limiter = TokenBucketLimiter() if config.RATE_LIMIT_ENABLED else None
+cancellations = CancellationRegistry() if config.CANCELLATION_ENABLED else None
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.before_request
+def track_request_start():
+    # Reuse the caller's request id when it sends one, so logs can be joined across services
+    g.request_id_token = REQUEST_ID.set(request.headers.get('X-Request-ID') or new_request_id())
+    if config.METRICS_ENABLED and request.endpoint in ('chat', 'chat_batch'):
+        count(REQUESTS, endpoint=request.endpoint)
+        IN_FLIGHT.inc(endpoint=request.endpoint)
+    if request.endpoint in ('chat', 'chat_batch'):
+        rejection = admit_request(batch_slots() if request.endpoint == 'chat_batch' else 1)
+        if rejection is not None:
+            return rejection
+        if cancellations is not None:
+            # The WSGI servers expose the client socket, probed to notice a closed tab
+            connection = request.environ.get('werkzeug.socket') or request.environ.get('gunicorn.socket')
+            g.cancellation_context = CANCELLATION.set(cancellations.register(REQUEST_ID.get(), connection))
+
+def client_id():
+    # Behind a proxy the client address comes from a header, e.g. the first X-Forwarded-For hop
+    if config.RATE_LIMIT_CLIENT_HEADER:
+        value = request.headers.get(config.RATE_LIMIT_CLIENT_HEADER)
+        if value:
+            return value.split(',')[0].strip()
+    return request.remote_addr or '-'
+
+def batch_slots():
+    # A batch runs up to min(messages, concurrency) pipelines at once and holds a slot for each
+    if admission is None:
+        return 1
+    payload = request.get_json(silent=True) or {}
+    messages = payload.get('messages')
+    concurrency = payload.get('concurrency')
+    if not isinstance(concurrency, int) or concurrency < 1:
+        concurrency = config.BATCH_API_CONCURRENCY
+    size = len(messages) if isinstance(messages, list) else 1
+    return max(1, min(size, concurrency, config.BATCH_API_CONCURRENCY, admission.max_in_flight))
+
+def admit_request(slots=1):
+    # Returning a response here answers the request without running the pipeline
+    try:
+        if rate_limiter is not None:
+            rate_limiter.acquire(client_id())
+        if admission is not None:
+            observe_stage('queue_wait', admission.acquire(slots))
+            g.admitted = slots
+    except Rejected as e:
+        if e.reason == 'rate_limited':
+            response = jsonify({'error': 'Too many requests, please slow down'})
+            response.status_code = 429
+        else:
+            response = jsonify({'error': 'The server is busy, please try again shortly'})
+            response.status_code = 503
+        response.headers['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+        return response
+
+@app.after_request
+def add_request_id_header(response):
+    response.headers['X-Request-ID'] = REQUEST_ID.get()
+    return response
+
+@app.teardown_request
+def track_request_end(error=None):
+    if config.METRICS_ENABLED and request.endpoint in ('chat', 'chat_batch'):
+        IN_FLIGHT.dec(endpoint=request.endpoint)
+    admitted = g.pop('admitted', 0)
+    if admitted:
+        admission.release(admitted)
+    cancellation_context = g.pop('cancellation_context', None)
+    if cancellation_context is not None:
+        cancellations.unregister(REQUEST_ID.get(), CANCELLATION.get())
+        CANCELLATION.reset(cancellation_context)
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        REQUEST_ID.reset(token)
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     user_message = request.json['message']
-    response = chatbot.process_user_message(user_message)
-    return jsonify({'response': response})
+    # Clients ask for the search trace with {"debug": true}
+    trace = RequestTrace() if config.TRACE_API_ENABLED and request.json.get('debug') is True else None
+    profiler = start_profiler(REQUEST_ID.get(), request.headers.get('X-Profile-Token')) \
+        if config.PROFILING_ENABLED else None
+    try:
+        details = chatbot.process_user_message_detailed(user_message, trace=trace)
+    except Cancelled as e:
+        return cancelled_response(e)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+    if trace is None:
+        response = jsonify({'response': details['answer']})
+    else:
+        debug = {key: details[key] for key in ('needs_search', 'search_terms', 'timings')}
+        debug.update(details['trace'])
+        response = jsonify({'response': details['answer'], 'debug': debug})
+    if profiler is not None:
+        response.headers['X-Profile'] = profiler.save(details['timings'], {
+            key: details[key] for key in ('question', 'needs_search', 'search_terms', 'sections')
+            if key in details})
+    return response
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    payload = request.get_json(silent=True) or {}
+    messages = payload.get('messages')
+    if not isinstance(messages, list) or not messages:
+        return jsonify({'error': "'messages' must be a non-empty list"}), 400
+    if len(messages) > config.BATCH_API_MAX_MESSAGES:
+        return jsonify({'error': f"At most {config.BATCH_API_MAX_MESSAGES} messages per batch"}), 400
+    concurrency = payload.get('concurrency')
+    if not isinstance(concurrency, int) or concurrency < 1:
+        concurrency = None
+    if g.get('admitted'):
+        # No more pipelines at once than the admission slots the batch holds
+        concurrency = g.admitted
+    try:
+        results = chatbot.process_user_messages_batch(messages, concurrency)
+    except Cancelled as e:
+        return cancelled_response(e)
+    return jsonify({'results': results})
+
+def cancelled_response(cancelled):
+    # Nobody reads it: 499 (client closed request) only shows up in access logs
+    count(CANCELLED, stage=cancelled.stage)
+    return jsonify({'error': 'Request cancelled', 'stage': cancelled.stage}), 499
+
+@app.route('/api/chat/cancel', methods=['POST'])
+def chat_cancel():
+    # Sent by the frontend with navigator.sendBeacon, whose body has no JSON content type
+    payload = request.get_json(silent=True, force=True) or {}
+    request_id = payload.get('request_id')
+    if not isinstance(request_id, str) or not request_id:
+        return jsonify({'error': "'request_id' must be a non-empty string"}), 400
+    if cancellations is None:
+        return jsonify({'cancelled': False})
+    return jsonify({'cancelled': cancellations.cancel(request_id)})
+
+def is_admin():
+    # Admin endpoints stay closed until ADMIN_TOKEN is configured
+    token = request.headers.get('X-Admin-Token')
+    return bool(config.ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, config.ADMIN_TOKEN)
+
+@app.route(config.ADMIN_INDEX_PATH, methods=['GET'])
+def index_status():
+    if not is_admin():
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(chatbot.index_manager.status())
+
+@app.route(config.ADMIN_INDEX_PATH + '/reload', methods=['POST'])
+def index_reload():
+    if not is_admin():
+        return jsonify({'error': 'Forbidden'}), 403
+    payload = request.get_json(silent=True) or {}
+    version = payload.get('version')
+    if version is not None and not isinstance(version, str):
+        return jsonify({'error': "'version' must be a string"}), 400
+    manager = chatbot.index_manager
+    if payload.get('wait') is True:
+        try:
+            return jsonify(manager.reload(version))
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 409
+        except ValueError as e:
+            return jsonify({'error': str(e), 'version': manager.current.version}), 422
+    try:
+        if version is not None:
+            check_version_name(version)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'version': manager.current.version}), 422
+    if not manager.reload_in_background(version):
+        return jsonify({'error': 'An index reload is already running'}), 409
+    # Poll GET ADMIN_INDEX_PATH for the outcome
+    return jsonify({'status': 'loading', 'version': manager.current.version}), 202
+
+@app.route(config.METRICS_PATH, methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == "__main__":
     import os
@@ -0,0 +1,128 @@
+# batch_runner.py
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, TextIO
+from tracing_package.tracing import request_context
+import config
+
+# Fields a JSONL record may carry its question and id in, first match wins
+QUESTION_FIELDS = ("question", "message", "body")
+ID_FIELDS = ("id", "request_id")
+
+
+def read_questions(source: TextIO) -> Iterator[Dict[str, Any]]:
+    """
+    Read one question per JSONL line.
+    
+    A line is either a JSON object with a "question" (or "message" / "body") field and an
+    optional "id" (or "request_id"), or a JSON string. Blank lines are skipped. Lines that
+    cannot be used are still yielded, with an "error", so the output keeps one record per line.
+    
+    Yields:
+        Dict: {"id", "question"} or {"id", "question": None, "error"}
+    """
+    for line_number, line in enumerate(source, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {"id": line_number, "question": None, "error": f"Invalid JSON: {e}"}
+            continue
+        
+        if isinstance(record, str):
+            yield {"id": line_number, "question": record}
+            continue
+        if not isinstance(record, dict):
+            yield {"id": line_number, "question": None, "error": "Expected a JSON object or string"}
+            continue
+        record_id = next((record[field] for field in ID_FIELDS if field in record), line_number)
+        question = next((record[field] for field in QUESTION_FIELDS if record.get(field)), None)
+        if not isinstance(question, str) or not question.strip():
+            yield {"id": record_id, "question": None, "error": "No question field"}
+            continue
+        yield {"id": record_id, "question": question}
+
+
+class BatchRunner:
+    """Runs questions through the chatbot pipeline concurrently and writes one JSONL result per question"""
+    
+    def __init__(self, chatbot, concurrency: int = None):
+        self.chatbot = chatbot
+        self.concurrency = max(1, concurrency or config.BATCH_CONCURRENCY)
+    
+    def answer(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one question read by read_questions"""
+        if item.get("error"):
+            return {"id": item["id"], "question": item["question"], "error": item["error"]}
+        try:
+            with request_context():
+                details = self.chatbot.process_user_message_detailed(item["question"])
+        except Exception as e:
+            return {"id": item["id"], "question": item["question"], "error": str(e)}
+        return {
+            "id": item["id"],
+            "question": details["question"],
+            "answer": details["answer"],
+            "needs_search": details["needs_search"],
+            "search_terms": details["search_terms"],
+            "sections": details["sections"],
+            "timings": {stage: round(seconds, 4) for stage, seconds in details["timings"].items()},
+            "error": None
+        }
+    
+    def run(self, source: TextIO, output: TextIO) -> Dict[str, Any]:
+        """
+        Answer every question of source and write the results to output, in input order.
+        
+        Returns:
+            Dict: Summary with the question and error counts and the wall time
+        """
+        start_time = time.perf_counter()
+        count = 0
+        errors = 0
+        total_times = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            # map keeps the input order and writes each result as soon as its turn comes
+            for result in executor.map(self.answer, read_questions(source)):
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+                count += 1
+                if result.get("error"):
+                    errors += 1
+                elif "total" in result["timings"]:
+                    total_times.append(result["timings"]["total"])
+        
+        total_times.sort()
+        return {
+            "questions": count,
+            "errors": errors,
+            "concurrency": self.concurrency,
+            "wall_seconds": round(time.perf_counter() - start_time, 4),
+            "median_question_seconds": total_times[len(total_times) // 2] if total_times else None
+        }
+
+
+def run_batch(chatbot, input_path: str, output_path: str = "-", concurrency: int = None) -> Dict[str, Any]:
+    """
+    Run a batch from a JSONL file (or "-" for stdin) to a JSONL file (or "-" for stdout).
+    
+    While results go to stdout, the pipeline's progress output is sent to stderr so the
+    result stream stays valid JSONL.
+    """
+    source = sys.stdin if input_path == "-" else open(input_path, "r", encoding="utf-8")
+    output = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    real_stdout = sys.stdout
+    try:
+        if output is real_stdout:
+            sys.stdout = sys.stderr
+        return BatchRunner(chatbot, concurrency).run(source, output)
+    finally:
+        sys.stdout = real_stdout
+        if source is not sys.stdin:
+            source.close()
+        if output is not real_stdout:
+            output.close()
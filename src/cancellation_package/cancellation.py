@@ -0,0 +1,226 @@
+# cancellation.py
+import asyncio
+import concurrent.futures
+import contextvars
+import select
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+import config
+from tracing_package.tracing import get_logger
+
+logger = get_logger("cancellation")
+
+# Cancellations of unknown ids kept at most, so cancel calls cannot grow memory without bound
+MAX_EARLY_CANCELLATIONS = 10000
+
+# Token of the request being processed in the current thread / context (None outside the web app)
+CANCELLATION = contextvars.ContextVar("cancellation", default=None)
+
+
+class Cancelled(BaseException):
+    """
+    Raised in a request whose client went away or asked to stop. Like asyncio.CancelledError it
+    derives from BaseException, so the pipeline's `except Exception` fallbacks let it through.
+    """
+    
+    def __init__(self, stage: str):
+        super().__init__(stage)
+        self.stage = stage
+
+
+class CancellationToken:
+    """Set once when a request should stop; callbacks run at that moment"""
+    
+    def __init__(self):
+        self.reason = None
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+    
+    def cancel(self, reason: str):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+    
+    def add_callback(self, callback: Callable[[], Any]) -> Callable[[], None]:
+        """Run callback on cancellation (now, if already cancelled); returns a function removing it"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+    
+    def _remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+def check_cancelled(stage: str):
+    """
+    Stop the current request before it starts a stage, if it was cancelled.
+    
+    Args:
+        stage: The stage about to start, reported in the cancelled counter
+    
+    Raises:
+        Cancelled: When the request's token is set
+    """
+    token = CANCELLATION.get()
+    if token is not None and token.cancelled:
+        raise Cancelled(stage)
+
+
+_llm_loop = None
+_llm_loop_lock = threading.Lock()
+
+
+def _get_llm_loop() -> asyncio.AbstractEventLoop:
+    """Event loop, on its own thread, that runs the LLM calls of cancellable requests"""
+    global _llm_loop
+    with _llm_loop_lock:
+        if _llm_loop is None:
+            _llm_loop = asyncio.new_event_loop()
+            threading.Thread(target=_llm_loop.run_forever, name="llm-calls", daemon=True).start()
+        return _llm_loop
+
+
+def invoke_llm(runnable, inputs: Dict[str, Any], stage: str):
+    """
+    runnable.invoke(inputs), abandoned as soon as the current request is cancelled.
+    
+    In a cancellable request the call runs as runnable.ainvoke on a shared event loop, and
+    cancelling it closes the HTTP connection to the LLM provider, so the provider stops
+    generating. Outside of one (CLI, batch mode) this is a plain blocking invoke.
+    
+    Args:
+        runnable: A LangChain runnable, e.g. prompt | ChatOpenAI
+        inputs: The prompt variables
+        stage: Name of the LLM stage, reported when it is cancelled
+    
+    Raises:
+        Cancelled: When the request is cancelled before or during the call
+    """
+    token = CANCELLATION.get()
+    if token is None:
+        return runnable.invoke(inputs)
+    check_cancelled(stage)
+    future = asyncio.run_coroutine_threadsafe(runnable.ainvoke(inputs), _get_llm_loop())
+    remove_callback = token.add_callback(future.cancel)
+    try:
+        return future.result()
+    except concurrent.futures.CancelledError:
+        logger.info("Abandoned the %s call: %s", stage, token.reason)
+        raise Cancelled(stage)
+    finally:
+        remove_callback()
+
+
+def connection_closed(connection: socket.socket) -> bool:
+    """True when the client closed its end of the connection"""
+    try:
+        readable, _, _ = select.select([connection], [], [], 0)
+        if not readable:
+            return False
+        # The request body was read already, so a readable socket either has a pipelined
+        # request waiting (still connected) or is at end of file (gone)
+        return connection.recv(1, socket.MSG_PEEK) == b""
+    except ValueError:
+        # TLS sockets do not support peeking, descriptors above FD_SETSIZE cannot be selected
+        return False
+    except OSError:
+        return True
+
+
+class CancellationRegistry:
+    """
+    The cancellable requests in flight by request id. A request is cancelled when a client asks
+    for it by id, or when a background thread finds that its connection was closed.
+    """
+    
+    def __init__(self, probe_interval: float = None):
+        self.probe_interval = probe_interval or config.CANCELLATION_PROBE_INTERVAL_SECONDS
+        # Request id -> (token, client connection or None)
+        self._requests = {}
+        # Ids cancelled before their request arrived (e.g. while it waited for admission) -> expiry
+        self._early_cancellations = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+    
+    def register(self, request_id: str, connection: Optional[socket.socket] = None) -> CancellationToken:
+        """
+        Track a request from now until unregister.
+        
+        Args:
+            request_id: Id the client can cancel the request with
+            connection: The client's socket, probed for disconnects when given
+        
+        Returns:
+            CancellationToken: The request's token, already set if it was cancelled early
+        """
+        token = CancellationToken()
+        with self._lock:
+            self._prune_early_cancellations()
+            if self._early_cancellations.pop(request_id, None) is not None:
+                token.cancel("client")
+            self._requests[request_id] = (token, connection)
+            if connection is not None and self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name="disconnect-probe", daemon=True)
+                self._watcher.start()
+        if connection is not None and connection_closed(connection):
+            token.cancel("disconnected")
+        return token
+    
+    def unregister(self, request_id: str, token: CancellationToken):
+        with self._lock:
+            # Another request may have reused the id meanwhile
+            if self._requests.get(request_id, (None,))[0] is token:
+                del self._requests[request_id]
+    
+    def cancel(self, request_id: str, reason: str = "client") -> bool:
+        """
+        Cancel a request by id.
+        
+        Returns:
+            bool: True when the request was running, False when it is remembered for
+            CANCELLATION_MEMORY_SECONDS in case it has not arrived yet
+        """
+        with self._lock:
+            entry = self._requests.get(request_id)
+            if entry is None:
+                self._prune_early_cancellations()
+                if len(self._early_cancellations) < MAX_EARLY_CANCELLATIONS:
+                    self._early_cancellations[request_id] = time.monotonic() + config.CANCELLATION_MEMORY_SECONDS
+        if entry is None:
+            return False
+        logger.info("Cancelling request %s (%s)", request_id, reason)
+        entry[0].cancel(reason)
+        return True
+    
+    def _prune_early_cancellations(self):
+        now = time.monotonic()
+        for request_id in [key for key, expiry in self._early_cancellations.items() if expiry < now]:
+            del self._early_cancellations[request_id]
+    
+    def _watch(self):
+        while True:
+            time.sleep(self.probe_interval)
+            with self._lock:
+                probed = [(request_id, token, connection) for request_id, (token, connection)
+                          in self._requests.items() if connection is not None and not token.cancelled]
+            for request_id, token, connection in probed:
+                if connection_closed(connection):
+                    logger.info("Client of request %s disconnected, cancelling it", request_id)
+                    token.cancel("disconnected")
@@ -7,28 +7,182 @@ load_dotenv()
 
 # API Configuration
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_API_BASE = "https://openrouter.ai/api/v1"
+# Override to point the LLM calls at another OpenAI-compatible server, e.g. the local
+# stand-in of benchmarks/load/llm_stub_server.py
+OPENROUTER_API_BASE = os.getenv("OPENROUTER_API_BASE", "https://openrouter.ai/api/v1")
 MODEL_NAME = "qwen/qwen2.5-vl-32b-instruct:free"
 
 # LLM Parameters
 LLM_TEMPERATURE = 0.05
 LLM_MAX_TOKENS = 30
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
 
 # Database Paths
 VECTOR_DATABASE_PATH = "vector_database"
 COLLECTION_NAME = "my_collection"
+CENTROID_COLLECTION_NAME = "my_collection_centroids"
 
 # File Paths
 SEARCH_TREE_PATH = "final_json_searching_material/final_search_tree_embed_id.json"
 HASHMAP_PATH = "final_json_searching_material/final_hashmap.json"
 MIGRATION_ACT_CONTENT_BASE = "Migration Act Content Pages Txt Format"
 
+# Search Bundle (single memory-mapped artifact replacing the JSON files,
+# page directories and ChromaDB when present)
+SEARCH_BUNDLE_PATH = "final_json_searching_material/search_bundle.bin"
+VERIFY_SEARCH_BUNDLE_CHECKSUM = True
+
 # Embedding Model
 EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
 
 # Search Parameters
 DEFAULT_SEARCH_LIMIT = 5
 
+# Query Expansion (several search terms plus the raw question, embedded in one batch,
+# searched concurrently and merged with reciprocal rank fusion; SEARCH_TERM_FAN_OUT bounds
+# the number of searches per question, the raw question included)
+SEARCH_TERM_EXPANSION_ENABLED = False
+SEARCH_TERM_FAN_OUT = 3
+SEARCH_TERM_INCLUDE_QUESTION = True
+SEARCH_TERM_EXPANSION_MAX_TOKENS = 60
+
+# Tree descent: "local" scores every child of the chosen node in Python,
+# "indexed" asks the vector store for the best children of the current level
+# (one filtered nearest-neighbour query per level, across every node of the beam)
+TREE_SEARCH_MODE = "local"
+SEARCH_BEAM_WIDTH = 1
+# Parent id stored on the top level (part) vectors
+TREE_ROOT_PARENT_ID = "root"
+
+# How tree nodes are scored during descent: "title" (the embedded short title),
+# "centroid" (page-weighted centroid of the descendant section labels) or "blend",
+# which mixes both similarities with the centroid weighted by NODE_SCORING_CENTROID_WEIGHT
+NODE_SCORING_MODE = "title"
+NODE_SCORING_CENTROID_WEIGHT = 0.5
+
+# Retrieval stages fused with reciprocal rank fusion:
+# "tree" (greedy tree descent), "flat" (brute-force top-k over all section vectors)
+# and "bm25" (lexical search over the section text)
+RETRIEVAL_STAGES = ["tree"]
+FLAT_SEARCH_TOP_K = 10
+RRF_K = 60
+
+# Fuzzy Label Matching (skips embedding and tree descent on a confident match; off until its
+# effect is measured with benchmarks/retrieval/run_benchmark.py)
+LABEL_MATCH_ENABLED = False
+LABEL_MATCH_THRESHOLD = 0.9
+LABEL_MATCH_MARGIN = 0.05
+
+# Lexical (BM25) Search
+BM25_INDEX_PATH = "final_json_searching_material/bm25_index.npz"
+BM25_TOP_K = 10
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Section titles are a separate field, their BM25 score is weighted by BM25_TITLE_WEIGHT.
+# BM25_SECTION_CODE_WEIGHT is added to a section when the query names its code ("s 501");
+# references to it in the text of other sections are ordinary "ref501" terms
+BM25_TITLE_WEIGHT = 1.0
+BM25_SECTION_CODE_WEIGHT = 20.0
+
+# Passage Index (picks the passages of the selected sections that best match the question;
+# sections missing from the index fall back to their first PASSAGE_FALLBACK_CHARS characters)
+PASSAGE_INDEX_PATH = "final_json_searching_material/passage_index.npz"
+PASSAGE_SEARCH_ENABLED = True
+PASSAGE_CONTEXT_CHAR_BUDGET = 4000
+PASSAGE_FALLBACK_CHARS = 2000
+# Longest passage the index is built with (data_preparation/build_passage_index)
+PASSAGE_MAX_CHARS = 800
+
+# Cross-Encoder Reranking (retrieves up to RERANKER_MAX_CANDIDATES sections and reranks them
+# in one CPU forward pass; fewer candidates are scored when the measured cost per pair
+# would exceed the latency budget)
+RERANKER_ENABLED = False
+RERANKER_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANKER_MAX_CANDIDATES = 20
+RERANKER_LATENCY_BUDGET_MS = 250
+RERANKER_LATENCY_EMA_ALPHA = 0.3
+RERANKER_MAX_LENGTH = 256
+RERANKER_EXCERPT_CHARS = 600
+# Every RERANKER_PROBE_EVERY-th skipped request is reranked anyway to measure the cost again
+RERANKER_PROBE_EVERY = 20
+
+# Batch Mode (python src/main.py --batch questions.jsonl)
+BATCH_CONCURRENCY = 4
+
+# Batch Chat API (POST /api/chat/batch)
+BATCH_API_MAX_MESSAGES = 50
+BATCH_API_CONCURRENCY = 8
+
+# Metrics (Prometheus text format at METRICS_PATH; quantiles cover the last
+# METRICS_WINDOW_SIZE observations of each stage)
+METRICS_ENABLED = True
+METRICS_PATH = "/metrics"
+METRICS_WINDOW_SIZE = 1024
+
+# Logging and Tracing (pipeline logs go to stderr; LOG_FORMAT is "text" or "json".
+# With TRACE_API_ENABLED, POST /api/chat with {"debug": true} returns the search trace)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+TRACE_API_ENABLED = True
+
+# Request Profiling (off by default; when enabled, POST /api/chat is profiled if the
+# X-Profile-Token header matches PROFILING_TOKEN, or at random for PROFILING_SAMPLE_RATE
+# of requests. PROFILING_BACKEND is "cprofile" (deterministic) or "pyinstrument" (sampling,
+# optional dependency); artifacts and their JSON sidecars go to PROFILING_OUTPUT_DIR)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_BACKEND = os.getenv("PROFILING_BACKEND", "cprofile")
+PROFILING_SAMPLING_INTERVAL = 0.001
+PROFILING_OUTPUT_DIR = os.getenv("PROFILING_OUTPUT_DIR", "profiles")
+PROFILING_TOP_FUNCTIONS = 30
+
+# Index Artifacts and Hot Reload (a version is a directory under INDEX_ARTIFACTS_DIR holding
+# the artifacts under their usual names: search_bundle.bin, or the search tree, hashmap,
+# vector_database/, BM25 and passage indexes and content pages. INDEX_CURRENT_FILE names the
+# live version; without it the paths above are used. POST ADMIN_INDEX_PATH + "/reload" with
+# the X-Admin-Token header, or a change of INDEX_CURRENT_FILE when INDEX_WATCH_ENABLED, loads
+# and validates a version in the background and swaps it in)
+INDEX_ARTIFACTS_DIR = os.getenv("INDEX_ARTIFACTS_DIR", "index_artifacts")
+INDEX_CURRENT_FILE = "CURRENT"
+INDEX_WATCH_ENABLED = os.getenv("INDEX_WATCH_ENABLED", "false").lower() == "true"
+INDEX_WATCH_INTERVAL_SECONDS = 5.0
+INDEX_VALIDATION_QUERY = "cancellation of visas"
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+ADMIN_INDEX_PATH = "/admin/index"
+
+# Single-Flight (concurrent requests with the same normalized question share one run of the
+# pipeline; below that, concurrent retrievals for the same search terms and content loads for
+# the same sections are shared. Requests asking for a debug trace always run on their own)
+SINGLE_FLIGHT_ENABLED = True
+
+# Admission Control (POST /api/chat and /api/chat/batch: at most ADMISSION_MAX_IN_FLIGHT
+# pipelines run at once, a batch holding one slot per message it runs concurrently, and up to
+# ADMISSION_MAX_QUEUE more requests wait in line, each for
+# at most ADMISSION_QUEUE_TIMEOUT_SECONDS; the rest get 503 with Retry-After. With
+# RATE_LIMIT_ENABLED each client, identified by RATE_LIMIT_CLIENT_HEADER (e.g. X-Forwarded-For
+# behind a proxy) or its address, has a token bucket of RATE_LIMIT_BURST requests refilled at
+# RATE_LIMIT_PER_SECOND and gets 429 with Retry-After when it is empty)
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "8"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+ADMISSION_RETRY_AFTER_SECONDS = 5
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "0.5"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "5"))
+RATE_LIMIT_CLIENT_HEADER = os.getenv("RATE_LIMIT_CLIENT_HEADER")
+RATE_LIMIT_MAX_CLIENTS = 10000
+
+# Cancellation (a chat request stops before its next pipeline stage, and abandons its LLM call
+# in progress, when its client disconnects or posts {"request_id": ...} to /api/chat/cancel.
+# Client connections are probed every CANCELLATION_PROBE_INTERVAL_SECONDS; a cancellation that
+# arrives before its request is remembered for CANCELLATION_MEMORY_SECONDS)
+CANCELLATION_ENABLED = True
+CANCELLATION_PROBE_INTERVAL_SECONDS = 0.5
+CANCELLATION_MEMORY_SECONDS = 60
+
 # Content Keys
 START_PAGE_KEY = "start_page"
 END_PAGE_KEY = "end_page"
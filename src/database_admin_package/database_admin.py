@@ -1,29 +1,42 @@
 # database_admin.py
 import time
 import numpy as np
+from typing import Dict, List, Tuple
 from chromadb import PersistentClient
 from chromadb.config import Settings
+from tracing_package.tracing import get_logger
 import config
 
+logger = get_logger("database_admin")
+
 class DatabaseAdmin:
     """Handles ChromaDB operations and vector retrieval"""
     
     def __init__(self):
         self.client = None
         self.collection = None
+        self.centroid_collection = None
+        self.search_bundle = None
+        # parent id -> [(child node, embedding row)], for per-level queries on a bundle
+        self.children_by_parent = None
     
-    def initialize_chromadb(self):
-        """Initialize ChromaDB client and collection"""
+    def initialize_chromadb(self, path: str = None):
+        """Initialize ChromaDB client and collection, from config.VECTOR_DATABASE_PATH by default"""
         try:
             # Initialize ChromaDB client
             self.client = PersistentClient(
-                path=config.VECTOR_DATABASE_PATH,
+                path=path or config.VECTOR_DATABASE_PATH,
                 settings=Settings(anonymized_telemetry=False)
             )
             
             start_time = time.time()
             # Get the collection
             self.collection = self.client.get_collection(config.COLLECTION_NAME)
+            try:
+                self.centroid_collection = self.client.get_collection(config.CENTROID_COLLECTION_NAME)
+            except Exception:
+                self.centroid_collection = None
+                print(f"⚠️ No '{config.CENTROID_COLLECTION_NAME}' collection, nodes are scored by title only")
             elapsed = time.time() - start_time
             print(f"✅ ChromaDB initialized successfully in {elapsed:.8f} seconds")
             return self.collection
@@ -32,6 +45,13 @@ class DatabaseAdmin:
             print(f"❌ Failed to initialize ChromaDB: {str(e)}")
             return None
     
+    def initialize_from_bundle(self, search_bundle):
+        """Serve vectors from a memory-mapped search bundle instead of ChromaDB"""
+        self.search_bundle = search_bundle
+        self.children_by_parent = self._build_parent_index(search_bundle)
+        print(f"✅ Vector store backed by search bundle ({search_bundle.manifest['node_count']} vectors)")
+        return self.search_bundle
+    
     def get_vector(self, tree_node: str):
         """
         Retrieve embedding vector for a tree node.
@@ -42,8 +62,14 @@ class DatabaseAdmin:
         Returns:
             numpy.ndarray: The embedding vector, or None if not found
         """
+        if self.search_bundle is not None:
+            embedding = self.search_bundle.get_vector(tree_node)
+            if embedding is None:
+                logger.warning("Node '%s' not found in the search bundle", tree_node)
+            return embedding
+        
         if self.collection is None:
-            print("❌ Collection is None. Make sure to initialize ChromaDB first.")
+            logger.error("Collection is None. Make sure to initialize ChromaDB first.")
             return None
         
         # Extract the ID from the tree node
@@ -58,7 +84,7 @@ class DatabaseAdmin:
             
             # Check if we found the ID
             if not results['ids'] or len(results['ids']) == 0:
-                print(f"ID '{node_id}' not found in the database")
+                logger.warning("ID '%s' not found in the database", node_id)
                 return None
             
             # Extract and return the embedding vector
@@ -66,5 +92,227 @@ class DatabaseAdmin:
             return np.array(embedding)
             
         except Exception as e:
-            print(f"Error retrieving embedding for node '{tree_node}': {str(e)}")
-            return None
\ No newline at end of file
+            logger.error("Error retrieving embedding for node '%s': %s", tree_node, e)
+            return None
+    
+    def get_centroid(self, tree_node: str):
+        """
+        Retrieve the descendant centroid of a tree node.
+        
+        Args:
+            tree_node (str): A renamed tree node like "Preliminary_0"
+        
+        Returns:
+            numpy.ndarray: The centroid vector, or None if centroids are not available
+        """
+        if self.search_bundle is not None:
+            return self.search_bundle.get_centroid(tree_node)
+        
+        if self.centroid_collection is None:
+            return None
+        
+        try:
+            results = self.centroid_collection.get(ids=[tree_node.split("_")[-1]], include=["embeddings"])
+            if not results['ids']:
+                return None
+            return np.array(results['embeddings'][0])
+        except Exception as e:
+            logger.error("Error retrieving centroid for node '%s': %s", tree_node, e)
+            return None
+    
+    def get_vectors(self, tree_nodes: List[str]):
+        """
+        Retrieve embedding vectors for many tree nodes in one lookup.
+        
+        Args:
+            tree_nodes (List[str]): Renamed tree nodes like "Short title_1_Volume 1_1"
+        
+        Returns:
+            Tuple[List[str], numpy.ndarray]: The nodes that were found and their vectors,
+            one row per node, in the order given
+        """
+        if self.search_bundle is not None:
+            found = []
+            rows = []
+            for tree_node in tree_nodes:
+                row = self.search_bundle.get_row(tree_node)
+                if row is not None:
+                    found.append(tree_node)
+                    rows.append(row)
+            return found, self.search_bundle.embeddings[rows].astype(np.float32)
+        
+        if self.collection is None:
+            logger.error("Collection is None. Make sure to initialize ChromaDB first.")
+            return [], np.zeros((0, 0), dtype=np.float32)
+        
+        node_ids = [tree_node.split("_")[-1] for tree_node in tree_nodes]
+        try:
+            results = self.collection.get(ids=node_ids, include=["embeddings"])
+        except Exception as e:
+            logger.error("Error retrieving embeddings for %d nodes: %s", len(node_ids), e)
+            return [], np.zeros((0, 0), dtype=np.float32)
+        
+        # ChromaDB does not guarantee the order of the returned ids
+        embedding_by_id = dict(zip(results['ids'], results['embeddings']))
+        found = [tree_node for tree_node, node_id in zip(tree_nodes, node_ids) if node_id in embedding_by_id]
+        if not found:
+            return [], np.zeros((0, 0), dtype=np.float32)
+        vectors = np.array([embedding_by_id[tree_node.split("_")[-1]] for tree_node in found], dtype=np.float32)
+        return found, vectors
+    
+    def _build_parent_index(self, search_bundle) -> Dict[str, List[Tuple[str, int]]]:
+        """Group the bundle rows by parent id, the same topology the vector store records"""
+        children_by_parent = {}
+        
+        def walk(node_content, parent_id):
+            if isinstance(node_content, dict):
+                children = node_content.items()
+            elif isinstance(node_content, list):
+                children = ((child_name, None) for child_name in node_content)
+            else:
+                return
+            for child_name, child_content in children:
+                row = search_bundle.get_row(child_name)
+                if row is not None:
+                    children_by_parent.setdefault(parent_id, []).append((child_name, row))
+                walk(child_content, child_name.split("_")[-1])
+        
+        walk(search_bundle.search_tree.get(config.MIGRATION_ACT_ROOT, {}), config.TREE_ROOT_PARENT_ID)
+        return children_by_parent
+    
+    def _distance_to_similarity(self, collection, distance: float) -> float:
+        """
+        Convert a ChromaDB distance to cosine similarity.
+        The default "l2" space returns the squared distance, which for the unit-length
+        MiniLM vectors equals 2 - 2 * cosine.
+        """
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+        if space == "l2":
+            return 1.0 - distance / 2.0
+        # "cosine" and "ip" both return 1 - similarity
+        return 1.0 - distance
+    
+    def query_children_of_parents(self, search_term_vector, parent_ids: List[str],
+                                  n_results: int = 1, representation: str = "title",
+                                  centroid_weight: float = None) -> List[Tuple[str, float, str]]:
+        """
+        Nearest children across a set of tree nodes, as one filtered nearest-neighbour query.
+        Used by beam search to descend every node of the beam in a single lookup.
+        
+        Args:
+            search_term_vector: Embedded vector of the search term
+            parent_ids (List[str]): Embed ids of the parent nodes
+            n_results (int): Number of children to return in total
+            representation (str): Rank by "title" vectors, descendant "centroid" vectors,
+                                  or a "blend" of both similarities
+            centroid_weight (float): Weight of the centroid similarity in a blend,
+                                     defaults to config.NODE_SCORING_CENTROID_WEIGHT
+        
+        Returns:
+            List[Tuple[str, float, str]]: (child node, similarity, parent id), best first
+        """
+        if not parent_ids or n_results <= 0:
+            return []
+        if centroid_weight is None:
+            centroid_weight = config.NODE_SCORING_CENTROID_WEIGHT
+        
+        if self.search_bundle is not None:
+            return self._query_bundle_children(search_term_vector, parent_ids, n_results,
+                                               representation, centroid_weight)
+        
+        if self.collection is None:
+            logger.error("Collection is None. Make sure to initialize ChromaDB first.")
+            return []
+        if representation == "centroid" and self.centroid_collection is not None:
+            return self._query_collection_children(self.centroid_collection, search_term_vector,
+                                                   parent_ids, n_results)
+        if representation != "blend" or self.centroid_collection is None:
+            return self._query_collection_children(self.collection, search_term_vector,
+                                                   parent_ids, n_results)
+        
+        # A blend cannot be answered by one index: take the best candidates by each
+        # representation and rescore their union with the exact blend
+        parent_by_child = {}
+        for collection in (self.collection, self.centroid_collection):
+            for child_name, _, parent_id in self._query_collection_children(
+                    collection, search_term_vector, parent_ids, 2 * n_results):
+                parent_by_child[child_name] = parent_id
+        if not parent_by_child:
+            return []
+        found, title_vectors = self.get_vectors(list(parent_by_child))
+        try:
+            centroids = self.centroid_collection.get(ids=[name.split("_")[-1] for name in found],
+                                                     include=["embeddings"])
+        except Exception as e:
+            logger.error("Error retrieving centroids for %d nodes: %s", len(found), e)
+            return []
+        centroid_by_id = dict(zip(centroids['ids'], centroids['embeddings']))
+        query = self._unit(search_term_vector)
+        scored = []
+        for child_name, title_vector in zip(found, title_vectors):
+            centroid = centroid_by_id.get(child_name.split("_")[-1])
+            similarity = float(self._unit(title_vector) @ query)
+            if centroid is not None:
+                similarity = ((1 - centroid_weight) * similarity
+                              + centroid_weight * float(self._unit(centroid) @ query))
+            scored.append((child_name, similarity, parent_by_child[child_name]))
+        scored.sort(key=lambda child: child[1], reverse=True)
+        return scored[:n_results]
+    
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        """float32 copy of a vector scaled to unit length"""
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+    
+    def _query_bundle_children(self, search_term_vector, parent_ids: List[str], n_results: int,
+                               representation: str, centroid_weight: float) -> List[Tuple[str, float, str]]:
+        """Exact per-level scoring over the bundle rows of the children of parent_ids"""
+        candidates = [(child_name, row, parent_id) for parent_id in parent_ids
+                      for child_name, row in self.children_by_parent.get(parent_id, [])]
+        if not candidates:
+            return []
+        rows = [row for _, row, _ in candidates]
+        query = self._unit(search_term_vector)
+        
+        def similarities(matrix):
+            vectors = matrix[rows].astype(np.float32)
+            norms = np.linalg.norm(vectors, axis=1)
+            return (vectors @ query) / np.where(norms == 0, 1, norms)
+        
+        centroids = self.search_bundle.centroids
+        if representation == "centroid" and centroids is not None:
+            scores = similarities(centroids)
+        elif representation == "blend" and centroids is not None:
+            scores = ((1 - centroid_weight) * similarities(self.search_bundle.embeddings)
+                      + centroid_weight * similarities(centroids))
+        else:
+            scores = similarities(self.search_bundle.embeddings)
+        order = np.argsort(-scores)[:n_results]
+        return [(candidates[i][0], float(scores[i]), candidates[i][2]) for i in order]
+    
+    def _query_collection_children(self, collection, search_term_vector, parent_ids: List[str],
+                                   n_results: int) -> List[Tuple[str, float, str]]:
+        """One nearest-neighbour query on a collection, filtered to the children of parent_ids"""
+        if len(parent_ids) == 1:
+            where = {"parent_id": parent_ids[0]}
+        else:
+            where = {"parent_id": {"$in": list(parent_ids)}}
+        try:
+            results = collection.query(
+                query_embeddings=[np.asarray(search_term_vector, dtype=np.float32).tolist()],
+                n_results=n_results,
+                where=where,
+                include=["documents", "distances", "metadatas"]
+            )
+        except Exception as e:
+            logger.error("Error querying children of %d node(s): %s", len(parent_ids), e)
+            return []
+        
+        if not results['ids'] or not results['ids'][0]:
+            return []
+        return [
+            (document, self._distance_to_similarity(collection, distance), metadata.get("parent_id"))
+            for document, distance, metadata in
+            zip(results['documents'][0], results['distances'][0], results['metadatas'][0])
+        ]
@@ -0,0 +1,52 @@
+# index_artifacts.py
+import os
+from typing import Dict, Optional
+import config
+
+# Version name of the artifacts at the configured paths, when no version is published
+UNVERSIONED = "unversioned"
+
+
+def artifact_paths(version: Optional[str] = None) -> Dict[str, str]:
+    """
+    Where the artifacts of a version live.
+
+    Args:
+        version: Directory name under config.INDEX_ARTIFACTS_DIR, or None for the configured paths
+
+    Returns:
+        Dict: Path per artifact (search_bundle, search_tree, hashmap, vector_database,
+        bm25_index, passage_index, content_pages)
+    """
+    paths = {
+        "search_bundle": config.SEARCH_BUNDLE_PATH,
+        "search_tree": config.SEARCH_TREE_PATH,
+        "hashmap": config.HASHMAP_PATH,
+        "vector_database": config.VECTOR_DATABASE_PATH,
+        "bm25_index": config.BM25_INDEX_PATH,
+        "passage_index": config.PASSAGE_INDEX_PATH,
+        "content_pages": config.MIGRATION_ACT_CONTENT_BASE
+    }
+    if version is None:
+        return paths
+    version_dir = os.path.join(config.INDEX_ARTIFACTS_DIR, version)
+    return {name: os.path.join(version_dir, os.path.basename(os.path.normpath(path)))
+            for name, path in paths.items()}
+
+
+def published_version() -> Optional[str]:
+    """The version named in the INDEX_CURRENT_FILE pointer, None when nothing is published"""
+    pointer = os.path.join(config.INDEX_ARTIFACTS_DIR, config.INDEX_CURRENT_FILE)
+    try:
+        with open(pointer, "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def check_version_name(version: str):
+    """Reject names that are not a plain directory under INDEX_ARTIFACTS_DIR"""
+    if not version or os.path.basename(version) != version or version in (".", ".."):
+        raise ValueError(f"Invalid index version name: {version!r}")
+    if not os.path.isdir(os.path.join(config.INDEX_ARTIFACTS_DIR, version)):
+        raise ValueError(f"No index version '{version}' in {config.INDEX_ARTIFACTS_DIR}")
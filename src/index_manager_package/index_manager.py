@@ -0,0 +1,340 @@
+# index_manager.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+from database_admin_package.database_admin import DatabaseAdmin
+from my_searcher_package.my_searcher import MySearcher
+from my_metadata_loader_package.my_metadata_loader import MyMetadataLoader
+from search_bundle_package.search_bundle import SearchBundle
+from passage_index_package.passage_index import PassageIndex
+from index_manager_package.index_artifacts import (UNVERSIONED, artifact_paths, check_version_name,
+                                                   published_version)
+from metrics_package.metrics import INDEX_RELOADS, INDEX_VERSION, count
+from tracing_package.tracing import get_logger
+import config
+
+logger = get_logger("index_manager")
+
+
+class IndexSnapshot:
+    """
+    One loaded version of the index artifacts: search tree, hashmap, vectors, page text and
+    the lexical and passage indexes. A request holds on to the snapshot it started with, so a
+    reload never changes the data under it; a replaced snapshot closes once its last user is done.
+    """
+
+    def __init__(self, version: Optional[str] = None):
+        self.version = version or UNVERSIONED
+        self.paths = artifact_paths(version)
+        self.searcher = MySearcher()
+        self.database_admin = DatabaseAdmin()
+        self.metadata_loader = MyMetadataLoader(content_base=self.paths["content_pages"])
+        self.search_bundle = None
+        self.passage_index = None
+        # Seconds per load step
+        self.load_timings = {}
+        self.loaded_at = None
+        self._users = 0
+        self._retired = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _load_step(self, name: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.load_timings[name] = time.perf_counter() - start_time
+
+    def load(self):
+        """Load every artifact of the version and build the search indexes up front"""
+        if os.path.exists(self.paths["search_bundle"]):
+            self._load_from_search_bundle()
+        else:
+            print("2. Loading ChromaDB collection...")
+            with self._load_step("vector_store"):
+                collection = self.database_admin.initialize_chromadb(self.paths["vector_database"])
+            if collection is None:
+                raise Exception("Failed to initialize ChromaDB")
+
+            print("3. Loading search tree...")
+            with self._load_step("search_tree"):
+                tree = self.searcher.load_search_tree(self.paths["search_tree"])
+            if tree is None:
+                raise Exception("Failed to load search tree")
+
+            print("4. Loading metadata hashmap...")
+            with self._load_step("hashmap"):
+                hashmap = self.metadata_loader.load_hashmap(self.paths["hashmap"])
+            if hashmap is None:
+                raise Exception("Failed to load hashmap")
+
+        self._load_lexical_index()
+        self._load_passage_index()
+        # Nothing is built lazily once the snapshot serves requests
+        with self._load_step("search_indexes"):
+            self.searcher._prepare_stages(config.RETRIEVAL_STAGES, self.database_admin)
+        self.loaded_at = time.time()
+        return self
+
+    def _load_from_search_bundle(self):
+        """Load vectors, search tree, hashmap and page text from one memory-mapped bundle"""
+        print(f"2. Memory-mapping search bundle {self.paths['search_bundle']}...")
+        with self._load_step("search_bundle"):
+            self.search_bundle = SearchBundle().load(
+                self.paths["search_bundle"],
+                verify_checksum=config.VERIFY_SEARCH_BUNDLE_CHECKSUM
+            )
+        print(f"✅ Search bundle v{self.search_bundle.manifest['format_version']} "
+              f"loaded in {self.load_timings['search_bundle']:.4f} seconds")
+
+        print("3. Loading search tree, vectors and hashmap from bundle...")
+        with self._load_step("vector_store"):
+            self.database_admin.initialize_from_bundle(self.search_bundle)
+        with self._load_step("search_tree"):
+            self.searcher.load_search_tree_from_bundle(self.search_bundle)
+        with self._load_step("hashmap"):
+            self.metadata_loader.load_from_bundle(self.search_bundle)
+
+    def _load_lexical_index(self):
+        """Load the BM25 index when the lexical retrieval stage is enabled"""
+        if "bm25" not in config.RETRIEVAL_STAGES:
+            return
+        print("Loading BM25 lexical index...")
+        with self._load_step("lexical_index"):
+            lexical_index = self.searcher.load_lexical_index(self.paths["bm25_index"])
+        if lexical_index is None:
+            raise Exception("Failed to load BM25 index")
+
+    def _load_passage_index(self):
+        """Load the passage index used to pick the context inside the selected sections"""
+        if not config.PASSAGE_SEARCH_ENABLED:
+            return
+        if not os.path.exists(self.paths["passage_index"]):
+            print(f"⚠️ No passage index at {self.paths['passage_index']}, sending section beginnings instead")
+            return
+        print("Loading passage index...")
+        try:
+            with self._load_step("passage_index"):
+                self.passage_index = PassageIndex().load(self.paths["passage_index"])
+        except Exception as e:
+            print(f"❌ Failed to load passage index: {e}")
+            self.passage_index = None
+
+    def validate(self, embed: Callable[[str], Any] = None):
+        """
+        Check that the artifacts fit together before the version serves requests.
+
+        Args:
+            embed: Embeds a text; when given, a test query must find sections
+
+        Raises:
+            ValueError: Describing the first problem found
+        """
+        tree = self.searcher.search_tree
+        if not isinstance(tree, dict) or config.MIGRATION_ACT_ROOT not in tree:
+            raise ValueError(f"Search tree has no '{config.MIGRATION_ACT_ROOT}' root")
+        sections = self.searcher.collect_leaf_sections()
+        if not sections:
+            raise ValueError("Search tree has no sections")
+
+        # Hashmap keys are tree node names without the trailing embed id
+        hashmap = self.metadata_loader.hashmap or {}
+        missing = [section for section in sections if section.rsplit("_", 1)[0] not in hashmap]
+        if missing:
+            raise ValueError(f"{len(missing)} sections are not in the hashmap, e.g. '{missing[0]}'")
+
+        found_sections, vectors = self.database_admin.get_vectors(sections)
+        if not found_sections:
+            raise ValueError("Vector store has no vectors for the sections of the tree")
+        if len(found_sections) < len(sections):
+            logger.warning("%d sections have no vector", len(sections) - len(found_sections))
+
+        directory_path = self.metadata_loader.get_volume_directory_path(sections[0])
+        start_page, _ = self.metadata_loader.get_page_range(sections[0])
+        try:
+            self.metadata_loader._read_page(directory_path, start_page)
+        except OSError as e:
+            raise ValueError(f"Page text of '{sections[0]}' cannot be read: {e}")
+
+        if embed is not None:
+            query_vector = embed(config.INDEX_VALIDATION_QUERY)
+            if len(query_vector) != vectors.shape[1]:
+                raise ValueError(f"Vectors have {vectors.shape[1]} dimensions, "
+                                 f"the embedding model produces {len(query_vector)}")
+            hits = self.searcher.retrieve(query_vector, self.database_admin, limit=3,
+                                          query_text=config.INDEX_VALIDATION_QUERY)
+            if not hits:
+                raise ValueError(f"Test query '{config.INDEX_VALIDATION_QUERY}' found no sections")
+
+    def acquire(self):
+        with self._lock:
+            self._users += 1
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            close = self._retired and self._users == 0
+        if close:
+            self.close()
+
+    def retire(self):
+        """Mark the snapshot as replaced; it closes now or when its last request ends"""
+        with self._lock:
+            self._retired = True
+            close = self._users == 0
+        if close:
+            self.close()
+
+    def close(self):
+        if self.search_bundle is not None:
+            self.search_bundle.close()
+        logger.info("Index version %s closed", self.version)
+
+
+class IndexManager:
+    """
+    Serves the current IndexSnapshot and replaces it without a restart: a reload loads and
+    validates the new version next to the old one, then swaps the reference under a lock.
+    """
+
+    def __init__(self, embed: Callable[[str], Any] = None):
+        self.embed = embed
+        self.current = None
+        self.last_reload = None
+        self._swap_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+    def load_initial(self) -> IndexSnapshot:
+        """Load the published version (or the configured paths) at start-up"""
+        version = published_version()
+        if version is not None:
+            check_version_name(version)
+            print(f"📦 Index version {version}")
+        self.current = IndexSnapshot(version).load()
+        if config.METRICS_ENABLED:
+            INDEX_VERSION.set(1, version=self.current.version)
+        return self.current
+
+    @contextmanager
+    def use(self):
+        """The current snapshot, kept open until the with-block ends even if it is replaced"""
+        with self._swap_lock:
+            snapshot = self.current
+            snapshot.acquire()
+        try:
+            yield snapshot
+        finally:
+            snapshot.release()
+
+    def reload(self, version: str = None) -> Dict[str, Any]:
+        """
+        Load, validate and swap in a version. Requests already running finish on the old one.
+
+        Args:
+            version: Directory name under INDEX_ARTIFACTS_DIR, defaults to the published version
+
+        Returns:
+            Dict: {"version", "previous_version", "status", "seconds", "load_timings"}
+
+        Raises:
+            RuntimeError: When another reload is running
+            ValueError: When the version is unknown or fails validation (the old one stays)
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            raise RuntimeError("An index reload is already running")
+        try:
+            return self._reload(version)
+        finally:
+            self._reload_lock.release()
+
+    def _reload(self, version: Optional[str]) -> Dict[str, Any]:
+        start_time = time.perf_counter()
+        version = version or published_version()
+        result = {"version": version or UNVERSIONED, "previous_version": self.current.version,
+                  "status": "failed", "error": None, "started_at": time.time()}
+        logger.info("Loading index version %s", result["version"])
+        snapshot = None
+        try:
+            if version is not None:
+                check_version_name(version)
+            snapshot = IndexSnapshot(version).load()
+            snapshot.validate(self.embed)
+        except Exception as e:
+            if snapshot is not None:
+                snapshot.close()
+            result["error"] = str(e)
+            result["seconds"] = time.perf_counter() - start_time
+            self.last_reload = result
+            count(INDEX_RELOADS, status="failed")
+            logger.error("Index version %s rejected, still serving %s: %s",
+                         result["version"], result["previous_version"], e)
+            raise ValueError(str(e)) from e
+
+        with self._swap_lock:
+            previous, self.current = self.current, snapshot
+        previous.retire()
+        if config.METRICS_ENABLED:
+            INDEX_VERSION.set(0, version=previous.version)
+            INDEX_VERSION.set(1, version=snapshot.version)
+        result.update(status="ok", seconds=time.perf_counter() - start_time,
+                      load_timings=snapshot.load_timings)
+        self.last_reload = result
+        count(INDEX_RELOADS, status="ok")
+        logger.info("Index version %s live after %.2fs (was %s)",
+                    snapshot.version, result["seconds"], previous.version)
+        return result
+
+    def reload_in_background(self, version: str = None) -> bool:
+        """Start a reload on a background thread; False when one is already running"""
+        if self._reload_lock.locked():
+            return False
+
+        def run():
+            try:
+                self.reload(version)
+            except (RuntimeError, ValueError):
+                pass
+
+        threading.Thread(target=run, name="index-reload", daemon=True).start()
+        return True
+
+    def start_watching(self, interval: float = None):
+        """Reload whenever the INDEX_CURRENT_FILE pointer names another version"""
+        if self._watcher is not None:
+            return
+        interval = interval or config.INDEX_WATCH_INTERVAL_SECONDS
+
+        def watch():
+            rejected = None
+            while True:
+                time.sleep(interval)
+                version = published_version()
+                if version is None or version == self.current.version or version == rejected:
+                    continue
+                try:
+                    self.reload(version)
+                    rejected = None
+                except RuntimeError:
+                    pass
+                except ValueError:
+                    # Do not retry a broken version until the pointer changes again
+                    rejected = version
+
+        self._watcher = threading.Thread(target=watch, name="index-watcher", daemon=True)
+        self._watcher.start()
+        logger.info("Watching %s for new index versions",
+                    os.path.join(config.INDEX_ARTIFACTS_DIR, config.INDEX_CURRENT_FILE))
+
+    def status(self) -> Dict[str, Any]:
+        """The version being served and the outcome of the last reload"""
+        return {
+            "version": self.current.version,
+            "loaded_at": self.current.loaded_at,
+            "published_version": published_version(),
+            "reloading": self._reload_lock.locked(),
+            "last_reload": self.last_reload
+        }
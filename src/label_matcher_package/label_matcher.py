@@ -0,0 +1,112 @@
+# label_matcher.py
+import re
+from typing import Any, Dict, List, Tuple
+
+DASHES = re.compile(r"[-‐‑‒–—]")
+NON_WORD = re.compile(r"[^a-z0-9 ]+")
+
+
+def normalize_label(text: str) -> str:
+    """
+    Normalize a label or search term for fuzzy comparison: lowercase,
+    hyphens and dashes as spaces, punctuation dropped and plural words singularized.
+    """
+    text = DASHES.sub(" ", text.lower().replace("’", "'").replace("'s", ""))
+    words = NON_WORD.sub(" ", text).split()
+    return " ".join(_singularize(word) for word in words)
+
+
+def _singularize(word: str) -> str:
+    """Very small plural stripper, enough to match "visas" with "visa" """
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def trigrams(text: str) -> set:
+    """Character trigrams of a normalized string, padded so word edges count"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LabelMatcher:
+    """Trigram index over the cleaned labels of every search tree node"""
+    
+    def __init__(self):
+        self.labels = []            # normalized label per label id
+        self.label_trigram_counts = []
+        self.nodes_by_label = []    # renamed tree nodes carrying each label
+        self.postings = {}          # trigram -> label ids
+    
+    def build(self, search_tree_root: Dict[str, Any]):
+        """
+        Index every node label of the search tree.
+        
+        Args:
+            search_tree_root: Children of the Migration Act root, as in the search tree JSON
+        
+        Returns:
+            LabelMatcher: self, for chaining
+        """
+        label_ids = {}
+        
+        def add(node_name: str):
+            label = normalize_label(node_name.split("_")[0])
+            if not label:
+                return
+            if label not in label_ids:
+                label_ids[label] = len(self.labels)
+                self.labels.append(label)
+                self.nodes_by_label.append([])
+            self.nodes_by_label[label_ids[label]].append(node_name)
+        
+        def walk(node_content):
+            if isinstance(node_content, dict):
+                for child_name, child_content in node_content.items():
+                    add(child_name)
+                    walk(child_content)
+            elif isinstance(node_content, list):
+                for child_name in node_content:
+                    if isinstance(child_name, str):
+                        add(child_name)
+        
+        walk(search_tree_root)
+        
+        for label_id, label in enumerate(self.labels):
+            grams = trigrams(label)
+            self.label_trigram_counts.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(label_id)
+        return self
+    
+    def match_labels(self, search_term: str, limit: int = 5) -> List[Tuple[str, float, List[str]]]:
+        """
+        Find the labels closest to a search term by trigram Dice similarity.
+        
+        Args:
+            search_term: Search term, e.g. produced by the search-term LLM
+            limit: Maximum number of distinct labels to return
+        
+        Returns:
+            List[Tuple[str, float, List[str]]]: (normalized label, similarity, renamed tree
+            nodes carrying the label), best first
+        """
+        query = normalize_label(search_term)
+        if not query:
+            return []
+        query_grams = trigrams(query)
+        
+        shared = {}
+        for gram in query_grams:
+            for label_id in self.postings.get(gram, ()):
+                shared[label_id] = shared.get(label_id, 0) + 1
+        
+        scored = sorted(
+            ((2.0 * count / (len(query_grams) + self.label_trigram_counts[label_id]), label_id)
+             for label_id, count in shared.items()),
+            reverse=True
+        )[:limit]
+        
+        return [(self.labels[label_id], score, self.nodes_by_label[label_id]) for score, label_id in scored]
@@ -0,0 +1,208 @@
+# bm25_index.py
+import re
+import time
+from typing import Dict, List, Tuple
+import numpy as np
+import config
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# "s 501", "s. 501", "section 501", "ss 36" -> one "ref501" style token
+SECTION_REFERENCE_PATTERN = re.compile(r"\b(?:s|ss|sec|section|sections)\.?\s*(\d+[a-z]*)\b")
+STOPWORDS = frozenset("""
+a an and are as at be been being by can could do does for from has have how i if in into is it
+its may me my of on or our shall should so such than that the their them then there these they
+this to under was we were what when where which who whom why will with would you your
+""".split())
+
+
+def section_reference_token(section_code: str) -> str:
+    """Token standing for a reference to a section, e.g. "501" -> "ref501" """
+    return f"ref{section_code.lower()}"
+
+
+def section_references(text: str) -> List[str]:
+    """Lowercase section codes referenced in the text, e.g. "see s 501 and section 5AA" -> ["501", "5aa"]"""
+    return SECTION_REFERENCE_PATTERN.findall(text.lower())
+
+
+def singular(token: str) -> str:
+    """Fold a plain plural onto its singular ("visas" -> "visa") so titles match questions"""
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens with stopwords removed and plurals folded; section references
+    such as "s 501" or "section 5AA" also produce a section reference token.
+    """
+    text = text.lower().replace("’", "'").replace("‑", "-")
+    tokens = [section_reference_token(code) for code in SECTION_REFERENCE_PATTERN.findall(text)]
+    tokens.extend(singular(token) for token in TOKEN_PATTERN.findall(text) if token not in STOPWORDS)
+    return tokens
+
+
+class _FieldPostings:
+    """Postings of one field of the sections (their text or their titles) with its BM25 parts"""
+    
+    def __init__(self, data, prefix: str, k1: float, b: float):
+        terms = bytes(data[prefix + "vocabulary"]).decode("utf-8").split("\n")
+        self.term_to_index = {term: i for i, term in enumerate(terms)}
+        self.term_offsets = data[prefix + "term_offsets"]
+        self.posting_doc_ids = data[prefix + "posting_doc_ids"]
+        self.posting_term_freqs = data[prefix + "posting_term_freqs"].astype(np.float32)
+        doc_lengths = data[prefix + "doc_lengths"].astype(np.float32)
+        average_doc_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        self.k1 = k1
+        # Document length normalisation only depends on the document, precompute it
+        self.length_norm = k1 * (1 - b + b * doc_lengths / max(average_doc_length, 1e-9))
+    
+    def add_scores(self, terms, scores: np.ndarray, weight: float):
+        """Add the weighted BM25 score of each term to the scores of the sections containing it"""
+        doc_count = len(scores)
+        for term in terms:
+            term_index = self.term_to_index.get(term)
+            if term_index is None:
+                continue
+            start, end = self.term_offsets[term_index], self.term_offsets[term_index + 1]
+            doc_ids = self.posting_doc_ids[start:end]
+            term_freqs = self.posting_term_freqs[start:end]
+            document_frequency = end - start
+            idf = np.log(1 + (doc_count - document_frequency + 0.5) / (document_frequency + 0.5))
+            scores[doc_ids] += weight * idf * term_freqs * (self.k1 + 1) / (term_freqs + self.length_norm[doc_ids])
+
+
+class BM25Index:
+    """
+    Inverted index over section text and titles with a BM25 scorer.
+    
+    Titles are a separate field weighted by BM25_TITLE_WEIGHT. A section's own code is kept
+    apart from the "ref501" terms of the sections citing it: a query naming the section
+    ("s 501") adds a fixed BM25_SECTION_CODE_WEIGHT to that section.
+    """
+    
+    def __init__(self):
+        self.doc_keys = None
+        self.text = None
+        self.title = None
+        self.doc_ids_by_code = None
+        self.k1 = config.BM25_K1
+        self.b = config.BM25_B
+        self.title_weight = config.BM25_TITLE_WEIGHT
+        self.section_code_weight = config.BM25_SECTION_CODE_WEIGHT
+    
+    def load(self, path: str = None):
+        """
+        Load a BM25 index written by data_preparation/build_lexical_index/build_bm25_index.py.
+        
+        Returns:
+            BM25Index: self, for chaining
+        """
+        if path is None:
+            path = config.BM25_INDEX_PATH
+        start_time = time.time()
+        with np.load(path) as data:
+            self.doc_keys = bytes(data["doc_keys"]).decode("utf-8").split("\n")
+            self.text = _FieldPostings(data, "text_", self.k1, self.b)
+            self.title = _FieldPostings(data, "title_", self.k1, self.b)
+            section_codes = bytes(data["section_codes"]).decode("utf-8").split("\n")
+        self.doc_ids_by_code = {}
+        for doc_id, code in enumerate(section_codes):
+            self.doc_ids_by_code.setdefault(code.lower(), []).append(doc_id)
+        print(f"✅ BM25 index loaded: {len(self.doc_keys)} sections, {len(self.text.term_to_index)} terms "
+              f"({time.time() - start_time:.4f} seconds)")
+        return self
+    
+    def search(self, query: str, k: int = None) -> List[Tuple[str, float]]:
+        """
+        Rank sections for a query with BM25.
+        
+        Args:
+            query: Free text, e.g. the search term and the user question
+            k: Number of sections to return
+        
+        Returns:
+            List[Tuple[str, float]]: (hashmap section key, BM25 score), best first
+        """
+        if k is None:
+            k = config.BM25_TOP_K
+        
+        scores = np.zeros(len(self.doc_keys), dtype=np.float32)
+        terms = set(tokenize(query))
+        self.text.add_scores(terms, scores, 1.0)
+        self.title.add_scores(terms, scores, self.title_weight)
+        
+        # Sections the query names by code
+        for code in set(section_references(query)):
+            for doc_id in self.doc_ids_by_code.get(code, ()):
+                scores[doc_id] += self.section_code_weight
+        
+        matched = np.flatnonzero(scores)
+        if len(matched) == 0:
+            return []
+        k = min(k, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(self.doc_keys[i], float(scores[i])) for i in top]
+
+
+def build_postings(documents: List[List[str]]) -> Dict[str, np.ndarray]:
+    """
+    Build the compact postings arrays of one field from tokenized documents.
+    
+    Terms are sorted; the postings of term i are the slice
+    term_offsets[i]:term_offsets[i + 1] of posting_doc_ids / posting_term_freqs.
+    Doc ids and term frequencies use the smallest unsigned type that fits.
+    
+    Args:
+        documents: Tokens per section, in document id order
+    
+    Returns:
+        Dict[str, numpy.ndarray]: The field's arrays
+    """
+    postings = {}
+    for doc_id, tokens in enumerate(documents):
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            postings.setdefault(token, []).append((doc_id, count))
+    
+    terms = sorted(postings)
+    term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    term_offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+    doc_ids = [doc_id for term in terms for doc_id, _ in postings[term]]
+    term_freqs = [count for term in terms for _, count in postings[term]]
+    
+    doc_id_dtype = np.uint16 if len(documents) <= np.iinfo(np.uint16).max else np.uint32
+    freq_dtype = np.uint16 if max(term_freqs, default=0) <= np.iinfo(np.uint16).max else np.uint32
+    return {
+        "vocabulary": np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+        "term_offsets": term_offsets,
+        "posting_doc_ids": np.array(doc_ids, dtype=doc_id_dtype),
+        "posting_term_freqs": np.array(term_freqs, dtype=freq_dtype),
+        "doc_lengths": np.array([len(tokens) for tokens in documents], dtype=np.uint32)
+    }
+
+
+def build_index_arrays(text_tokens: Dict[str, List[str]], title_tokens: List[List[str]],
+                       section_codes: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Build every array of a BM25 index file.
+    
+    Args:
+        text_tokens: Tokens of the section text per section key, in document id order
+        title_tokens: Tokens of each section's title, in document id order
+        section_codes: Each section's own code ("501"), in document id order
+    
+    Returns:
+        Dict[str, numpy.ndarray]: Arrays ready for numpy.savez
+    """
+    arrays = {
+        "doc_keys": np.frombuffer("\n".join(text_tokens).encode("utf-8"), dtype=np.uint8),
+        "section_codes": np.frombuffer("\n".join(section_codes).encode("utf-8"), dtype=np.uint8)
+    }
+    for prefix, documents in (("text_", list(text_tokens.values())), ("title_", title_tokens)):
+        arrays.update({prefix + name: array for name, array in build_postings(documents).items()})
+    return arrays
@@ -1,24 +1,47 @@
 # main.py
 from search_term_handler_package.search_term_handler import SearchTermHandler
-from database_admin_package.database_admin import DatabaseAdmin
-from my_searcher_package.my_searcher import MySearcher
-from my_metadata_loader_package.my_metadata_loader import MyMetadataLoader
+from index_manager_package.index_manager import IndexManager
+from reranker_package.cross_encoder_reranker import CrossEncoderReranker
+from batch_runner_package.batch_runner import run_batch
+from single_flight_package.single_flight import SingleFlight, normalize_text
+from cancellation_package.cancellation import check_cancelled, invoke_llm
+from metrics_package.metrics import CACHE_HITS, ERRORS, FALLBACKS, count, observe_stage
+from tracing_package.tracing import configure_logging, get_logger, map_in_context, request_context
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+import argparse
+import contextlib
+import json
+import logging
+import sys
 import time
 import config
 
+logger = get_logger("chatbot")
+
 class MigrationActChatbot:
     """Intelligent chatbot that can search Migration Act when needed"""
     
     def __init__(self):
         print("🤖 Initializing Migration Act Chatbot...")
         
-        # Initialize search pipeline components
-        self.search_term_handler = SearchTermHandler()
-        self.database_admin = DatabaseAdmin()
-        self.searcher = MySearcher()
-        self.metadata_loader = MyMetadataLoader()
+        # Seconds per start-up step, see _startup_step
+        self.startup_timings = {}
+        
+        # Initialize search pipeline components; the index artifacts (tree, hashmap,
+        # vectors, page text) live in hot-reloadable snapshots of the index manager
+        with self._startup_step("search_term_llm"):
+            self.search_term_handler = SearchTermHandler()
+        self.index_manager = IndexManager(embed=self.search_term_handler.embed_search_term)
+        self.reranker = None
+        
+        # Identical work of concurrent requests runs once: the whole pipeline per question,
+        # retrieval per search terms and content loading per section set
+        self.question_flight = SingleFlight("question")
+        self.retrieval_flight = SingleFlight("retrieval")
+        self.content_flight = SingleFlight("content")
         
         # Initialize LLM for chat
         self.chat_llm = None
@@ -27,31 +50,61 @@ class MigrationActChatbot:
         
         # Pre-load all components
         self._initialize_all_components()
-        self._initialize_chat_llm()
+        with self._startup_step("chat_llm"):
+            self._initialize_chat_llm()
         
         print("🎉 Chatbot ready! Type 'quit' or 'exit' to end the conversation.\n")
     
+    # The components of the index version being served; requests take a snapshot instead
+    @property
+    def searcher(self):
+        return self.index_manager.current.searcher
+    
+    @property
+    def database_admin(self):
+        return self.index_manager.current.database_admin
+    
+    @property
+    def metadata_loader(self):
+        return self.index_manager.current.metadata_loader
+    
+    @property
+    def passage_index(self):
+        return self.index_manager.current.passage_index
+    
+    @property
+    def search_bundle(self):
+        return self.index_manager.current.search_bundle
+    
+    @contextlib.contextmanager
+    def _startup_step(self, name: str):
+        """Record how long one start-up step takes in self.startup_timings"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.startup_timings[name] = time.perf_counter() - start_time
+    
     def _initialize_all_components(self):
         """Pre-initialize search components"""
         print("\n📋 Loading search components...")
         
         print("1. Loading embedding model...")
-        self.search_term_handler.initialize_embedding_model()
-        
-        print("2. Loading ChromaDB collection...")
-        collection = self.database_admin.initialize_chromadb()
-        if collection is None:
-            raise Exception("Failed to initialize ChromaDB")
-        
-        print("3. Loading search tree...")
-        tree = self.searcher.load_search_tree()
-        if tree is None:
-            raise Exception("Failed to load search tree")
-        
-        print("4. Loading metadata hashmap...")
-        hashmap = self.metadata_loader.load_hashmap()
-        if hashmap is None:
-            raise Exception("Failed to load hashmap")
+        with self._startup_step("embedding_model"):
+            self.search_term_handler.initialize_embedding_model()
+        
+        snapshot = self.index_manager.load_initial()
+        self.startup_timings.update(snapshot.load_timings)
+        self._initialize_reranker()
+    
+    def _initialize_reranker(self):
+        """Load the cross-encoder when reranking is enabled"""
+        if not config.RERANKER_ENABLED:
+            return
+        print("Loading cross-encoder reranker...")
+        with self._startup_step("reranker"):
+            self.reranker = CrossEncoderReranker()
+            self.reranker.initialize_model()
     
     def _initialize_chat_llm(self):
         """Initialize LLM for chat and decision making"""
@@ -62,7 +115,9 @@ class MigrationActChatbot:
             openai_api_base=config.OPENROUTER_API_BASE,
             model=config.MODEL_NAME,
             temperature=0.3,
-            max_tokens=500
+            max_tokens=500,
+            timeout=config.LLM_REQUEST_TIMEOUT,
+            max_retries=config.LLM_MAX_RETRIES
         )
         
         # Decision prompt - determines if search is needed
@@ -138,102 +193,476 @@ Generate a helpful response:""")
         """Determine if the question requires searching Migration Act"""
         try:
             start_time = time.time()
-            response = self.decision_chain.invoke({"question": user_question})
+            response = invoke_llm(self.decision_chain, {"question": user_question}, "routing_llm")
             decision = response.content.strip().upper()
             end_time = time.time()
             
-            print(f"🧠 Decision: {decision} ({end_time - start_time:.2f}s)")
+            logger.info("Decision: %s (%.2fs)", decision, end_time - start_time)
             return decision == "SEARCH"
         except Exception as e:
-            print(f"❌ Decision error: {e}")
+            logger.error("Decision error: %s", e)
+            count(ERRORS, stage="routing_llm")
+            count(FALLBACKS, kind="routing_default_search")
             # Default to search if unsure
             return True
     
-    def _search_migration_act(self, user_question: str) -> str:
+    def _search_migration_act(self, user_question: str, details: Dict[str, Any] = None,
+                              trace=None) -> str:
         """Search Migration Act and return formatted results"""
-        print("🔍 Searching Migration Act database...")
+        if details is None:
+            details = self._new_message_details(user_question)
+        timings = details["timings"]
         
         try:
-            # Generate search term
-            search_term = self.search_term_handler.generate_search_term(user_question)
-            if not search_term:
+            # Generate search term(s)
+            start_time = time.perf_counter()
+            search_terms = self._generate_search_terms(user_question)
+            timings["search_term_llm"] = time.perf_counter() - start_time
+            details["search_terms"] = search_terms
+            if not search_terms:
                 return "No search results - could not generate search term."
             
-            print(f"📝 Search term: '{search_term}'")
-            
-            # Embed and search
-            search_term_vector = self.search_term_handler.embed_search_term(search_term)
-            sections = self.searcher.search_term_on_tree(
-                search_term_vector=search_term_vector,
-                database_admin=self.database_admin,
-                limit=3
-            )
-            
-            if not sections:
-                return "No relevant sections found in Migration Act."
-            
-            # Get content for sections
-            search_results = f"Search term used: {search_term}\n\n"
-            search_results += f"Found {len(sections)} relevant sections:\n\n"
-            
-            for i, section in enumerate(sections, 1):
-                try:
-                    content = self.metadata_loader.get_section_content(section)
-                    if content:
-                        # Extract section number and clean content
-                        section_parts = section.split('_')
-                        section_number = section_parts[1] if len(section_parts) > 1 else "Unknown"
-                        
-                        search_results += f"SECTION {i} (Section {section_number}):\n"
-                        search_results += content[:2000] + "\n\n"  # Limit content length
-                except Exception as e:
-                    print(f"Error getting content for {section}: {e}")
-                    continue
+            logger.info("Search terms: %s", search_terms)
+            check_cancelled("retrieval")
             
-            return search_results
+            # The whole search reads one index version, even if a reload swaps it meanwhile
+            with self.index_manager.use() as index:
+                hits, question_vector = self._retrieve_hits(user_question, search_terms, timings,
+                                                            trace=trace, index=index)
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("Sections: %s", ", ".join(
+                        f"{hit['section']} ({'+'.join(hit['sources'])}, {hit['score']:.4f})" for hit in hits))
+                sections = [hit["section"] for hit in hits]
+                details["sections"] = sections
+                
+                if not sections:
+                    return "No relevant sections found in Migration Act."
+                
+                check_cancelled("content_load")
+                return self._build_search_results(user_question, search_terms, sections,
+                                                  question_vector, timings, index=index)
             
         except Exception as e:
-            print(f"❌ Search error: {e}")
+            logger.exception("Search error: %s", e)
+            count(ERRORS, stage="search")
             return f"Search error: {str(e)}"
     
+    def _generate_search_terms(self, user_question: str) -> List[str]:
+        """One search term, or several when query expansion is enabled"""
+        if config.SEARCH_TERM_EXPANSION_ENABLED:
+            return self.search_term_handler.generate_search_terms(user_question)
+        search_term = self.search_term_handler.generate_search_term(user_question)
+        return [search_term] if search_term else []
+    
+    def _retrieve_hits(self, user_question: str, search_terms: List[str], timings: Dict[str, float],
+                       search_term_vectors=None, trace=None, index=None) -> Tuple[List[Dict[str, Any]], Any]:
+        """
+        Find the sections for the search terms.
+        
+        Args:
+            user_question: The user question
+            search_terms: Search terms generated for the question
+            timings: Stage timings to add "embedding" and "retrieval" to
+            search_term_vectors: Vectors of the terms when they were already embedded
+            trace: Optional RequestTrace to record the search in
+            index: IndexSnapshot to search, defaults to the current one
+        
+        Returns:
+            Tuple[List[Dict], Any]: The hits, best first, and the question vector when it
+            was embedded along the way (None otherwise)
+        """
+        if index is None:
+            index = self.index_manager.current
+        if trace is not None or not config.SINGLE_FLIGHT_ENABLED:
+            return self._run_retrieval(user_question, search_terms, timings, search_term_vectors, trace, index)
+        
+        # The question only matters to the lexical stage, the reranker, multi-term searches and
+        # the question vector embedded next to the term for passage selection
+        key = (index.version, tuple(normalize_text(term) for term in search_terms))
+        if (len(search_terms) > 1 or "bm25" in config.RETRIEVAL_STAGES or self.reranker is not None
+                or index.passage_index is not None):
+            key += (normalize_text(user_question),)
+        start_time = time.perf_counter()
+        (hits, question_vector), coalesced = self.retrieval_flight.do(
+            key, lambda: self._run_retrieval(user_question, search_terms, timings,
+                                             search_term_vectors, None, index))
+        if coalesced:
+            timings["retrieval"] = time.perf_counter() - start_time
+        return list(hits), question_vector
+    
+    def _run_retrieval(self, user_question: str, search_terms: List[str], timings: Dict[str, float],
+                       search_term_vectors, trace, index) -> Tuple[List[Dict[str, Any]], Any]:
+        """Embed the search terms and retrieve their sections, see _retrieve_hits"""
+        # With a reranker, retrieve a wider candidate set and let it pick the best
+        candidate_limit = config.RERANKER_MAX_CANDIDATES if self.reranker is not None else 3
+        needs_vectors = any(stage != "bm25" for stage in config.RETRIEVAL_STAGES)
+        question_vector = None
+        hits = []
+        start_time = time.perf_counter()
+        embedding_time = 0.0
+        if len(search_terms) > 1:
+            # Embed every term in one batch, search them concurrently and merge
+            if needs_vectors and search_term_vectors is None:
+                embed_start = time.perf_counter()
+                search_term_vectors = self.search_term_handler.embed_search_terms(search_terms)
+                embedding_time += time.perf_counter() - embed_start
+            if search_term_vectors is not None and user_question.strip() in search_terms:
+                question_vector = search_term_vectors[search_terms.index(user_question.strip())]
+            hits = index.searcher.retrieve_many(
+                search_terms, search_term_vectors if needs_vectors else None, index.database_admin,
+                limit=candidate_limit, user_question=user_question, trace=trace
+            )
+        else:
+            # A search term copying a node label resolves without embedding or tree descent
+            if config.LABEL_MATCH_ENABLED:
+                hits = index.searcher.resolve_label_match(search_terms[0], limit=3)
+                if hits:
+                    logger.info("Confident label match, skipping embedding and tree search")
+                    count(CACHE_HITS, cache="label_match")
+                    if trace is not None:
+                        trace.add_event("label_match", sections=[hit["section"] for hit in hits])
+            
+            if not hits:
+                # Embed (unless only lexical search runs) and search
+                search_term_vector = None
+                if needs_vectors:
+                    if search_term_vectors is not None:
+                        search_term_vector = search_term_vectors[0]
+                    elif index.passage_index is not None and user_question.strip() != search_terms[0]:
+                        # Passage selection needs the question too, embed both in one batch
+                        embed_start = time.perf_counter()
+                        search_term_vector, question_vector = self.search_term_handler.embed_search_terms(
+                            [search_terms[0], user_question])
+                        embedding_time += time.perf_counter() - embed_start
+                    else:
+                        embed_start = time.perf_counter()
+                        search_term_vector = self.search_term_handler.embed_search_term(search_terms[0])
+                        embedding_time += time.perf_counter() - embed_start
+                hits = index.searcher.retrieve(
+                    search_term_vector=search_term_vector,
+                    database_admin=index.database_admin,
+                    limit=candidate_limit,
+                    query_text=f"{search_terms[0]} {user_question}",
+                    trace=trace
+                )
+        if self.reranker is not None and not all("label_match" in hit["sources"] for hit in hits):
+            hits = self.reranker.rerank(user_question, hits,
+                                        index.metadata_loader.get_section_excerpt, limit=3)
+            if trace is not None:
+                trace.add_event("rerank", sections=[hit["section"] for hit in hits])
+        timings["embedding"] = timings.get("embedding", 0.0) + embedding_time
+        timings["retrieval"] = time.perf_counter() - start_time - embedding_time
+        if trace is not None:
+            trace.set_sections(hits[:3])
+        return hits[:3], question_vector
+    
+    def _build_search_results(self, user_question: str, search_terms: List[str], sections: List[str],
+                              question_vector, timings: Dict[str, float],
+                              section_contents: Dict[str, str] = None, index=None) -> str:
+        """
+        Load the content of the sections and format it for the answer prompt.
+        
+        Args:
+            user_question: The user question
+            search_terms: Search terms used
+            sections: Sections to include, best first
+            question_vector: Embedded question, or None to embed it for passage selection
+            timings: Stage timings to add "content_load" to
+            section_contents: Optional cache of section content shared between questions
+            index: IndexSnapshot to read the sections from, defaults to the current one
+        
+        Returns:
+            str: The formatted search results
+        """
+        if index is None:
+            index = self.index_manager.current
+        if not config.SINGLE_FLIGHT_ENABLED:
+            return self._load_search_results(user_question, search_terms, sections, question_vector,
+                                             timings, section_contents, index)
+        
+        # Section text depends on the sections only, passage selection also on the question
+        key = (index.version, tuple(search_terms), tuple(sections))
+        if index.passage_index is not None:
+            key += (normalize_text(user_question),)
+        start_time = time.perf_counter()
+        search_results, coalesced = self.content_flight.do(
+            key, lambda: self._load_search_results(user_question, search_terms, sections, question_vector,
+                                                   timings, section_contents, index))
+        if coalesced:
+            timings["content_load"] = time.perf_counter() - start_time
+        return search_results
+    
+    def _load_search_results(self, user_question: str, search_terms: List[str], sections: List[str],
+                             question_vector, timings: Dict[str, float],
+                             section_contents: Dict[str, str], index) -> str:
+        """Read the sections (or their best passages) and format them, see _build_search_results"""
+        start_time = time.perf_counter()
+        
+        # Pick the passages of the sections that best match the question
+        passages_by_key = {}
+        if index.passage_index is not None:
+            if question_vector is None:
+                question_vector = self.search_term_handler.embed_search_term(user_question)
+            # Hashmap keys are tree node names without the trailing embed id
+            passages_by_key = index.passage_index.select_passages(
+                question_vector, [section.rsplit("_", 1)[0] for section in sections])
+        
+        # Get content for sections
+        search_results = f"Search term used: {', '.join(search_terms)}\n\n"
+        search_results += f"Found {len(sections)} relevant sections:\n\n"
+        
+        for i, section in enumerate(sections, 1):
+            try:
+                passages = passages_by_key.get(section.rsplit("_", 1)[0])
+                if passages:
+                    logger.debug("%d passage(s) from %s", len(passages), section)
+                    content = "\n...\n".join(passage for passage, _ in passages)
+                else:
+                    if index.passage_index is not None:
+                        count(FALLBACKS, kind="passage_to_section_start")
+                    if section_contents is not None and section in section_contents:
+                        content = section_contents[section]
+                        count(CACHE_HITS, cache="section_content")
+                    else:
+                        content = index.metadata_loader.get_section_content(section)
+                        if section_contents is not None:
+                            section_contents[section] = content
+                    content = content[:config.PASSAGE_FALLBACK_CHARS]  # Limit content length
+                if content:
+                    # Extract section number and clean content
+                    section_parts = section.split('_')
+                    section_number = section_parts[1] if len(section_parts) > 1 else "Unknown"
+                    
+                    search_results += f"SECTION {i} (Section {section_number}):\n"
+                    search_results += content + "\n\n"
+            except Exception as e:
+                logger.error("Error getting content for %s: %s", section, e)
+                count(ERRORS, stage="content_load")
+                continue
+        
+        timings["content_load"] = time.perf_counter() - start_time
+        return search_results
+    
     def _generate_response(self, user_question: str, search_results: str = "") -> str:
         """Generate final response using LLM"""
         try:
             start_time = time.time()
-            response = self.response_chain.invoke({
+            response = invoke_llm(self.response_chain, {
                 "question": user_question,
                 "search_results": search_results
-            })
+            }, "answer_llm")
             end_time = time.time()
             
-            print(f"💬 Response generated ({end_time - start_time:.2f}s)")
+            logger.info("Response generated (%.2fs)", end_time - start_time)
             return response.content.strip()
         except Exception as e:
-            print(f"❌ Response generation error: {e}")
+            logger.error("Response generation error: %s", e)
+            count(ERRORS, stage="answer_llm")
             return "I apologize, I'm having trouble generating a response right now."
     
-    def process_user_message(self, user_message: str) -> str:
-        """Process a single user message and return response"""
-        print(f"\n{'='*60}")
-        print(f"User: {user_message}")
-        print(f"{'='*60}")
+    def _record_timings(self, timings: Dict[str, float]):
+        """Add the stage timings of one message to the latency histograms"""
+        for stage, seconds in timings.items():
+            observe_stage(stage, seconds)
+    
+    def _new_message_details(self, user_message: str) -> Dict[str, Any]:
+        """Empty record of how a message was processed"""
+        return {
+            "question": user_message,
+            "answer": None,
+            "needs_search": False,
+            "search_terms": [],
+            "sections": [],
+            "timings": {}
+        }
+    
+    def process_user_message_detailed(self, user_message: str, trace=None) -> Dict[str, Any]:
+        """
+        Process a single user message and report how the answer was produced.
+        
+        Args:
+            user_message: The user question
+            trace: Optional RequestTrace; when given, the search path, the scores per level
+                   and the chosen sections are recorded and returned under "trace"
+        
+        Returns:
+            Dict: {"question", "answer", "needs_search", "search_terms", "sections", "timings"}
+            where timings holds the seconds spent per stage (routing_llm, search_term_llm,
+            embedding, retrieval, content_load, answer_llm) and in total. A message that
+            waited for the identical question of a concurrent request gets that request's
+            answer, "coalesced": True and only the total time
+        """
+        if trace is not None or not config.SINGLE_FLIGHT_ENABLED:
+            return self._process_user_message(user_message, trace)
+        
+        start_time = time.perf_counter()
+        details, coalesced = self.question_flight.do(
+            normalize_text(user_message), lambda: self._process_user_message(user_message))
+        if not coalesced:
+            return details
+        total = time.perf_counter() - start_time
+        # The stages ran (and were recorded) once, in the other request
+        observe_stage("total", total)
+        return dict(details, question=user_message, timings={"total": total}, coalesced=True)
+    
+    def _process_user_message(self, user_message: str, trace=None) -> Dict[str, Any]:
+        """Route, search and answer one message, see process_user_message_detailed"""
+        logger.info("User: %s", user_message)
+        
+        details = self._new_message_details(user_message)
+        timings = details["timings"]
+        total_start = time.perf_counter()
         
         # Step 1: Decide if search is needed
+        start_time = time.perf_counter()
         needs_search = self._should_search(user_message)
+        timings["routing_llm"] = time.perf_counter() - start_time
+        details["needs_search"] = needs_search
         
         if needs_search:
-            print("📊 Analysis: Migration Act search required")
+            logger.info("Analysis: Migration Act search required")
             # Step 2: Search Migration Act
-            search_results = self._search_migration_act(user_message)
-            
-            # Step 3: Generate response with search results
-            response = self._generate_response(user_message, search_results)
+            search_results = self._search_migration_act(user_message, details, trace)
         else:
-            print("💭 Analysis: General chat response")
+            logger.info("Analysis: General chat response")
             # Generate response without search
-            response = self._generate_response(user_message, "")
+            search_results = ""
+        
+        # Step 3: Generate response (with search results if any)
+        start_time = time.perf_counter()
+        details["answer"] = self._generate_response(user_message, search_results)
+        timings["answer_llm"] = time.perf_counter() - start_time
+        timings["total"] = time.perf_counter() - total_start
+        self._record_timings(timings)
+        if trace is not None:
+            details["trace"] = trace.to_dict()
+        return details
+    
+    def process_user_messages_batch(self, user_messages: List[Any],
+                                    concurrency: int = None) -> List[Dict[str, Any]]:
+        """
+        Answer several messages at once, sharing work between them.
+        
+        Identical questions (ignoring case and spacing) are answered once. The routing,
+        search term and answer LLM calls run concurrently, the search terms of the whole
+        batch are embedded in one pass, and section content is loaded once per batch.
+        
+        Args:
+            user_messages: The messages, in order
+            concurrency: Concurrent LLM calls, capped at config.BATCH_API_CONCURRENCY
+        
+        Returns:
+            List[Dict]: One {"response", "error"} per message, in the order given
+        """
+        concurrency = max(1, min(concurrency or config.BATCH_API_CONCURRENCY, config.BATCH_API_CONCURRENCY))
+        results = [None] * len(user_messages)
+        unique = {}
+        positions = {}
+        for i, user_message in enumerate(user_messages):
+            if not isinstance(user_message, str) or not user_message.strip():
+                results[i] = {"response": None, "error": "Message must be a non-empty string"}
+                continue
+            key = normalize_text(user_message)
+            if key not in unique:
+                unique[key] = self._new_message_details(user_message.strip())
+            else:
+                count(CACHE_HITS, cache="batch_duplicate")
+            positions.setdefault(key, []).append(i)
+        items = list(unique.values())
+        logger.info("Batch of %d messages, %d distinct questions", len(user_messages), len(items))
+        
+        # Step 1: Routing and search term LLM calls, concurrently
+        def route(details):
+            try:
+                start_time = time.perf_counter()
+                details["needs_search"] = self._should_search(details["question"])
+                details["timings"]["routing_llm"] = time.perf_counter() - start_time
+                if details["needs_search"]:
+                    start_time = time.perf_counter()
+                    details["search_terms"] = self._generate_search_terms(details["question"])
+                    details["timings"]["search_term_llm"] = time.perf_counter() - start_time
+            except Exception as e:
+                details["error"] = str(e)
+                count(ERRORS, stage="routing_llm")
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            map_in_context(executor, route, items)
+        searching = [details for details in items
+                     if details["needs_search"] and not details.get("error")]
+        
+        # Steps 2 and 3 read one index version for the whole batch
+        with self.index_manager.use() as index:
+            # Step 2: One embedding pass for the search terms (and questions) of the whole batch
+            needs_vectors = any(stage != "bm25" for stage in config.RETRIEVAL_STAGES)
+            texts = []
+            for details in searching:
+                if needs_vectors:
+                    texts.extend(details["search_terms"])
+                if index.passage_index is not None and details["search_terms"]:
+                    texts.append(details["question"])
+            texts = list(dict.fromkeys(texts))
+            vector_by_text = {}
+            if texts:
+                start_time = time.perf_counter()
+                vector_by_text = dict(zip(texts, self.search_term_handler.embed_search_terms(texts)))
+                embedding_time = time.perf_counter() - start_time
+                observe_stage("embedding", embedding_time)
+                for details in searching:
+                    details["timings"]["embedding"] = embedding_time
+        
+            # Step 3: Retrieval and section content, loading each section once per batch
+            search_results = {}
+            section_contents = {}
+            for details in searching:
+                question, search_terms = details["question"], details["search_terms"]
+                if not search_terms:
+                    search_results[question] = "No search results - could not generate search term."
+                    continue
+                check_cancelled("retrieval")
+                try:
+                    vectors = [vector_by_text[term] for term in search_terms] if needs_vectors else None
+                    hits, _ = self._retrieve_hits(question, search_terms, details["timings"],
+                                                  search_term_vectors=vectors, index=index)
+                    details["sections"] = [hit["section"] for hit in hits]
+                    if not details["sections"]:
+                        search_results[question] = "No relevant sections found in Migration Act."
+                        continue
+                    search_results[question] = self._build_search_results(
+                        question, search_terms, details["sections"], vector_by_text.get(question),
+                        details["timings"], section_contents, index=index)
+                except Exception as e:
+                    logger.exception("Search error: %s", e)
+                    count(ERRORS, stage="search")
+                    search_results[question] = f"Search error: {str(e)}"
         
-        return response
+        # Step 4: Answer LLM calls, concurrently
+        def answer(details):
+            if details.get("error"):
+                return
+            try:
+                start_time = time.perf_counter()
+                details["answer"] = self._generate_response(
+                    details["question"], search_results.get(details["question"], ""))
+                details["timings"]["answer_llm"] = time.perf_counter() - start_time
+            except Exception as e:
+                details["error"] = str(e)
+                count(ERRORS, stage="answer_llm")
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            map_in_context(executor, answer, items)
+        # The shared embedding pass was recorded once above
+        for details in items:
+            self._record_timings({stage: seconds for stage, seconds in details["timings"].items()
+                                  if stage != "embedding"})
+        
+        for key, details in unique.items():
+            for i in positions[key]:
+                results[i] = {"response": details["answer"], "error": details.get("error")}
+        return results
+    
+    def process_user_message(self, user_message: str) -> str:
+        """Process a single user message and return response"""
+        return self.process_user_message_detailed(user_message)["answer"]
     
     def start_chat(self):
         """Start the interactive chat loop"""
@@ -257,7 +686,8 @@ Generate a helpful response:""")
                 
                 # Process message and get response
                 start_time = time.time()
-                response = self.process_user_message(user_input)
+                with request_context():
+                    response = self.process_user_message(user_input)
                 total_time = time.time() - start_time
                 
                 # Display response
@@ -273,7 +703,30 @@ Generate a helpful response:""")
                 print("Please try again or type 'quit' to exit.\n")
 
 def main():
-    """Main function to start the chatbot"""
+    """Main function to start the chatbot, or to answer a batch of questions"""
+    parser = argparse.ArgumentParser(description="Migration Act Chatbot")
+    parser.add_argument("--batch", metavar="INPUT",
+                        help="Answer the questions of a JSONL file ('-' for stdin) instead of chatting")
+    parser.add_argument("--output", default="-",
+                        help="Where to write the JSONL results of --batch ('-' for stdout)")
+    parser.add_argument("--concurrency", type=int, default=config.BATCH_CONCURRENCY,
+                        help="Questions answered at the same time in --batch mode")
+    args = parser.parse_args()
+    configure_logging()
+    
+    if args.batch:
+        # Keep stdout for the results when they are written there
+        progress = sys.stderr if args.output == "-" else sys.stdout
+        try:
+            with contextlib.redirect_stdout(progress):
+                chatbot = MigrationActChatbot()
+        except Exception as e:
+            print(f"❌ Failed to initialize chatbot: {e}", file=sys.stderr)
+            sys.exit(1)
+        summary = run_batch(chatbot, args.batch, args.output, args.concurrency)
+        print(f"✅ Batch done: {json.dumps(summary)}", file=sys.stderr)
+        return
+    
     try:
         chatbot = MigrationActChatbot()
         chatbot.start_chat()
@@ -281,4 +734,4 @@ def main():
         print(f"❌ Failed to initialize chatbot: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,271 @@
+# metrics.py
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+import config
+
+# Seconds; LLM calls take seconds, tree levels and embeddings take milliseconds
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                           0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+WINDOW_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: Dict[str, str]) -> Tuple[str, ...]:
+    """Label values in declaration order; every declared label must be given"""
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    """Render {name="value",...} with Prometheus escaping"""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _nearest_rank(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank quantile of a non-empty sorted list"""
+    rank = int(round(q * len(sorted_values)))
+    return sorted_values[min(len(sorted_values) - 1, max(0, rank - 1))]
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by labels"""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0.0)
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Value that can go up and down, optionally split by labels"""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = float(value)
+    
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+    
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0.0)
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Latency distribution with cumulative buckets for the scraper, plus a sliding window of
+    the most recent observations for quantiles (p50/p95/p99) computed in process.
+    """
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS, window_size: int = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self.window_size = window_size or config.METRICS_WINDOW_SIZE
+        self._series = {}
+        self._lock = threading.Lock()
+    
+    def _get_series(self, key):
+        series = self._series.get(key)
+        if series is None:
+            series = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0,
+                      "window": deque(maxlen=self.window_size)}
+            self._series[key] = series
+        return series
+    
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            series = self._get_series(key)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+            series["window"].append(value)
+    
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+    
+    def clear(self):
+        """Forget every observation, e.g. after a warm-up"""
+        with self._lock:
+            self._series.clear()
+    
+    def quantiles(self, quantiles: Tuple[float, ...] = WINDOW_QUANTILES, **labels) -> Dict[float, float]:
+        """Nearest-rank quantiles over the recent window, empty when nothing was observed"""
+        with self._lock:
+            series = self._series.get(_label_key(self.labelnames, labels))
+            window = sorted(series["window"]) if series else []
+        if not window:
+            return {}
+        return {q: _nearest_rank(window, q) for q in quantiles}
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        quantile_lines = [f"# HELP {self.name}_window {self.documentation} "
+                          f"(quantiles over the last {self.window_size} observations)",
+                          f"# TYPE {self.name}_window gauge"]
+        with self._lock:
+            snapshot = sorted((key, list(series["counts"]), series["sum"], series["count"],
+                               sorted(series["window"])) for key, series in self._series.items())
+        for key, counts, total, count, window in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+            for q in WINDOW_QUANTILES:
+                value = _nearest_rank(window, q)
+                labels = _format_labels(self.labelnames, key, f'quantile="{q}"')
+                quantile_lines.append(f"{self.name}_window{labels} {_format_value(value)}")
+        return lines + quantile_lines
+
+
+class MetricsRegistry:
+    """Holds every metric of the process and renders them in the Prometheus text format"""
+    
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+    
+    def _get_or_create(self, cls, name, documentation, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as {type(metric).__name__}")
+            return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames=labelnames)
+    
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames=labelnames)
+    
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames=labelnames, buckets=buckets)
+    
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry and the metrics the pipeline reports
+REGISTRY = MetricsRegistry()
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "chatbot_stage_seconds", "Time spent per pipeline stage", labelnames=("stage",))
+REQUESTS = REGISTRY.counter(
+    "chatbot_requests_total", "Requests received per endpoint", labelnames=("endpoint",))
+IN_FLIGHT = REGISTRY.gauge(
+    "chatbot_requests_in_flight", "Requests being processed per endpoint", labelnames=("endpoint",))
+ERRORS = REGISTRY.counter(
+    "chatbot_errors_total", "Errors per pipeline stage", labelnames=("stage",))
+CACHE_HITS = REGISTRY.counter(
+    "chatbot_cache_hits_total", "Work skipped thanks to a cache or shortcut", labelnames=("cache",))
+FALLBACKS = REGISTRY.counter(
+    "chatbot_fallbacks_total", "Times a stage fell back to a simpler path", labelnames=("kind",))
+INDEX_RELOADS = REGISTRY.counter(
+    "chatbot_index_reloads_total", "Index reloads by outcome", labelnames=("status",))
+INDEX_VERSION = REGISTRY.gauge(
+    "chatbot_index_version_info", "1 for the index version being served, 0 for replaced ones",
+    labelnames=("version",))
+COALESCED = REGISTRY.counter(
+    "chatbot_coalesced_total", "Calls that waited for an identical call in flight instead of running",
+    labelnames=("level",))
+ADMISSION_RUNNING = REGISTRY.gauge(
+    "chatbot_admission_running", "Pipeline slots held by admitted requests that have not finished yet")
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    "chatbot_admission_queue_depth", "Requests waiting for a free pipeline slot")
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    "chatbot_admission_rejections_total", "Requests turned away before the pipeline, by reason",
+    labelnames=("reason",))
+CANCELLED = REGISTRY.counter(
+    "chatbot_cancelled_total", "Requests stopped after their client left, by the stage they stopped at",
+    labelnames=("stage",))
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record the duration of one pipeline stage, when metrics are enabled"""
+    if config.METRICS_ENABLED:
+        STAGE_LATENCY.observe(seconds, stage=stage)
+
+
+def count(metric: Counter, **labels):
+    """Increment a counter by one, when metrics are enabled"""
+    if config.METRICS_ENABLED:
+        metric.inc(**labels)
@@ -2,18 +2,25 @@
 import json
 import os
 from typing import Tuple
+from passage_index_package.passage_index import extract_section_text
+from tracing_package.tracing import get_logger
 import config
 
+logger = get_logger("metadata_loader")
+
 class MyMetadataLoader:
     """Handles metadata loading and content extraction from Migration Act pages"""
     
-    def __init__(self):
+    def __init__(self, content_base: str = None):
         self.hashmap = None
+        self.search_bundle = None
+        # Directory holding one "volume N" folder of page_X.txt files per volume
+        self.content_base = content_base or config.MIGRATION_ACT_CONTENT_BASE
     
-    def load_hashmap(self):
-        """Load the hashmap from JSON file"""
+    def load_hashmap(self, path: str = None):
+        """Load the hashmap from JSON file, config.HASHMAP_PATH by default"""
         try:
-            with open(config.HASHMAP_PATH, "r", encoding="utf-8") as f:
+            with open(path or config.HASHMAP_PATH, "r", encoding="utf-8") as f:
                 self.hashmap = json.load(f)
             print("✅ Hashmap loaded successfully")
             return self.hashmap
@@ -21,6 +28,25 @@ class MyMetadataLoader:
             print(f"❌ Failed to load hashmap: {str(e)}")
             return None
     
+    def load_from_bundle(self, search_bundle):
+        """Use the section metadata and packed page text of a search bundle"""
+        self.search_bundle = search_bundle
+        self.hashmap = search_bundle.section_metadata
+        print("✅ Hashmap loaded from search bundle")
+        return self.hashmap
+    
+    def _read_page(self, directory_path: str, page: int) -> str:
+        """Read one content page from the search bundle or the page directory"""
+        if self.search_bundle is not None:
+            content = self.search_bundle.get_page_text(os.path.basename(directory_path), page)
+            if content is None:
+                raise FileNotFoundError(f"Page {page} of {directory_path} not in search bundle")
+            return content
+        
+        page_file_path = os.path.join(directory_path, f"page_{page}.txt")
+        with open(page_file_path, "r", encoding="utf-8") as file:
+            return file.read()
+    
     def _normalize_section_name(self, section_name_on_search_tree: str) -> str:
         """
         Convert section name from search tree format to hashmap format.
@@ -56,7 +82,7 @@ class MyMetadataLoader:
             end_page = section_data[config.END_PAGE_KEY]
             return (start_page, end_page)
         except KeyError as e:
-            print(f"❌ Section not found in hashmap: {normalized_section_name}")
+            logger.error("Section not found in hashmap: %s", normalized_section_name)
             raise e
     
     def extract_section_code(self, section_name_on_search_tree: str) -> str:
@@ -87,7 +113,7 @@ class MyMetadataLoader:
         # Extract volume number (last character of volume info)
         vol_number = vol_info[-1] if vol_info else "1"
         
-        return os.path.join(config.MIGRATION_ACT_CONTENT_BASE, f"volume {vol_number}")
+        return os.path.join(self.content_base, f"volume {vol_number}")
     
     def get_section_content(self, section_name_on_search_tree: str) -> str:
         """
@@ -120,21 +146,49 @@ class MyMetadataLoader:
             
             # Read and combine all pages
             for page in range(start_page, end_page + 1):
-                page_file_path = os.path.join(directory_path, f"page_{page}.txt")
-                
                 try:
-                    with open(page_file_path, "r", encoding="utf-8") as file:
-                        content = file.read()
-                        all_content += content + newline
+                    content = self._read_page(directory_path, page)
+                    all_content += content + newline
                 except FileNotFoundError:
-                    print(f"⚠️ Page file not found: {page_file_path}")
+                    logger.warning("Page file not found: %s", os.path.join(directory_path, f"page_{page}.txt"))
                     continue
                 except Exception as e:
-                    print(f"❌ Error reading page {page}: {str(e)}")
+                    logger.error("Error reading page %d: %s", page, e)
                     continue
             
             return all_content
             
         except Exception as e:
-            print(f"❌ Error getting section content: {str(e)}")
-            return ""
\ No newline at end of file
+            logger.error("Error getting section content: %s", e)
+            return ""
+    
+    def get_section_excerpt(self, section_name_on_search_tree: str, max_chars: int = None) -> str:
+        """
+        Get the opening text of a section, without the text of the previous section
+        that shares its first page.
+        
+        Args:
+            section_name_on_search_tree: Section name from search tree
+            max_chars: Maximum length of the excerpt, defaults to config.RERANKER_EXCERPT_CHARS
+        
+        Returns:
+            str: The section heading and the start of its text, or "" on error
+        """
+        if max_chars is None:
+            max_chars = config.RERANKER_EXCERPT_CHARS
+        try:
+            directory_path = self.get_volume_directory_path(section_name_on_search_tree)
+            start_page, end_page = self.get_page_range(section_name_on_search_tree)
+            section_code = self.extract_section_code(section_name_on_search_tree)
+            
+            # Read only as many pages as the excerpt needs
+            text = ""
+            for page in range(start_page, end_page + 1):
+                text += self._read_page(directory_path, page) + "\n"
+                excerpt = extract_section_text(text, section_code)
+                if excerpt is not text and len(excerpt) >= max_chars:
+                    break
+            return extract_section_text(text, section_code)[:max_chars]
+        except Exception as e:
+            logger.error("Error getting section excerpt: %s", e)
+            return ""
@@ -1,26 +1,60 @@
 # my_searcher.py
 import json
+import logging
+import time
 import numpy as np
-from typing import Dict, Any, List, Union
+from concurrent.futures import ThreadPoolExecutor
+from lexical_search_package.bm25_index import BM25Index
+from label_matcher_package.label_matcher import LabelMatcher
+from metrics_package.metrics import FALLBACKS, count, observe_stage
+from tracing_package.tracing import get_logger, map_in_context
+from typing import Dict, Any, List, Tuple, Union
 import config
 
+logger = get_logger("searcher")
+
 class MySearcher:
     """Handles search tree operations and greedy search algorithm"""
     
     def __init__(self):
         self.search_tree = None
+        # Flat index over every leaf section, built on first use
+        self.leaf_sections = None
+        self.leaf_matrix = None
+        # Optional lexical index and its hashmap key -> tree node mapping
+        self.lexical_index = None
+        self.section_node_by_key = None
+        # Trigram index over node labels, built on first use
+        self.label_matcher = None
+        self.content_by_node = None
     
-    def load_search_tree(self):
-        """Load the search tree from JSON file"""
+    def load_search_tree(self, path: str = None):
+        """Load the search tree from JSON file, config.SEARCH_TREE_PATH by default"""
         try:
-            with open(config.SEARCH_TREE_PATH, "r", encoding="utf-8") as f:
+            with open(path or config.SEARCH_TREE_PATH, "r", encoding="utf-8") as f:
                 self.search_tree = json.load(f)
+            self.leaf_sections = None
+            self.leaf_matrix = None
+            self.section_node_by_key = None
+            self.label_matcher = None
+            self.content_by_node = None
             print("✅ Search tree loaded successfully")
             return self.search_tree
         except Exception as e:
             print(f"❌ Failed to load search tree: {str(e)}")
             return None
     
+    def load_search_tree_from_bundle(self, search_bundle):
+        """Use the search tree compiled into a search bundle"""
+        self.search_tree = search_bundle.search_tree
+        self.leaf_sections = None
+        self.leaf_matrix = None
+        self.section_node_by_key = None
+        self.label_matcher = None
+        self.content_by_node = None
+        print("✅ Search tree loaded from search bundle")
+        return self.search_tree
+    
     def calculate_cosine_similarity(self, vector1: Union[np.ndarray, List[float]], 
                                   vector2: Union[np.ndarray, List[float]]) -> float:
         """
@@ -63,8 +97,41 @@ class MySearcher:
         
         return float(similarity)
     
+    def score_node(self, search_term_vector: List[float], tree_node: str, database_admin,
+                   mode: str = None) -> float:
+        """
+        Similarity of a tree node to the search term.
+        
+        Args:
+            search_term_vector: Embedded vector of the search term
+            tree_node: Renamed tree node to score
+            database_admin: DatabaseAdmin instance for getting node vectors
+            mode: "title", "centroid" or "blend", defaults to config.NODE_SCORING_MODE.
+                  Nodes without a centroid are scored by title.
+        
+        Returns:
+            float: Cosine similarity (or the weighted blend of both similarities)
+        """
+        if mode is None:
+            mode = config.NODE_SCORING_MODE
+        
+        if mode == "centroid":
+            centroid = database_admin.get_centroid(tree_node)
+            if centroid is not None:
+                return self.calculate_cosine_similarity(search_term_vector, centroid)
+        
+        title_similarity = self.calculate_cosine_similarity(
+            search_term_vector, database_admin.get_vector(tree_node))
+        if mode == "blend":
+            centroid = database_admin.get_centroid(tree_node)
+            if centroid is not None:
+                weight = config.NODE_SCORING_CENTROID_WEIGHT
+                centroid_similarity = self.calculate_cosine_similarity(search_term_vector, centroid)
+                return (1 - weight) * title_similarity + weight * centroid_similarity
+        return title_similarity
+    
     def search_term_on_tree(self, search_term_vector: List[float], 
-                           database_admin, limit: int = None) -> List[str]:
+                           database_admin, limit: int = None, trace=None) -> List[str]:
         """
         Greedy search algorithm to find the most relevant sections.
         
@@ -72,6 +139,7 @@ class MySearcher:
             search_term_vector: Embedded vector of the search term
             database_admin: DatabaseAdmin instance for getting node vectors
             limit: Maximum number of sections to return
+            trace: Optional RequestTrace to record the scores and choice of every level in
         
         Returns:
             List[str]: List of section names that best match the search term
@@ -83,8 +151,15 @@ class MySearcher:
             self.load_search_tree()
         
         found_sections = []
+        # Decided once, so the per-child logging below costs nothing when debug is off
+        debug = logger.isEnabledFor(logging.DEBUG)
         
-        def greedy_dfs(current_node: Dict[str, Any], current_path: str = "", is_root: bool = False):
+        def record_level(depth, child_scores, chosen_name):
+            if trace is not None:
+                trace.add_level(depth, [(name, score) for name, _, score in child_scores], [chosen_name])
+        
+        def greedy_dfs(current_node: Dict[str, Any], current_path: str = "", is_root: bool = False,
+                       depth: int = 0):
             """Recursive greedy depth-first search"""
             nonlocal found_sections
             
@@ -98,80 +173,83 @@ class MySearcher:
                 
             # For root level, calculate similarity but don't embed the root itself
             if is_root:
-                print("Starting from root level - calculating similarity for parts...")
+                if debug:
+                    logger.debug("Starting from root level - calculating similarity for parts")
                 child_scores = []
+                level_start = time.perf_counter()
                 
                 # Calculate similarity for all parts (children of root)
                 for child_name, child_content in current_node.items():
                     try:
-                        # Get the embedded vector for this part
-                        child_vector = database_admin.get_vector(child_name)
-                        
-                        # Calculate similarity with search term
-                        similarity = self.calculate_cosine_similarity(search_term_vector, child_vector)
+                        # Score this part against the search term
+                        similarity = self.score_node(search_term_vector, child_name, database_admin)
                         
                         child_scores.append((child_name, child_content, similarity))
-                        print(f"Part: {child_name} (similarity: {similarity:.4f})")
+                        if debug:
+                            logger.debug("Part: %s (similarity: %.4f)", child_name, similarity)
                         
                     except Exception as e:
-                        print(f"Error processing part {child_name}: {e}")
+                        logger.warning("Error processing part %s: %s", child_name, e)
                         continue
+                observe_stage(f"tree_level_{depth}", time.perf_counter() - level_start)
                 
                 # Sort by similarity score (descending)
                 child_scores.sort(key=lambda x: x[2], reverse=True)
                 
                 if not child_scores:
-                    print("No valid parts found!")
+                    logger.warning("No valid parts found")
                     return
                     
                 # Greedy: Choose only the best part
                 best_part_name, best_part_content, best_similarity = child_scores[0]
-                print(f"🎯 CHOOSING BEST PART: {best_part_name} (similarity: {best_similarity:.4f})")
+                if debug:
+                    logger.debug("Choosing best part: %s (similarity: %.4f)", best_part_name, best_similarity)
+                record_level(depth, child_scores, best_part_name)
                 
                 # Check if this part contains sections (list of section names)
                 if isinstance(best_part_content, list) and len(best_part_content) > 0:
                     # This part contains a list of sections - collect them!
-                    print(f"✅ Found {len(best_part_content)} sections in part: {best_part_name}")
+                    if debug:
+                        logger.debug("Found %d sections in part: %s", len(best_part_content), best_part_name)
                     for section_name in best_part_content:
                         if len(found_sections) >= limit:
                             break
                         found_sections.append(section_name)
-                        print(f"  ✅ Collected section: {section_name}")
                 elif isinstance(best_part_content, list) and len(best_part_content) == 0:
                     # Empty list - this part itself is a section
                     found_sections.append(best_part_name)
-                    print(f"✅ Found section at part level: {best_part_name}")
                 elif isinstance(best_part_content, dict) and len(best_part_content) == 0:
                     # Empty dict - this part itself is a section  
                     found_sections.append(best_part_name)
-                    print(f"✅ Found section at part level: {best_part_name}")
                 elif isinstance(best_part_content, dict):
                     # Continue deeper with the best part
-                    greedy_dfs(best_part_content, current_path + "/" + best_part_name, is_root=False)
+                    greedy_dfs(best_part_content, current_path + "/" + best_part_name, is_root=False,
+                               depth=depth + 1)
                 
                 return
                 
             # For non-root levels, calculate similarity scores
-            print(f"Calculating similarity for children at level: {current_path}")
+            if debug:
+                logger.debug("Calculating similarity for children at level: %s", current_path)
             child_scores = []
+            level_start = time.perf_counter()
             
             for child_name, child_content in current_node.items():
                 try:
-                    # Get the embedded vector for this child node
-                    child_vector = database_admin.get_vector(child_name)
-                    
-                    # Calculate similarity with search term
-                    similarity = self.calculate_cosine_similarity(search_term_vector, child_vector)
+                    # Score this child node against the search term
+                    similarity = self.score_node(search_term_vector, child_name, database_admin)
                     
                     child_scores.append((child_name, child_content, similarity))
-                    print(f"  - {child_name} (similarity: {similarity:.4f})")
+                    if debug:
+                        logger.debug("  - %s (similarity: %.4f)", child_name, similarity)
                     
                 except Exception as e:
-                    print(f"Error processing child {child_name}: {e}")
+                    logger.warning("Error processing child %s: %s", child_name, e)
                     continue
+            observe_stage(f"tree_level_{depth}", time.perf_counter() - level_start)
             
             if not child_scores:
-                print("No valid children found at this level!")
+                logger.warning("No valid children found at level: %s", current_path)
                 return
             
             # Sort by similarity score (descending)
@@ -179,34 +257,425 @@ class MySearcher:
             
             # Greedy: Choose only the best child
             best_child_name, best_child_content, best_similarity = child_scores[0]
-            print(f"🎯 CHOOSING: {best_child_name} to go deeper (similarity: {best_similarity:.4f})")
+            if debug:
+                logger.debug("Choosing: %s to go deeper (similarity: %.4f)", best_child_name, best_similarity)
+            record_level(depth, child_scores, best_child_name)
             
             # Check if this child contains sections (list of section names)
             if isinstance(best_child_content, list) and len(best_child_content) > 0:
                 # This child contains a list of sections - collect them!
-                print(f"✅ Found {len(best_child_content)} sections in: {best_child_name}")
+                if debug:
+                    logger.debug("Found %d sections in: %s", len(best_child_content), best_child_name)
                 for section_name in best_child_content:
                     if len(found_sections) >= limit:
                         break
                     found_sections.append(section_name)
-                    print(f"  ✅ Collected section: {section_name}")
                     
             elif isinstance(best_child_content, list) and len(best_child_content) == 0:
                 # Empty list - this child itself is a section
                 found_sections.append(best_child_name)
-                print(f"✅ Found section: {best_child_name}")
                 
             elif isinstance(best_child_content, dict) and len(best_child_content) == 0:
                 # Empty dict - this child itself is a section
                 found_sections.append(best_child_name)
-                print(f"✅ Found section: {best_child_name}")
                 
             elif isinstance(best_child_content, dict):
                 # This has children, so continue deeper (greedy: only follow the best path)
-                greedy_dfs(best_child_content, current_path + "/" + best_child_name, is_root=False)
+                greedy_dfs(best_child_content, current_path + "/" + best_child_name, is_root=False,
+                           depth=depth + 1)
         
         # Start the search from the Migration Act 1958 root
         if config.MIGRATION_ACT_ROOT in self.search_tree:
             greedy_dfs(self.search_tree[config.MIGRATION_ACT_ROOT], is_root=True)
         
-        return found_sections[:limit]
\ No newline at end of file
+        return found_sections[:limit]
+    
+    def search_term_on_tree_indexed(self, search_term_vector: List[float], database_admin,
+                                    limit: int = None, beam_width: int = None,
+                                    trace=None) -> List[str]:
+        """
+        Beam search down the tree, asking the vector store for the best children of each level.
+        
+        Every level is one filtered nearest-neighbour query over the children of all nodes
+        in the beam. Chosen sections are collected, chosen nodes holding a list of sections
+        contribute those sections, and chosen nodes with deeper subtrees form the next beam.
+        With a beam width of 1 this follows the same path as search_term_on_tree.
+        
+        Args:
+            search_term_vector: Embedded vector of the search term
+            database_admin: DatabaseAdmin instance for the per-level queries
+            limit: Maximum number of sections to return
+            beam_width: Nodes kept per level, defaults to config.SEARCH_BEAM_WIDTH
+            trace: Optional RequestTrace to record the scores and choices of every level in
+        
+        Returns:
+            List[str]: List of section names that best match the search term
+        """
+        if limit is None:
+            limit = config.DEFAULT_SEARCH_LIMIT
+        if beam_width is None:
+            beam_width = config.SEARCH_BEAM_WIDTH
+        if self.content_by_node is None:
+            self._index_node_content()
+        
+        found_sections = []
+        beam = [config.TREE_ROOT_PARENT_ID]
+        depth = 0
+        debug = logger.isEnabledFor(logging.DEBUG)
+        while beam and len(found_sections) < limit:
+            level_start = time.perf_counter()
+            children = database_admin.query_children_of_parents(
+                search_term_vector, beam, n_results=beam_width, representation=config.NODE_SCORING_MODE)
+            observe_stage(f"tree_level_{depth}", time.perf_counter() - level_start)
+            beam = []
+            if trace is not None:
+                trace.add_level(depth, [(child_name, similarity) for child_name, similarity, _ in children],
+                                [child_name for child_name, _, _ in children])
+            for child_name, similarity, _ in children:
+                if child_name not in self.content_by_node:
+                    logger.warning("Vector store returned a node missing from the search tree: %s", child_name)
+                    continue
+                if debug:
+                    logger.debug("Level %d: %s (similarity: %.4f)", depth, child_name, similarity)
+                content = self.content_by_node[child_name]
+                if not content:
+                    found_sections.append(child_name)
+                elif isinstance(content, list):
+                    found_sections.extend(content)
+                else:
+                    beam.append(child_name.split("_")[-1])
+            depth += 1
+        
+        # A section can only be reached through one parent, but keep the output unique anyway
+        return list(dict.fromkeys(found_sections))[:limit]
+    
+    def collect_leaf_sections(self) -> List[str]:
+        """
+        Collect every section of the tree, in tree order.
+        
+        Sections are the names inside section lists, plus nodes whose content is
+        empty (a section sitting directly at part level).
+        
+        Returns:
+            List[str]: Renamed section nodes like "Short title_1_Volume 1_1"
+        """
+        if self.search_tree is None:
+            self.load_search_tree()
+        
+        sections = []
+        
+        def collect(node_content):
+            if isinstance(node_content, list):
+                sections.extend(name for name in node_content if isinstance(name, str))
+            elif isinstance(node_content, dict):
+                for child_name, child_content in node_content.items():
+                    if not child_content:
+                        sections.append(child_name)
+                    else:
+                        collect(child_content)
+        
+        collect(self.search_tree.get(config.MIGRATION_ACT_ROOT, {}))
+        return sections
+    
+    def _load_leaf_matrix(self, database_admin):
+        """Fetch all section vectors once and keep them L2-normalized in one matrix"""
+        sections = self.collect_leaf_sections()
+        found_sections, vectors = database_admin.get_vectors(sections)
+        if len(found_sections) < len(sections):
+            logger.warning("%d sections have no vector and are left out of flat search",
+                           len(sections) - len(found_sections))
+        if found_sections:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        self.leaf_matrix = vectors
+        self.leaf_sections = found_sections
+    
+    def search_flat_top_k(self, search_term_vector: List[float], database_admin,
+                          k: int = None) -> List[Tuple[str, float]]:
+        """
+        Brute-force top-k over every section vector with one matrix product.
+        
+        Args:
+            search_term_vector: Embedded vector of the search term
+            database_admin: DatabaseAdmin instance for getting node vectors
+            k: Number of sections to return
+        
+        Returns:
+            List[Tuple[str, float]]: (section name, cosine similarity), best first
+        """
+        if k is None:
+            k = config.FLAT_SEARCH_TOP_K
+        if self.leaf_sections is None:
+            self._load_leaf_matrix(database_admin)
+        if not self.leaf_sections:
+            return []
+        
+        query = np.asarray(search_term_vector, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            return []
+        scores = self.leaf_matrix @ (query / query_norm)
+        
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.leaf_sections[i], float(scores[i])) for i in top]
+    
+    def load_lexical_index(self, path: str = None):
+        """Load the BM25 index used by the "bm25" retrieval stage"""
+        try:
+            self.lexical_index = BM25Index().load(path)
+            return self.lexical_index
+        except Exception as e:
+            print(f"❌ Failed to load BM25 index: {str(e)}")
+            return None
+    
+    def search_lexical(self, query_text: str, k: int = None) -> List[Tuple[str, float]]:
+        """
+        BM25 search over the section text.
+        
+        Args:
+            query_text: Free text query
+            k: Number of sections to return
+        
+        Returns:
+            List[Tuple[str, float]]: (section name on the search tree, BM25 score), best first
+        """
+        if self.lexical_index is None:
+            self.load_lexical_index()
+            if self.lexical_index is None:
+                return []
+        if self.section_node_by_key is None:
+            # Hashmap keys are tree node names without the trailing embed id
+            self.section_node_by_key = {
+                section.rsplit("_", 1)[0]: section for section in self.collect_leaf_sections()
+            }
+        
+        hits = []
+        for section_key, score in self.lexical_index.search(query_text, k):
+            section = self.section_node_by_key.get(section_key)
+            if section is not None:
+                hits.append((section, score))
+        return hits
+    
+    def _build_label_matcher(self):
+        """Index every node label and remember each node's content for resolution"""
+        if self.search_tree is None:
+            self.load_search_tree()
+        self.label_matcher = LabelMatcher().build(self.search_tree.get(config.MIGRATION_ACT_ROOT, {}))
+        if self.content_by_node is None:
+            self._index_node_content()
+    
+    def _index_node_content(self):
+        """Map every node to its content: a subtree dict, a list of sections, or None for a section"""
+        if self.search_tree is None:
+            self.load_search_tree()
+        root = self.search_tree.get(config.MIGRATION_ACT_ROOT, {})
+        self.content_by_node = {}
+        
+        def walk(node_content):
+            if isinstance(node_content, dict):
+                for child_name, child_content in node_content.items():
+                    self.content_by_node[child_name] = child_content
+                    walk(child_content)
+            elif isinstance(node_content, list):
+                for child_name in node_content:
+                    self.content_by_node[child_name] = None
+        
+        walk(root)
+    
+    def resolve_label_match(self, search_term: str, limit: int = None) -> List[Dict[str, Any]]:
+        """
+        Resolve a search term that is a near-exact copy of a node label directly to sections.
+        
+        A match is confident when its trigram similarity reaches config.LABEL_MATCH_THRESHOLD,
+        beats the best different label by config.LABEL_MATCH_MARGIN and the label belongs to a
+        single node. Labels many nodes share ("Interpretation", "Definitions", "Miscellaneous")
+        and ties between labels are ambiguous and left to the normal search. A matched section
+        is returned as it is; a matched node holding a list of at most `limit` sections returns
+        those sections. Bigger nodes cannot be narrowed down without the embedding.
+        
+        Args:
+            search_term: Search term to match against node labels
+            limit: Maximum number of sections to return
+        
+        Returns:
+            List[Dict]: Hits like {"section", "score", "sources", "ranks"}, or an empty list
+            when there is no confident, resolvable match
+        """
+        if limit is None:
+            limit = config.DEFAULT_SEARCH_LIMIT
+        if self.label_matcher is None:
+            self._build_label_matcher()
+        
+        matches = self.label_matcher.match_labels(search_term, limit=2)
+        if not matches or matches[0][1] < config.LABEL_MATCH_THRESHOLD:
+            return []
+        _, top_score, node_names = matches[0]
+        runner_up = matches[1][1] if len(matches) > 1 else 0.0
+        if top_score - runner_up < config.LABEL_MATCH_MARGIN or len(node_names) > 1:
+            return []
+        
+        content = self.content_by_node.get(node_names[0])
+        if not content:
+            sections = node_names
+        elif isinstance(content, list) and len(content) <= limit:
+            sections = content
+        else:
+            return []
+        
+        return [
+            {"section": section, "score": top_score, "sources": ["label_match"], "ranks": {"label_match": rank}}
+            for rank, section in enumerate(sections[:limit], 1)
+        ]
+    
+    def fuse_rankings(self, rankings: Dict[str, List[str]], limit: int) -> List[Dict[str, Any]]:
+        """
+        Merge ranked section lists with reciprocal rank fusion.
+        
+        Args:
+            rankings: Ranked section names per retrieval stage, best first
+            limit: Maximum number of fused hits to return
+        
+        Returns:
+            List[Dict]: Hits like {"section", "score", "sources", "ranks"}, best first,
+            where "sources" names every stage that contributed the hit
+        """
+        hits = {}
+        for stage, sections in rankings.items():
+            for rank, section in enumerate(sections, 1):
+                hit = hits.setdefault(section, {"section": section, "score": 0.0, "sources": [], "ranks": {}})
+                if stage in hit["ranks"]:
+                    continue
+                hit["score"] += 1.0 / (config.RRF_K + rank)
+                hit["sources"].append(stage)
+                hit["ranks"][stage] = rank
+        
+        fused = sorted(hits.values(), key=lambda hit: hit["score"], reverse=True)
+        return fused[:limit]
+    
+    def retrieve(self, search_term_vector: List[float], database_admin,
+                 limit: int = None, stages: List[str] = None,
+                 query_text: str = None, trace=None) -> List[Dict[str, Any]]:
+        """
+        Run the configured retrieval stages and fuse their rankings.
+        
+        Stages:
+            "tree": descent of the search tree (search_term_on_tree, or the beam search
+                    search_term_on_tree_indexed when config.TREE_SEARCH_MODE is "indexed")
+            "flat": brute-force top-k over every section vector
+            "bm25": lexical search over the section text, needs query_text
+        
+        Args:
+            search_term_vector: Embedded vector of the search term (may be None when
+                                only lexical stages run)
+            database_admin: DatabaseAdmin instance for getting node vectors
+            limit: Maximum number of sections to return
+            stages: Retrieval stages to run, defaults to config.RETRIEVAL_STAGES
+            query_text: Free text for the lexical stage
+            trace: Optional RequestTrace to record the tree levels and stage rankings in
+        
+        Returns:
+            List[Dict]: Hits like {"section", "score", "sources", "ranks"}, best first
+        """
+        if limit is None:
+            limit = config.DEFAULT_SEARCH_LIMIT
+        if stages is None:
+            stages = config.RETRIEVAL_STAGES
+        
+        rankings = {}
+        for stage in stages:
+            if stage == "tree":
+                sections = []
+                if config.TREE_SEARCH_MODE == "indexed":
+                    sections = self.search_term_on_tree_indexed(search_term_vector, database_admin,
+                                                                limit=limit, trace=trace)
+                    if not sections:
+                        logger.warning("Indexed tree search found nothing, falling back to local descent")
+                        count(FALLBACKS, kind="indexed_tree_to_local")
+                        if trace is not None:
+                            trace.add_event("fallback", kind="indexed_tree_to_local")
+                if not sections:
+                    sections = self.search_term_on_tree(search_term_vector, database_admin,
+                                                        limit=limit, trace=trace)
+                rankings["tree"] = sections
+            elif stage == "flat":
+                rankings["flat"] = [section for section, _ in
+                                    self.search_flat_top_k(search_term_vector, database_admin)]
+            elif stage == "bm25":
+                if query_text:
+                    rankings["bm25"] = [section for section, _ in self.search_lexical(query_text)]
+            else:
+                logger.warning("Unknown retrieval stage '%s' ignored", stage)
+        
+        if trace is not None:
+            for stage, sections in rankings.items():
+                trace.add_ranking(stage, sections)
+        return self.fuse_rankings(rankings, limit)
+    
+    def _prepare_stages(self, stages: List[str], database_admin):
+        """Build the lazily created indexes up front, so concurrent searches only read them"""
+        if self.search_tree is None:
+            self.load_search_tree()
+        if self.content_by_node is None:
+            self._index_node_content()
+        if "flat" in stages and self.leaf_sections is None:
+            self._load_leaf_matrix(database_admin)
+        if "bm25" in stages and self.lexical_index is None:
+            self.load_lexical_index()
+        if "bm25" in stages and self.section_node_by_key is None:
+            self.section_node_by_key = {
+                section.rsplit("_", 1)[0]: section for section in self.collect_leaf_sections()
+            }
+        if config.LABEL_MATCH_ENABLED and self.label_matcher is None:
+            self._build_label_matcher()
+    
+    def retrieve_many(self, search_terms: List[str], search_term_vectors, database_admin,
+                      limit: int = None, stages: List[str] = None,
+                      user_question: str = None, trace=None) -> List[Dict[str, Any]]:
+        """
+        Search several terms concurrently and merge their rankings.
+        
+        Every term first tries a confident label match, then runs the retrieval stages.
+        The per-term rankings are fused with reciprocal rank fusion, so a section found
+        by several terms rises to the top and duplicates collapse into one hit.
+        
+        Args:
+            search_terms: Search terms, e.g. from SearchTermHandler.generate_search_terms
+            search_term_vectors: One embedded vector per term (None when only lexical stages run)
+            database_admin: DatabaseAdmin instance for getting node vectors
+            limit: Maximum number of sections to return
+            stages: Retrieval stages to run, defaults to config.RETRIEVAL_STAGES
+            user_question: The user question, added to each term's lexical query
+            trace: Optional RequestTrace, filled per term
+        
+        Returns:
+            List[Dict]: Hits like {"section", "score", "sources", "ranks"}, best first,
+            where "sources" names the terms that found the hit
+        """
+        if limit is None:
+            limit = config.DEFAULT_SEARCH_LIMIT
+        if stages is None:
+            stages = config.RETRIEVAL_STAGES
+        if search_term_vectors is None:
+            search_term_vectors = [None] * len(search_terms)
+        self._prepare_stages(stages, database_admin)
+        
+        def search_one(term, vector):
+            term_trace = trace.for_term(term) if trace is not None else None
+            hits = self.resolve_label_match(term, limit=limit) if config.LABEL_MATCH_ENABLED else []
+            if hits:
+                if term_trace is not None:
+                    term_trace.add_event("label_match", sections=[hit["section"] for hit in hits])
+            else:
+                query_text = term if not user_question or term == user_question else f"{term} {user_question}"
+                hits = self.retrieve(vector, database_admin, limit=limit, stages=stages,
+                                     query_text=query_text, trace=term_trace)
+            return [hit["section"] for hit in hits]
+        
+        max_workers = max(1, min(len(search_terms), config.SEARCH_TERM_FAN_OUT))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            rankings = map_in_context(executor, search_one, search_terms, search_term_vectors)
+        
+        return self.fuse_rankings(
+            {f"term:{term}": sections for term, sections in zip(search_terms, rankings)}, limit)
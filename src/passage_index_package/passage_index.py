@@ -0,0 +1,179 @@
+# passage_index.py
+import re
+import time
+from typing import Dict, List, Tuple
+import numpy as np
+import config
+
+# A subsection marker like "(1)" or "(2B)" always starts a new passage unit
+SUBSECTION_PATTERN = re.compile(r"^\(\d+[A-Z]*\)\s")
+# Section headings on the cleaned pages look like "5  Interpretation"
+SECTION_HEADING_PATTERN = re.compile(r"^\d+[A-Z]{0,4}  \S")
+
+
+def extract_section_text(text: str, section_code: str) -> str:
+    """
+    Cut the text of one section out of its pages: from its own heading to the next heading.
+    The pages of a section also hold the end of the previous section and the start of the
+    next one; when the heading cannot be found the whole text is kept.
+    """
+    lines = text.split("\n")
+    heading = re.compile(rf"^{re.escape(section_code)}\s+\S")
+    start = next((i for i, line in enumerate(lines) if heading.match(line)), None)
+    if start is None:
+        return text
+    end = next((i for i in range(start + 1, len(lines)) if SECTION_HEADING_PATTERN.match(lines[i])), len(lines))
+    return "\n".join(lines[start:end])
+
+
+def split_passages(text: str, max_chars: int = None) -> List[str]:
+    """
+    Split section text into passages of at most max_chars characters.
+    
+    Lines are first grouped into units: a unit starts at a subsection marker, at a
+    heading, or after a line ending a sentence. Units are then packed in order, so a
+    passage is one or more whole subsections / paragraphs / definitions; a unit longer
+    than max_chars is split at line boundaries.
+    """
+    if max_chars is None:
+        max_chars = config.PASSAGE_MAX_CHARS
+    
+    units = []
+    current = []
+    for line in text.split("\n"):
+        line = line.rstrip()
+        if not line:
+            continue
+        starts_unit = (SUBSECTION_PATTERN.match(line) or SECTION_HEADING_PATTERN.match(line)
+                       or (current and current[-1].endswith((".", ":")) and not line.startswith("(")))
+        if current and starts_unit:
+            units.append(current)
+            current = []
+        current.append(line)
+    if current:
+        units.append(current)
+    
+    passages = []
+    passage = ""
+    for unit in units:
+        for piece in _split_long_unit(unit, max_chars):
+            if passage and len(passage) + 1 + len(piece) > max_chars:
+                passages.append(passage)
+                passage = ""
+            passage = f"{passage}\n{piece}" if passage else piece
+    if passage:
+        passages.append(passage)
+    return passages
+
+
+def _split_long_unit(lines: List[str], max_chars: int) -> List[str]:
+    """Join the lines of a unit, splitting at line boundaries when it exceeds max_chars"""
+    pieces = []
+    piece = ""
+    for line in lines:
+        if piece and len(piece) + 1 + len(line) > max_chars:
+            pieces.append(piece)
+            piece = ""
+        piece = f"{piece}\n{line}" if piece else line
+    if piece:
+        pieces.append(piece)
+    return pieces
+
+
+class PassageIndex:
+    """Precomputed passage embeddings, searched only within the sections the tree search picked"""
+    
+    def __init__(self):
+        self.section_keys = None
+        self.section_index = None
+        self.section_offsets = None
+        self.passage_offsets = None
+        self.passage_text = None
+        self.embeddings = None
+    
+    def load(self, path: str = None):
+        """
+        Load a passage index written by data_preparation/build_passage_index/build_passage_index.py.
+        
+        Returns:
+            PassageIndex: self, for chaining
+        """
+        if path is None:
+            path = config.PASSAGE_INDEX_PATH
+        start_time = time.time()
+        with np.load(path) as data:
+            self.section_keys = bytes(data["section_keys"]).decode("utf-8").split("\n")
+            self.section_offsets = data["section_offsets"]
+            self.passage_offsets = data["passage_offsets"]
+            self.passage_text = bytes(data["passage_text"])
+            embeddings = data["embeddings"].astype(np.float32)
+        # Store unit vectors so scoring is one dot product
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        self.embeddings = embeddings / np.where(norms == 0, 1, norms)
+        self.section_index = {key: i for i, key in enumerate(self.section_keys)}
+        print(f"✅ Passage index loaded: {len(self.embeddings)} passages over {len(self.section_keys)} sections "
+              f"({time.time() - start_time:.4f} seconds)")
+        return self
+    
+    def get_passage(self, passage_id: int) -> str:
+        """Text of one passage"""
+        start, end = self.passage_offsets[passage_id], self.passage_offsets[passage_id + 1]
+        return self.passage_text[start:end].decode("utf-8")
+    
+    def has_section(self, section_key: str) -> bool:
+        """Whether a hashmap section key like "Short title_1_Volume 1" is indexed"""
+        return section_key in self.section_index
+    
+    def select_passages(self, question_vector, section_keys: List[str],
+                        char_budget: int = None) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Pick the passages of the given sections that best match the question, within a budget.
+        
+        Every section first gets its best passage, then the remaining passages are taken
+        best first while they fit in the character budget.
+        
+        Args:
+            question_vector: Embedded user question
+            section_keys: Hashmap section keys, e.g. the sections picked by the tree search
+            char_budget: Total characters of passage text to return,
+                         defaults to config.PASSAGE_CONTEXT_CHAR_BUDGET
+        
+        Returns:
+            Dict[str, List[Tuple[str, float]]]: Per section key, the chosen (passage, similarity)
+            in document order; sections that are not indexed are left out
+        """
+        if char_budget is None:
+            char_budget = config.PASSAGE_CONTEXT_CHAR_BUDGET
+        
+        query = np.asarray(question_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        
+        candidates = []
+        best_per_section = []
+        for section_key in dict.fromkeys(section_keys):
+            section = self.section_index.get(section_key)
+            if section is None:
+                continue
+            start, end = int(self.section_offsets[section]), int(self.section_offsets[section + 1])
+            if start == end:
+                continue
+            scores = self.embeddings[start:end] @ query
+            ranked = [(float(scores[i]), start + i, section_key) for i in np.argsort(-scores)]
+            best_per_section.append(ranked[0])
+            candidates.extend(ranked[1:])
+        candidates.sort(reverse=True)
+        
+        chosen = {}
+        used = 0
+        for score, passage_id, section_key in best_per_section + candidates:
+            length = int(self.passage_offsets[passage_id + 1] - self.passage_offsets[passage_id])
+            # The best passage of each section is always kept, the rest only while they fit
+            if section_key in chosen and used + length > char_budget:
+                continue
+            chosen.setdefault(section_key, []).append((passage_id, score))
+            used += length
+        
+        return {
+            section_key: [(self.get_passage(passage_id), score) for passage_id, score in sorted(passages)]
+            for section_key, passages in chosen.items()
+        }
@@ -0,0 +1,147 @@
+# request_profiler.py
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import config
+from tracing_package.tracing import get_logger
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:
+    SamplingProfiler = None
+
+logger = get_logger("profiler")
+
+# One profile at a time: cProfile cannot run twice at once (process-wide since Python 3.12),
+# and two overlapping profiles would each be polluted by the other's request
+_ACTIVE = threading.Lock()
+
+
+def should_profile(token: Optional[str] = None) -> bool:
+    """
+    Decide whether to profile a request.
+    Callers check config.PROFILING_ENABLED first, so a disabled profiler costs nothing.
+
+    Args:
+        token: Value of the caller's X-Profile-Token header, if any
+
+    Returns:
+        True when the token matches PROFILING_TOKEN or the request falls in the sample
+    """
+    if token and config.PROFILING_TOKEN and hmac.compare_digest(token, config.PROFILING_TOKEN):
+        return True
+    return config.PROFILING_SAMPLE_RATE > 0 and random.random() < config.PROFILING_SAMPLE_RATE
+
+
+def start_profiler(request_id: str, token: Optional[str] = None) -> Optional["RequestProfiler"]:
+    """Start profiling the current request when it should be, and no other profile is running"""
+    if not should_profile(token):
+        return None
+    if not _ACTIVE.acquire(blocking=False):
+        logger.info("Another request is being profiled, not profiling this one")
+        return None
+    profiler = RequestProfiler(request_id)
+    try:
+        profiler.start()
+    except Exception:
+        _ACTIVE.release()
+        raise
+    return profiler
+
+
+class RequestProfiler:
+    """
+    Profiles one request on the calling thread and writes the result next to a JSON sidecar.
+    Work handed to thread pools (e.g. per-term retrieval) shows up as time waiting on them.
+    """
+
+    def __init__(self, request_id: str, backend: str = None, output_dir: str = None):
+        self.request_id = request_id
+        self.backend = (backend or config.PROFILING_BACKEND).lower()
+        if self.backend == "pyinstrument" and SamplingProfiler is None:
+            logger.warning("pyinstrument is not installed, profiling with cProfile instead")
+            self.backend = "cprofile"
+        self.output_dir = output_dir or config.PROFILING_OUTPUT_DIR
+        self._profiler = None
+        self._start_time = None
+        self.wall_seconds = None
+
+    def start(self):
+        self._start_time = time.perf_counter()
+        if self.backend == "pyinstrument":
+            self._profiler = SamplingProfiler(interval=config.PROFILING_SAMPLING_INTERVAL)
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        """Stop profiling and let the next request be profiled"""
+        try:
+            if self.backend == "pyinstrument":
+                self._profiler.stop()
+            else:
+                self._profiler.disable()
+            self.wall_seconds = time.perf_counter() - self._start_time
+        finally:
+            _ACTIVE.release()
+
+    def _top_functions(self) -> List[Dict[str, Any]]:
+        """The functions with the most cumulative time, from the cProfile statistics"""
+        stats = pstats.Stats(self._profiler).stats
+        ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+        return [
+            {
+                "function": f"{name} ({os.path.basename(filename)}:{line})",
+                "calls": calls,
+                "own_seconds": round(own_time, 6),
+                "cumulative_seconds": round(cumulative_time, 6)
+            }
+            for (filename, line, name), (_, calls, own_time, cumulative_time, _) in
+            ranked[:config.PROFILING_TOP_FUNCTIONS]
+        ]
+
+    def save(self, timings: Dict[str, float] = None, details: Dict[str, Any] = None) -> str:
+        """
+        Write the profile and its sidecar.
+
+        Args:
+            timings: Stage timings of the request (seconds per stage)
+            details: Anything else worth keeping next to the profile (question, search terms...)
+
+        Returns:
+            File name of the artifact: .prof (pstats, e.g. for snakeviz) or .html (pyinstrument)
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", self.request_id)[:64]
+        base_name = f"{time.strftime('%Y%m%dT%H%M%S')}_{safe_id}"
+        sidecar = {
+            "request_id": self.request_id,
+            "backend": self.backend,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "wall_seconds": round(self.wall_seconds, 6),
+            "timings": timings or {}
+        }
+        sidecar.update(details or {})
+
+        if self.backend == "pyinstrument":
+            artifact = base_name + ".html"
+            with open(os.path.join(self.output_dir, artifact), "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+        else:
+            artifact = base_name + ".prof"
+            self._profiler.dump_stats(os.path.join(self.output_dir, artifact))
+            sidecar["top_functions"] = self._top_functions()
+        sidecar["artifact"] = artifact
+
+        with open(os.path.join(self.output_dir, base_name + ".json"), "w", encoding="utf-8") as f:
+            json.dump(sidecar, f, indent=2, ensure_ascii=False)
+        logger.info("Profile written to %s", os.path.join(self.output_dir, artifact))
+        return artifact
@@ -0,0 +1,127 @@
+# cross_encoder_reranker.py
+import threading
+import time
+from typing import Any, Callable, Dict, List
+from sentence_transformers import CrossEncoder
+from metrics_package.metrics import FALLBACKS, count
+from tracing_package.tracing import get_logger
+import config
+
+logger = get_logger("reranker")
+
+# Seeds the latency estimate with pairs as long as real ones: a question and a title + excerpt
+WARM_UP_QUESTION = "Can my visa be cancelled if I do not comply with one of its conditions?"
+WARM_UP_SECTION = "Cancellation of visas\n" + (
+    "The Minister may cancel a visa if he or she is satisfied that the holder has not complied "
+    "with a condition of the visa or that a circumstance which permits the cancellation exists. ") * 20
+WARM_UP_PAIRS = 8
+
+class CrossEncoderReranker:
+    """Rescores candidate sections with a small CPU cross-encoder, within a candidate cap and latency budget"""
+    
+    def __init__(self):
+        self.model = None
+        # Exponential moving average of the forward pass cost per (question, section) pair
+        self.seconds_per_pair = None
+        # Requests skipped since the estimate was last measured
+        self.skipped_since_measured = 0
+        # Guards the two fields above, updated by concurrent requests
+        self._lock = threading.Lock()
+    
+    def initialize_model(self):
+        """Load the cross-encoder and seed the latency estimate with realistic pairs"""
+        start_time = time.time()
+        self.model = CrossEncoder(config.RERANKER_MODEL_NAME, device="cpu",
+                                  max_length=config.RERANKER_MAX_LENGTH)
+        pairs = [(WARM_UP_QUESTION, WARM_UP_SECTION[:config.RERANKER_EXCERPT_CHARS])] * WARM_UP_PAIRS
+        # The first pass pays one-off initialisation costs, only the second one is measured
+        self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        self._predict(pairs)
+        print(f"✅ Cross-encoder reranker loaded in {time.time() - start_time:.4f} seconds")
+        return self.model
+    
+    def _predict(self, pairs, replace_estimate: bool = False):
+        """
+        Score all pairs in one forward pass and update the latency estimate.
+        
+        Args:
+            pairs: (question, section text) pairs
+            replace_estimate: Replace the estimate with this measurement instead of averaging
+        """
+        start_time = time.time()
+        scores = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        per_pair = (time.time() - start_time) / len(pairs)
+        with self._lock:
+            if self.seconds_per_pair is None or replace_estimate:
+                self.seconds_per_pair = per_pair
+            else:
+                alpha = config.RERANKER_LATENCY_EMA_ALPHA
+                self.seconds_per_pair = alpha * per_pair + (1 - alpha) * self.seconds_per_pair
+        return scores
+    
+    def candidate_budget(self) -> int:
+        """How many candidates fit in config.RERANKER_LATENCY_BUDGET_MS, capped at config.RERANKER_MAX_CANDIDATES"""
+        budget = config.RERANKER_MAX_CANDIDATES
+        seconds_per_pair = self.seconds_per_pair
+        if seconds_per_pair:
+            budget = min(budget, int(config.RERANKER_LATENCY_BUDGET_MS / 1000 / seconds_per_pair))
+        return budget
+    
+    def rerank(self, question: str, hits: List[Dict[str, Any]],
+               get_excerpt: Callable[[str], str], limit: int = None) -> List[Dict[str, Any]]:
+        """
+        Rerank retrieval hits by scoring (question, section title + excerpt) pairs.
+        
+        Args:
+            question: The user question
+            hits: Retrieval hits like {"section", "score", "sources", "ranks"}, best first
+            get_excerpt: Returns the excerpt text of a section
+            limit: Maximum number of hits to return
+        
+        Returns:
+            List[Dict]: The best hits by cross-encoder score, each with a "rerank_score".
+            When not even `limit` candidates fit in the latency budget the hits are
+            returned in their original order, except that every config.RERANKER_PROBE_EVERY-th
+            such request reranks `limit` candidates to measure the cost again, so one slow
+            measurement cannot switch reranking off for good.
+        """
+        if limit is None:
+            limit = config.DEFAULT_SEARCH_LIMIT
+        if not hits:
+            return []
+        if self.model is None:
+            self.initialize_model()
+        
+        # Decide under the lock, so concurrent requests neither lose a skip nor both probe
+        probe = False
+        with self._lock:
+            candidate_count = min(len(hits), self.candidate_budget())
+            if candidate_count < min(limit, len(hits)):
+                self.skipped_since_measured += 1
+                probe = self.skipped_since_measured >= config.RERANKER_PROBE_EVERY
+                if probe:
+                    candidate_count = min(limit, len(hits))
+                    self.skipped_since_measured = 0
+            else:
+                self.skipped_since_measured = 0
+        if candidate_count < min(limit, len(hits)):
+            logger.warning("Reranking skipped: only %d candidates fit the %s ms budget",
+                           candidate_count, config.RERANKER_LATENCY_BUDGET_MS)
+            count(FALLBACKS, kind="rerank_skipped")
+            return hits[:limit]
+        if probe:
+            logger.info("Reranking %d candidates to measure the cost again", candidate_count)
+        candidates = hits[:candidate_count]
+        
+        pairs = [(question, f"{hit['section'].split('_')[0]}\n{get_excerpt(hit['section'])}")
+                 for hit in candidates]
+        start_time = time.time()
+        # A probe replaces the estimate that kept reranking off instead of averaging with it
+        scores = self._predict(pairs, replace_estimate=probe)
+        logger.info("Reranked %d candidates in %.1f ms", len(pairs), (time.time() - start_time) * 1000)
+        
+        for hit, score in zip(candidates, scores):
+            hit["rerank_score"] = float(score)
+            hit["sources"] = hit["sources"] + ["rerank"]
+        candidates.sort(key=lambda hit: hit["rerank_score"], reverse=True)
+        return candidates[:limit]
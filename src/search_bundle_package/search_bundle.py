@@ -0,0 +1,300 @@
+# search_bundle.py
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Binary layout
+# [header: 64 bytes][manifest JSON][padding][payload sections, each 64-byte aligned]
+#
+# header = magic (8) | format version (u32) | reserved (u32) | manifest length (u64)
+#          | payload length (u64) | sha256 of manifest + payload (32)
+BUNDLE_MAGIC = b"MASBNDL\x00"
+BUNDLE_FORMAT_VERSION = 1
+HEADER_STRUCT = struct.Struct("<8sIIQQ32s")
+SECTION_ALIGNMENT = 64
+
+# Payload section names
+SECTION_SEARCH_TREE = "search_tree"
+SECTION_SECTION_METADATA = "section_metadata"
+SECTION_NODE_NAMES = "node_names"
+SECTION_EMBEDDINGS = "embeddings"
+SECTION_PAGE_OFFSETS = "page_offsets"
+SECTION_PAGE_TEXT = "page_text"
+# Optional: descendant centroid per node, same shape as the embeddings
+SECTION_CENTROIDS = "centroids"
+
+
+class SearchBundleError(Exception):
+    """Raised when a search bundle is missing, corrupted or of an unsupported version"""
+
+
+def _aligned(length: int) -> int:
+    """Round a length up to the next section boundary"""
+    return (length + SECTION_ALIGNMENT - 1) // SECTION_ALIGNMENT * SECTION_ALIGNMENT
+
+
+def write_search_bundle(output_path: str, search_tree: dict, section_metadata: dict,
+                        node_names: List[str], embeddings: np.ndarray,
+                        pages: Dict[str, List[str]], embedding_model: str,
+                        centroids: Optional[np.ndarray] = None) -> dict:
+    """
+    Write all serving artifacts into one versioned, checksummed bundle file.
+
+    Args:
+        output_path: Where to write the bundle
+        search_tree: Compiled search tree with embed ids (same shape as final_search_tree_embed_id.json)
+        section_metadata: Section hashmap (same shape as final_hashmap.json)
+        node_names: Renamed tree nodes, one per embedding row
+        embeddings: Matrix of shape (len(node_names), dim), stored as float16
+        pages: Mapping like {"volume 1": [page_1_text, page_2_text, ...]}
+        embedding_model: Name of the model that produced the embeddings
+        centroids: Optional descendant centroid per node, same shape as embeddings
+
+    Returns:
+        dict: The manifest that was written
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float16)
+    if embeddings.ndim != 2 or embeddings.shape[0] != len(node_names):
+        raise SearchBundleError(
+            f"Embeddings shape {embeddings.shape} does not match {len(node_names)} nodes")
+    if centroids is not None:
+        centroids = np.ascontiguousarray(centroids, dtype=np.float16)
+        if centroids.shape != embeddings.shape:
+            raise SearchBundleError(
+                f"Centroids shape {centroids.shape} does not match embeddings shape {embeddings.shape}")
+
+    # Pack every page of every volume into one text blob with an offsets table
+    page_blobs = []
+    page_index = {}
+    for volume, volume_pages in pages.items():
+        page_index[volume] = {
+            "first_page": 1,
+            "count": len(volume_pages),
+            "start_index": len(page_blobs)
+        }
+        page_blobs.extend(text.encode("utf-8") for text in volume_pages)
+    page_offsets = np.zeros(len(page_blobs) + 1, dtype=np.int64)
+    if page_blobs:
+        page_offsets[1:] = np.cumsum([len(blob) for blob in page_blobs])
+
+    raw_sections = [
+        (SECTION_SEARCH_TREE, json.dumps(search_tree, ensure_ascii=False).encode("utf-8")),
+        (SECTION_SECTION_METADATA, json.dumps(section_metadata, ensure_ascii=False).encode("utf-8")),
+        (SECTION_NODE_NAMES, json.dumps(node_names, ensure_ascii=False).encode("utf-8")),
+        (SECTION_EMBEDDINGS, embeddings.tobytes()),
+        (SECTION_PAGE_OFFSETS, page_offsets.tobytes()),
+        (SECTION_PAGE_TEXT, b"".join(page_blobs)),
+    ]
+    if centroids is not None:
+        raw_sections.append((SECTION_CENTROIDS, centroids.tobytes()))
+
+    # Lay the payload out with every section aligned so numpy views stay aligned
+    section_table = {}
+    payload = bytearray()
+    for name, data in raw_sections:
+        payload.extend(b"\x00" * (_aligned(len(payload)) - len(payload)))
+        section_table[name] = {"offset": len(payload), "length": len(data)}
+        payload.extend(data)
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "embedding_model": embedding_model,
+        "embedding_dim": int(embeddings.shape[1]),
+        "embedding_dtype": "float16",
+        "node_count": len(node_names),
+        "section_count": len(section_metadata),
+        "pages": page_index,
+        "sections": section_table
+    }
+    manifest_bytes = json.dumps(manifest, ensure_ascii=False).encode("utf-8")
+    manifest_bytes += b" " * (_aligned(HEADER_STRUCT.size + len(manifest_bytes))
+                              - HEADER_STRUCT.size - len(manifest_bytes))
+
+    digest = hashlib.sha256()
+    digest.update(manifest_bytes)
+    digest.update(payload)
+    header = HEADER_STRUCT.pack(BUNDLE_MAGIC, BUNDLE_FORMAT_VERSION, 0,
+                                len(manifest_bytes), len(payload), digest.digest())
+
+    # Write to a temporary file first so readers never see a half-written bundle
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(manifest_bytes)
+        f.write(payload)
+    os.replace(tmp_path, output_path)
+    return manifest
+
+
+class SearchBundle:
+    """Memory-mapped, read-only view over a search bundle file"""
+
+    def __init__(self):
+        self.path = None
+        self.manifest = None
+        self.search_tree = None
+        self.section_metadata = None
+        self.node_names = None
+        self.embeddings = None
+        self.centroids = None
+        self._file = None
+        self._mmap = None
+        self._payload_offset = 0
+        self._page_offsets = None
+        self._node_id_to_row = None
+
+    def load(self, path: str, verify_checksum: bool = True):
+        """
+        Memory-map a bundle file and parse its manifest.
+
+        Args:
+            path: Path to the bundle file
+            verify_checksum: Recompute the sha256 of the manifest and payload
+
+        Returns:
+            SearchBundle: self, for chaining
+
+        Raises:
+            SearchBundleError: If the file is not a valid bundle
+        """
+        self.close()
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            self.close()
+            raise SearchBundleError(f"Cannot map empty bundle file: {path}") from e
+        self.path = path
+
+        if len(self._mmap) < HEADER_STRUCT.size:
+            self.close()
+            raise SearchBundleError(f"Bundle file is truncated: {path}")
+
+        magic, version, _, manifest_length, payload_length, checksum = \
+            HEADER_STRUCT.unpack_from(self._mmap, 0)
+        if magic != BUNDLE_MAGIC:
+            self.close()
+            raise SearchBundleError(f"Not a search bundle: {path}")
+        if version != BUNDLE_FORMAT_VERSION:
+            self.close()
+            raise SearchBundleError(
+                f"Unsupported bundle version {version}, expected {BUNDLE_FORMAT_VERSION}")
+
+        manifest_start = HEADER_STRUCT.size
+        self._payload_offset = manifest_start + manifest_length
+        if len(self._mmap) != self._payload_offset + payload_length:
+            self.close()
+            raise SearchBundleError(f"Bundle file size does not match its header: {path}")
+
+        if verify_checksum:
+            digest = hashlib.sha256(memoryview(self._mmap)[manifest_start:]).digest()
+            if digest != checksum:
+                self.close()
+                raise SearchBundleError(f"Bundle checksum mismatch: {path}")
+
+        self.manifest = json.loads(bytes(self._mmap[manifest_start:self._payload_offset]))
+
+        # Small structured sections are parsed eagerly, large arrays stay mapped
+        self.search_tree = json.loads(self._section_bytes(SECTION_SEARCH_TREE))
+        self.section_metadata = json.loads(self._section_bytes(SECTION_SECTION_METADATA))
+        self.node_names = json.loads(self._section_bytes(SECTION_NODE_NAMES))
+        self.embeddings = self._section_array(SECTION_EMBEDDINGS, np.float16).reshape(
+            self.manifest["node_count"], self.manifest["embedding_dim"])
+        self._page_offsets = self._section_array(SECTION_PAGE_OFFSETS, np.int64)
+        if SECTION_CENTROIDS in self.manifest["sections"]:
+            self.centroids = self._section_array(SECTION_CENTROIDS, np.float16).reshape(
+                self.manifest["node_count"], self.manifest["embedding_dim"])
+        self._node_id_to_row = {
+            name.split("_")[-1]: row for row, name in enumerate(self.node_names)
+        }
+        return self
+
+    def _section_bytes(self, name: str) -> bytes:
+        """Copy a payload section out of the mapping"""
+        start, length = self._section_span(name)
+        return self._mmap[start:start + length]
+
+    def _section_array(self, name: str, dtype) -> np.ndarray:
+        """Zero-copy numpy view over a payload section"""
+        start, length = self._section_span(name)
+        return np.frombuffer(self._mmap, dtype=dtype,
+                             count=length // np.dtype(dtype).itemsize, offset=start)
+
+    def _section_span(self, name: str) -> Tuple[int, int]:
+        """Absolute (start, length) of a payload section"""
+        try:
+            section = self.manifest["sections"][name]
+        except KeyError:
+            raise SearchBundleError(f"Bundle has no '{name}' section")
+        return self._payload_offset + section["offset"], section["length"]
+
+    def get_row(self, tree_node: str) -> Optional[int]:
+        """Embedding row for a renamed tree node like "Short title_1_Volume 1_1" """
+        return self._node_id_to_row.get(tree_node.split("_")[-1])
+
+    def get_vector(self, tree_node: str) -> Optional[np.ndarray]:
+        """
+        Embedding vector of a renamed tree node.
+
+        Returns:
+            numpy.ndarray: float32 copy of the stored vector, or None if not found
+        """
+        row = self.get_row(tree_node)
+        if row is None:
+            return None
+        return self.embeddings[row].astype(np.float32)
+
+    def get_centroid(self, tree_node: str) -> Optional[np.ndarray]:
+        """
+        Descendant centroid of a renamed tree node.
+
+        Returns:
+            numpy.ndarray: float32 copy of the stored centroid, or None if the node is
+            not found or the bundle was built without centroids
+        """
+        row = self.get_row(tree_node)
+        if row is None or self.centroids is None:
+            return None
+        return self.centroids[row].astype(np.float32)
+
+    def get_page_text(self, volume: str, page: int) -> Optional[str]:
+        """
+        Text of one cleaned content page.
+
+        Args:
+            volume: Volume directory name like "volume 1"
+            page: 1-based page number
+
+        Returns:
+            str: Page text, or None if the page is not in the bundle
+        """
+        volume_index = self.manifest["pages"].get(volume)
+        if volume_index is None:
+            return None
+        position = page - volume_index["first_page"]
+        if position < 0 or position >= volume_index["count"]:
+            return None
+        index = volume_index["start_index"] + position
+        start, _ = self._section_span(SECTION_PAGE_TEXT)
+        begin = start + int(self._page_offsets[index])
+        end = start + int(self._page_offsets[index + 1])
+        return self._mmap[begin:end].decode("utf-8")
+
+    def close(self):
+        """Release the memory mapping"""
+        # Drop numpy views first, otherwise the mapping refuses to close
+        self.embeddings = None
+        self.centroids = None
+        self._page_offsets = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -1,18 +1,23 @@
 # search_term_handler.py
 import re
 import time
-from typing import Optional
+from typing import List, Optional
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from sentence_transformers import SentenceTransformer
+from cancellation_package.cancellation import invoke_llm
+from tracing_package.tracing import get_logger
 import config
 
+logger = get_logger("search_term_handler")
+
 class SearchTermHandler:
     """Handles search term generation and embedding"""
     
     def __init__(self):
         self.llm = None
         self.search_term_chain = None
+        self.search_terms_chain = None
         self.embedding_model = None
         self._initialize_llm()
     
@@ -23,7 +28,9 @@ class SearchTermHandler:
             openai_api_base=config.OPENROUTER_API_BASE,
             model=config.MODEL_NAME,
             temperature=config.LLM_TEMPERATURE,
-            max_tokens=config.LLM_MAX_TOKENS
+            max_tokens=config.LLM_MAX_TOKENS,
+            timeout=config.LLM_REQUEST_TIMEOUT,
+            max_retries=config.LLM_MAX_RETRIES
         )
         
         # Create the prompt template
@@ -63,6 +70,28 @@ Return only the single search term now."""
         
         # Create the chain
         self.search_term_chain = prompt | self.llm
+        
+        # Query expansion prompt - several terms, one per concept in the question
+        expansion_prompt = ChatPromptTemplate.from_messages([
+            ("system",
+             """You are a Migration Act search-term generator used to produce search phrases for embedding-based similarity search of the Migration Act 1958 tree.
+
+OBJECTIVE
+- A question can touch more than one legal concept (e.g. "can my partner visa be cancelled for character reasons" → partner visa, visa cancellation, character test).
+- Return ONE short noun phrase (1–3 words) PER distinct legal concept in the question, most important first, at most {max_terms} phrases.
+- If the question has a single concept, return a single phrase.
+
+FORMAT RULES (must follow strictly)
+- One search term per line. No numbering, bullets, explanation, punctuation or quotes.
+- Use lowercase only, letters, numbers, spaces and hyphens.
+- Prefer exact node labels of the Migration Act tree, otherwise concrete legal labels used in the Act.
+- Avoid generic umbrella terms like "immigration" or "visa issues".
+
+Return only the search terms now."""
+            ),
+            ("user", "{question}")
+        ])
+        self.search_terms_chain = expansion_prompt | self.llm.bind(max_tokens=config.SEARCH_TERM_EXPANSION_MAX_TOKENS)
     
     def clean_search_term(self, raw_term: str) -> str:
         """Clean and validate the generated search term"""
@@ -95,25 +124,65 @@ Return only the single search term now."""
     def generate_search_term(self, user_question: str) -> Optional[str]:
         """Generate clean search term from user question"""
         if not user_question or not user_question.strip():
-            print("❌ Empty question provided")
+            logger.warning("Empty question provided")
             return None
         
         try:
-            response = self.search_term_chain.invoke({"question": user_question})
+            response = invoke_llm(self.search_term_chain, {"question": user_question}, "search_term_llm")
             search_term = self.clean_search_term(response.content)
             
             # Validate the result
             if search_term and len(search_term.split()) >= 1:
-                print(f"🔍 Generated search term: '{search_term}' from question: '{user_question[:50]}...'")
+                logger.info("Generated search term: '%s' from question: '%s...'", search_term, user_question[:50])
                 return search_term
             else:
-                print(f"❌ LLM returned empty or invalid result: '{search_term}' for question: '{user_question[:50]}...'")
+                logger.warning("LLM returned empty or invalid result: '%s' for question: '%s...'",
+                               search_term, user_question[:50])
                 return None
                 
         except Exception as e:
-            print(f"❌ System failed to generate search term: {str(e)} for question: '{user_question[:50]}...'")
+            logger.error("System failed to generate search term: %s for question: '%s...'", e, user_question[:50])
             return None
     
+    def generate_search_terms(self, user_question: str, max_terms: int = None) -> List[str]:
+        """
+        Generate several search terms for a question that may span more than one concept.
+        
+        Args:
+            user_question: The user question
+            max_terms: Total number of terms to return, defaults to config.SEARCH_TERM_FAN_OUT.
+                       When config.SEARCH_TERM_INCLUDE_QUESTION is set the raw question is
+                       the last of them.
+        
+        Returns:
+            List[str]: Distinct search terms, most important first (empty on failure)
+        """
+        if max_terms is None:
+            max_terms = config.SEARCH_TERM_FAN_OUT
+        if not user_question or not user_question.strip():
+            logger.warning("Empty question provided")
+            return []
+        
+        llm_terms = max_terms - 1 if config.SEARCH_TERM_INCLUDE_QUESTION else max_terms
+        terms = []
+        if llm_terms > 0:
+            try:
+                response = invoke_llm(self.search_terms_chain, {"question": user_question, "max_terms": llm_terms},
+                                      "search_term_llm")
+                for line in response.content.splitlines():
+                    term = self.clean_search_term(line.lstrip("-*•0123456789. "))
+                    if term and term.lower() not in (t.lower() for t in terms):
+                        terms.append(term)
+                terms = terms[:llm_terms]
+            except Exception as e:
+                logger.error("System failed to generate search terms: %s for question: '%s...'",
+                             e, user_question[:50])
+        
+        if config.SEARCH_TERM_INCLUDE_QUESTION and user_question.strip().lower() not in (t.lower() for t in terms):
+            terms.append(user_question.strip())
+        logger.info("Generated %d search terms: %s", len(terms), terms)
+        return terms
+    
     def initialize_embedding_model(self):
         """Initialize the sentence transformer model"""
         start_model = time.time()
@@ -129,5 +198,16 @@ Return only the single search term now."""
         start_embed = time.time()
         embedding = self.embedding_model.encode(search_term)
         end_embed = time.time()
-        print(f"Embedding took {end_embed - start_embed:.8f} seconds")
-        return embedding
\ No newline at end of file
+        logger.debug("Embedding took %.8f seconds", end_embed - start_embed)
+        return embedding
+    
+    def embed_search_terms(self, search_terms: List[str]):
+        """Embed several search terms in one batch, one row per term"""
+        if self.embedding_model is None:
+            self.initialize_embedding_model()
+        
+        start_embed = time.time()
+        embeddings = self.embedding_model.encode(search_terms, batch_size=len(search_terms))
+        end_embed = time.time()
+        logger.debug("Embedding %d terms took %.8f seconds", len(search_terms), end_embed - start_embed)
+        return embeddings
@@ -0,0 +1,91 @@
+# single_flight.py
+import threading
+from typing import Any, Callable, Hashable, Tuple
+from cancellation_package.cancellation import check_cancelled
+from metrics_package.metrics import COALESCED, count
+from tracing_package.tracing import REQUEST_ID, get_logger
+
+logger = get_logger("single_flight")
+
+# Seconds between cancellation checks of a caller waiting for another's run
+WAIT_POLL_INTERVAL = 0.2
+
+
+def normalize_text(text: str) -> str:
+    """Key form of a question or search term: case and spacing do not matter"""
+    return " ".join(text.split()).casefold()
+
+
+class _Call:
+    """One computation in flight and what it ended with"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # Set when the run was cancelled before it finished; its waiters run it themselves
+        self.abandoned = False
+        self.request_id = REQUEST_ID.get()
+
+
+class SingleFlight:
+    """
+    Runs a function once per key at a time. A caller that arrives while the same key is
+    being computed waits for that computation and gets its result (or its exception)
+    instead of repeating it. Nothing is cached: the key is forgotten as soon as it finishes.
+    """
+    
+    def __init__(self, level: str):
+        """
+        Args:
+            level: Name of the work being shared, the label of the coalesced counter
+        """
+        self.level = level
+        self._lock = threading.Lock()
+        self._calls = {}
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn, or wait for the identical call in flight. If that call is cancelled
+        before it finishes, the waiter runs fn itself.
+        
+        Args:
+            key: Identifies calls that would produce the same result
+            fn: The computation
+        
+        Returns:
+            Tuple[Any, bool]: The result, and whether it came from another caller's run
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+            if leader:
+                break
+            
+            logger.info("Waiting for the identical %s of request %s", self.level, call.request_id)
+            while not call.done.wait(WAIT_POLL_INTERVAL):
+                check_cancelled(self.level)
+            if call.abandoned:
+                continue
+            count(COALESCED, level=self.level)
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException:
+            # The caller was cancelled (or interrupted), which says nothing about the others
+            call.abandoned = True
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
@@ -0,0 +1,183 @@
+# tracing.py
+import contextvars
+import copy
+import json
+import logging
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Tuple
+import config
+
+# Every pipeline logger lives under this name, so one handler covers them all
+ROOT_LOGGER_NAME = "migration_chatbot"
+TEXT_LOG_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+
+# Id of the request being processed in the current thread / context
+REQUEST_ID = contextvars.ContextVar("request_id", default="-")
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp every record with the id of the request it was logged for"""
+    
+    def filter(self, record):
+        record.request_id = REQUEST_ID.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; structured fields passed as extra={"fields": {...}} are merged in"""
+    
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage()
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: str = None, log_format: str = None, stream=None):
+    """
+    Send the pipeline logs to one stream handler.
+    
+    Args:
+        level: Log level name, defaults to config.LOG_LEVEL
+        log_format: "text" or "json", defaults to config.LOG_FORMAT
+        stream: Where to write, defaults to stderr
+    """
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.addFilter(RequestIdFilter())
+    if (log_format or config.LOG_FORMAT) == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_LOG_FORMAT))
+    logger = logging.getLogger(ROOT_LOGGER_NAME)
+    logger.handlers = [handler]
+    logger.setLevel((level or config.LOG_LEVEL).upper())
+    logger.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for one pipeline component, e.g. get_logger("searcher")"""
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
+
+
+def new_request_id() -> str:
+    """Short random id for a request"""
+    return uuid.uuid4().hex[:12]
+
+
+@contextmanager
+def request_context(request_id: str = None):
+    """Tag everything logged inside the block with a request id (a new one by default)"""
+    token = REQUEST_ID.set(request_id or new_request_id())
+    try:
+        yield REQUEST_ID.get()
+    finally:
+        REQUEST_ID.reset(token)
+
+
+def map_in_context(executor, fn, *iterables) -> List[Any]:
+    """
+    executor.map that keeps the caller's request id (and other context variables) in the
+    worker threads. Each call runs in its own copy of the caller's context.
+    """
+    futures = [executor.submit(contextvars.copy_context().run, fn, *args) for args in zip(*iterables)]
+    return [future.result() for future in futures]
+
+
+class RequestTrace:
+    """
+    What the search did for one request: the nodes scored and chosen at every tree level,
+    the ranking of each retrieval stage and the sections finally chosen.
+    
+    Components only fill a trace when one is passed to them, so untraced requests skip
+    building any of it.
+    """
+    
+    def __init__(self, request_id: str = None):
+        self.request_id = request_id or REQUEST_ID.get()
+        self.term = None
+        self.levels = []
+        self.rankings = []
+        self.events = []
+        self.sections = []
+        self._lock = threading.Lock()
+    
+    def for_term(self, term: str) -> "RequestTrace":
+        """View of this trace that tags its entries with a search term (shares the same lists)"""
+        scoped = copy.copy(self)
+        scoped.term = term
+        return scoped
+    
+    def _tagged(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        if self.term is not None:
+            entry["term"] = self.term
+        return entry
+    
+    def add_level(self, depth: int, scores: List[Tuple[str, float]], chosen: List[str]):
+        """
+        Record one level of a tree search.
+        
+        Args:
+            depth: 0 for the parts below the root
+            scores: (node, similarity) of every node scored at this level
+            chosen: Nodes the search continued with or collected
+        """
+        entry = self._tagged({
+            "depth": depth,
+            "scores": [[node, round(float(score), 6)] for node, score in scores],
+            "chosen": list(chosen)
+        })
+        with self._lock:
+            self.levels.append(entry)
+    
+    def add_ranking(self, stage: str, sections: List[str]):
+        """Record the ranked sections of one retrieval stage"""
+        entry = self._tagged({"stage": stage, "sections": list(sections)})
+        with self._lock:
+            self.rankings.append(entry)
+    
+    def add_event(self, name: str, **fields):
+        """Record something notable, e.g. a fallback or a shortcut"""
+        entry = self._tagged({"event": name, **fields})
+        with self._lock:
+            self.events.append(entry)
+    
+    def set_sections(self, hits: List[Dict[str, Any]]):
+        """Record the sections chosen for the answer, best first"""
+        self.sections = [
+            {"section": hit["section"], "score": round(float(hit["score"]), 6), "sources": list(hit["sources"])}
+            for hit in hits
+        ]
+    
+    @property
+    def path(self) -> List[Dict[str, Any]]:
+        """Nodes chosen at each level, in the order the search took them"""
+        return [self._path_step(level) for level in self.levels]
+    
+    @staticmethod
+    def _path_step(level: Dict[str, Any]) -> Dict[str, Any]:
+        step = {"depth": level["depth"], "chosen": level["chosen"]}
+        if "term" in level:
+            step["term"] = level["term"]
+        return step
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready form of the trace"""
+        with self._lock:
+            return {
+                "request_id": self.request_id,
+                "path": self.path,
+                "levels": list(self.levels),
+                "rankings": list(self.rankings),
+                "events": list(self.events),
+                "sections": list(self.sections)
+            }
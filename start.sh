@@ -1,6 +1,12 @@
 #!/bin/bash
-# Initialize vector database
-mkdir -p vector_database
-python data_preparation/embedding_optimized_tree/embed_save_chromadb.py
+# Initialize vector database, unless a search bundle ships the vectors already
+if [ ! -f final_json_searching_material/search_bundle.bin ]; then
+    mkdir -p vector_database
+    python data_preparation/embedding_optimized_tree/embed_save_chromadb.py
+fi
+# Build the BM25 index (not versioned; numpy only, takes about a second)
+if [ ! -f final_json_searching_material/bm25_index.npz ]; then
+    python data_preparation/build_lexical_index/build_bm25_index.py
+fi
 # Start the Flask app
-python src/app.py
\ No newline at end of file
+python src/app.py